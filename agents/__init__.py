@@ -3,9 +3,57 @@
 from .molecule_designer import create_molecule_designer_agent
 from .admet_evaluator import create_admet_evaluator_agent
 from .project_manager import create_project_manager_agent
+from .response_cache import CachedAgent, ResponseCache, get_response_cache
+from .model_clients import (
+    RateLimitTimeout,
+    RateLimitedModel,
+    TokenBucket,
+    build_dialog_agent,
+    close_http_clients,
+    get_provider_limits,
+    provider_limit_stats
+)
+from .agent_pool import AgentPool, designer_pool, evaluator_pool
+from .streaming import stream_agent_reply
+from .async_invoker import (
+    AgentCallTimeout,
+    AsyncAgentInvoker,
+    InvocationResult,
+    designer_invoker,
+    evaluator_invoker,
+    model_provider
+)
+from .pipeline import Pipeline, PipelineEvent, Stage, StageContext
+from .workflow import build_discovery_pipeline, build_evaluation_prompt
 
 __all__ = [
     'create_molecule_designer_agent',
     'create_admet_evaluator_agent',
-    'create_project_manager_agent'
+    'create_project_manager_agent',
+    'CachedAgent',
+    'ResponseCache',
+    'get_response_cache',
+    'RateLimitTimeout',
+    'RateLimitedModel',
+    'TokenBucket',
+    'build_dialog_agent',
+    'close_http_clients',
+    'get_provider_limits',
+    'provider_limit_stats',
+    'AgentPool',
+    'designer_pool',
+    'evaluator_pool',
+    'stream_agent_reply',
+    'AgentCallTimeout',
+    'AsyncAgentInvoker',
+    'InvocationResult',
+    'designer_invoker',
+    'evaluator_invoker',
+    'model_provider',
+    'Pipeline',
+    'PipelineEvent',
+    'Stage',
+    'StageContext',
+    'build_discovery_pipeline',
+    'build_evaluation_prompt'
 ]
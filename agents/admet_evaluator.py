@@ -3,7 +3,13 @@
 负责对生成的分子进行药物性质评估
 """
 
-from agentscope.agents import DialogAgent
+from typing import TYPE_CHECKING, Optional, Union
+
+from .model_clients import build_dialog_agent
+from .response_cache import CachedAgent, ResponseCache
+
+if TYPE_CHECKING:
+    from agentscope.agents import DialogAgent
 
 
 ADMET_EVALUATOR_PROMPT = """你是一名专业的药物 ADMET（吸收、分布、代谢、排泄、毒性）评估专家。
@@ -31,17 +37,24 @@ ADMET_EVALUATOR_PROMPT = """你是一名专业的药物 ADMET（吸收、分布
 """
 
 
-def create_admet_evaluator_agent(model_config_name: str = "qwen-max") -> DialogAgent:
+def create_admet_evaluator_agent(
+    model_config_name: str = "qwen-max",
+    cache: Optional[ResponseCache] = None
+) -> Union["DialogAgent", CachedAgent]:
     """创建 ADMET 评估智能体
     
     Args:
         model_config_name: 模型配置名称
+        cache: 响应缓存，提供时返回带缓存的包装器
         
     Returns:
-        DialogAgent: ADMET 评估智能体实例
+        DialogAgent: ADMET 评估智能体实例（提供 cache 时为 CachedAgent）
     """
-    return DialogAgent(
+    agent = build_dialog_agent(
         name="ADMETEvaluator",
         sys_prompt=ADMET_EVALUATOR_PROMPT,
         model_config_name=model_config_name,
     )
+    if cache is not None:
+        return CachedAgent(agent, model_config_name, cache)
+    return agent
@@ -0,0 +1,93 @@
+"""智能体实例池
+
+按 model_config_name 复用已构建的 DialogAgent，避免每次点击都重新构建
+智能体及其模型包装器（从而让底层 HTTP 客户端的连接复用真正生效）。
+归还时清空智能体记忆，保证不同用户的对话不会串线。
+"""
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from tools import tracing
+
+from .admet_evaluator import create_admet_evaluator_agent
+from .molecule_designer import create_molecule_designer_agent
+from .response_cache import CachedAgent, ResponseCache
+
+
+DEFAULT_MAX_IDLE = 8
+
+
+def reset_agent_memory(agent) -> None:
+    """清空智能体的对话记忆"""
+    memory = getattr(agent, "memory", None)
+    if memory is not None:
+        memory.clear()
+
+
+class AgentPool:
+    """按模型配置分组的线程安全智能体池"""
+
+    def __init__(self, factory: Callable[[str], object], max_idle: int = DEFAULT_MAX_IDLE):
+        """
+        Args:
+            factory: 智能体工厂函数，参数为 model_config_name
+            max_idle: 每个模型配置最多保留的空闲实例数，超出的实例归还时丢弃
+        """
+        self.factory = factory
+        self.max_idle = max_idle
+        self._idle: Dict[str, List[object]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def acquire(self, model_config_name: str, cache: Optional[ResponseCache] = None) -> Iterator[object]:
+        """借出一个智能体，退出上下文时清空记忆并归还
+
+        Args:
+            model_config_name: 模型配置名称
+            cache: 响应缓存，提供时借出的实例包装为 CachedAgent
+
+        Yields:
+            DialogAgent: 记忆为空的智能体（提供 cache 时为 CachedAgent）
+        """
+        with self._lock:
+            idle = self._idle[model_config_name]
+            agent = idle.pop() if idle else None
+            if agent is not None:
+                self.reused += 1
+
+        if agent is None:
+            with tracing.span("agent.build", model=model_config_name):
+                agent = self.factory(model_config_name)
+            with self._lock:
+                self.created += 1
+
+        try:
+            yield CachedAgent(agent, model_config_name, cache) if cache is not None else agent
+        finally:
+            reset_agent_memory(agent)
+            with self._lock:
+                idle = self._idle[model_config_name]
+                if len(idle) < self.max_idle:
+                    idle.append(agent)
+
+    def clear(self) -> None:
+        """丢弃全部空闲实例"""
+        with self._lock:
+            self._idle.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "idle": {name: len(agents) for name, agents in self._idle.items()}
+            }
+
+
+designer_pool = AgentPool(lambda name: create_molecule_designer_agent(model_config_name=name))
+evaluator_pool = AgentPool(lambda name: create_admet_evaluator_agent(model_config_name=name))
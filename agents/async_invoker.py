@@ -0,0 +1,487 @@
+"""异步智能体调用层
+
+AgentScope 的模型包装器是同步阻塞的。AsyncAgentInvoker 在 asyncio 中调用
+智能体池里的 DialogAgent：
+- 按提供方（模型配置中的 model_type，如 dashscope_chat / openai_chat）限制
+  并发：每个提供方一个 asyncio 信号量和一个同样大小的专用线程池，
+  某个提供方卡住时只会占满它自己的线程，不影响其他提供方
+- 每次调用有截止时间（含排队时间），超时抛出 AgentCallTimeout
+- 调用方取消（如用户关闭页面）时立即返回；已发出的同步请求无法中断，
+  会在后台线程中结束后把智能体归还到池中，并发名额也在线程结束后才归还，
+  因此提供方实际并发不会超过上限。流式调用在下一段输出到达时停止
+- 失败后在截止时间内按指数退避重试；可选对冲请求：首个请求在 hedge_after
+  秒内没有返回时再发出一个相同请求，取先完成者
+
+环境变量：
+- LINGNEXUS_PROVIDER_CONCURRENCY：每个提供方的默认并发上限
+- LINGNEXUS_AGENT_TIMEOUT：单次调用的默认截止时间（秒）
+- LINGNEXUS_AGENT_RETRIES：失败后的默认重试次数
+- LINGNEXUS_AGENT_HEDGE_AFTER：对冲请求的等待时间（秒），0 表示不对冲
+"""
+
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional
+
+from tools import metrics, tracing
+
+from .agent_pool import AgentPool, designer_pool, evaluator_pool
+from .response_cache import CONFIG_PATH, ResponseCache, get_response_cache
+from .streaming import stream_agent_reply
+
+if TYPE_CHECKING:
+    from agentscope.message import Msg
+
+
+DEFAULT_PROVIDER_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_RETRIES = 1
+RETRY_BACKOFF = 0.5
+
+_STREAM_END = object()
+
+
+class AgentCallTimeout(TimeoutError):
+    """智能体调用超过截止时间"""
+
+
+class InvocationResult:
+    """一次异步调用的结果"""
+
+    def __init__(self, msg: "Msg", provider: str, latency: float, attempts: int, hedged: bool, cached: bool):
+        self.msg = msg
+        self.content = msg.content
+        self.provider = provider
+        self.latency = latency
+        self.attempts = attempts
+        self.hedged = hedged
+        self.cached = cached
+
+
+_providers: Dict[str, str] = {}
+
+
+def model_provider(model_config_name: str, config_path: str = CONFIG_PATH) -> str:
+    """返回模型配置的提供方（model_type），找不到配置时返回配置名本身"""
+    provider = _providers.get(model_config_name)
+    if provider is not None:
+        return provider
+
+    provider = model_config_name
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            for entry in json.load(f):
+                if entry.get("config_name") == model_config_name:
+                    provider = entry.get("model_type") or model_config_name
+                    break
+    except (OSError, ValueError):
+        pass
+    _providers[model_config_name] = provider
+    return provider
+
+
+def _record_call(model_config_name: str, mode: str, outcome: str, seconds: float) -> None:
+    """记录一次 LLM 调用的结果与耗时（见 tools.metrics）"""
+    metrics.LLM_REQUESTS.labels(model_config_name, mode, outcome).inc()
+    if outcome in ("ok", "cached"):
+        metrics.LLM_LATENCY.labels(model_config_name, mode).observe(seconds)
+
+
+def _count_tokens(model_config_name: str, agent, msg: "Msg", output: str) -> None:
+    """按字符估算并记录输入（系统提示 + 用户消息）与输出 token 数"""
+    prompt = f"{getattr(agent, 'sys_prompt', '') or ''}{msg.content}"
+    metrics.LLM_TOKENS.labels(model_config_name, "in").inc(metrics.estimate_tokens(prompt))
+    metrics.LLM_TOKENS.labels(model_config_name, "out").inc(metrics.estimate_tokens(output))
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _release_if_acquired(semaphore: asyncio.Semaphore, acquire: "asyncio.Future") -> None:
+    if not acquire.cancelled() and acquire.exception() is None:
+        semaphore.release()
+
+
+def _abandon_acquire(semaphore: asyncio.Semaphore, acquire: "asyncio.Future") -> None:
+    """放弃获取信号量；取消前已经获取到的名额在完成回调中归还"""
+    acquire.cancel()
+    acquire.add_done_callback(functools.partial(_release_if_acquired, semaphore))
+
+
+async def _acquire(semaphore: asyncio.Semaphore, timeout: float) -> None:
+    """带超时地获取信号量，超时抛出 asyncio.TimeoutError
+
+    不用 wait_for(semaphore.acquire(), ...)：Python < 3.12 中超时与获取同时
+    发生时，已获取的名额会随被丢弃的结果一起泄漏。
+    """
+    acquire = asyncio.ensure_future(semaphore.acquire())
+    try:
+        done, _ = await asyncio.wait({acquire}, timeout=timeout)
+    except asyncio.CancelledError:
+        _abandon_acquire(semaphore, acquire)
+        raise
+    if not done:
+        _abandon_acquire(semaphore, acquire)
+        raise asyncio.TimeoutError()
+
+
+class AsyncAgentInvoker:
+    """带并发上限、截止时间、取消和对冲重试的异步智能体调用器"""
+
+    def __init__(
+        self,
+        pool: AgentPool,
+        limits: Optional[Dict[str, int]] = None,
+        default_limit: Optional[int] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        hedge_after: Optional[float] = None,
+        cache: Optional[ResponseCache] = None
+    ):
+        """
+        Args:
+            pool: 智能体池（每次尝试从池中借出独立的智能体实例）
+            limits: 提供方 → 并发上限
+            default_limit: 未在 limits 中列出的提供方的并发上限
+            timeout: 默认截止时间（秒）
+            retries: 默认重试次数
+            hedge_after: 默认对冲等待时间（秒），None 或 0 表示不对冲
+            cache: 响应缓存，默认 get_response_cache()
+        """
+        self.pool = pool
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit or int(
+            _env_float("LINGNEXUS_PROVIDER_CONCURRENCY", DEFAULT_PROVIDER_CONCURRENCY)
+        )
+        self.timeout = timeout or _env_float("LINGNEXUS_AGENT_TIMEOUT", DEFAULT_TIMEOUT)
+        self.retries = retries if retries is not None else int(_env_float("LINGNEXUS_AGENT_RETRIES", DEFAULT_RETRIES))
+        self.hedge_after = hedge_after if hedge_after is not None else _env_float("LINGNEXUS_AGENT_HEDGE_AFTER", 0.0)
+        self.cache = cache if cache is not None else get_response_cache()
+
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        # asyncio.Semaphore 绑定事件循环，按循环分别创建
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self.calls = 0
+        self.timeouts = 0
+        self.retried = 0
+        self.hedges = 0
+
+    def limit(self, provider: str) -> int:
+        return self.limits.get(provider, self.default_limit)
+
+    def _executor(self, provider: str) -> ThreadPoolExecutor:
+        with self._lock:
+            executor = self._executors.get(provider)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=self.limit(provider), thread_name_prefix=f"agent-{provider}"
+                )
+                self._executors[provider] = executor
+            return executor
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._semaphores.setdefault(loop, {})
+            semaphore = semaphores.get(provider)
+            if semaphore is None:
+                semaphore = semaphores[provider] = asyncio.Semaphore(self.limit(provider))
+            return semaphore
+
+    def _call_blocking(self, model_config_name: str, msg: "Msg", use_cache: bool):
+        """在提供方线程池中执行：借出智能体并同步调用"""
+        with self.pool.acquire(model_config_name, cache=self.cache) as agent:
+            if self.cache is not None:
+                response = agent(msg, use_cache=use_cache)
+                cached = agent.last_hit
+            else:
+                response, cached = agent(msg), False
+            if not cached:
+                _count_tokens(model_config_name, agent, msg, str(response.content))
+            return response, cached
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _release(self, semaphore: asyncio.Semaphore, provider: str) -> None:
+        semaphore.release()
+        with self._lock:
+            self._in_flight[provider] -= 1
+
+    def _release_when_done(
+        self,
+        future: Future,
+        semaphore: asyncio.Semaphore,
+        provider: str,
+        loop: asyncio.AbstractEventLoop
+    ) -> None:
+        """线程中的调用结束后才归还并发名额
+
+        同步请求无法中断：调用方取消或超时后线程仍在执行，此时就归还名额会让
+        提供方的实际并发超过上限。尚未开始执行的调用直接取消。
+        """
+        if future.cancel() or future.done():
+            self._release(semaphore, provider)
+            return
+
+        def release(_: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(self._release, semaphore, provider)
+            except RuntimeError:
+                pass  # 事件循环已关闭，信号量随之失效
+
+        future.add_done_callback(release)
+
+    async def _attempt(self, provider: str, model_config_name: str, msg: "Msg", use_cache: bool, deadline: float):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(provider)
+        await _acquire(semaphore, max(0.0, deadline - loop.time()))
+        with self._lock:
+            self._in_flight[provider] = self._in_flight.get(provider, 0) + 1
+        future = self._executor(provider).submit(
+            tracing.wrap(self._call_blocking), model_config_name, msg, use_cache
+        )
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            self._release_when_done(future, semaphore, provider, loop)
+
+    async def invoke(
+        self,
+        model_config_name: str,
+        msg: "Msg",
+        use_cache: bool = True,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        hedge_after: Optional[float] = None
+    ) -> InvocationResult:
+        """异步调用智能体
+
+        Args:
+            model_config_name: 模型配置名称
+            msg: 用户消息
+            use_cache: 是否使用响应缓存
+            timeout: 截止时间（秒，含排队和重试）
+            retries: 失败后的重试次数
+            hedge_after: 首个请求超过该秒数未返回时发出对冲请求，0 表示不对冲
+
+        Returns:
+            InvocationResult: 回复消息及调用信息
+
+        Raises:
+            AgentCallTimeout: 超过截止时间
+        """
+        provider = model_provider(model_config_name)
+        timeout = timeout or self.timeout
+        retries = self.retries if retries is None else retries
+        hedge_after = self.hedge_after if hedge_after is None else hedge_after
+        self._count("calls")
+        started = time.perf_counter()
+        with tracing.span("llm.invoke", model=model_config_name, provider=provider) as span:
+            try:
+                result = await self._invoke_rounds(
+                    provider, model_config_name, msg, use_cache, timeout, retries, hedge_after
+                )
+            except AgentCallTimeout:
+                span.set(timed_out=True)
+                _record_call(model_config_name, "invoke", "timeout", time.perf_counter() - started)
+                raise
+            except asyncio.CancelledError:
+                _record_call(model_config_name, "invoke", "cancelled", time.perf_counter() - started)
+                raise
+            except Exception:
+                _record_call(model_config_name, "invoke", "error", time.perf_counter() - started)
+                raise
+            span.set(attempts=result.attempts, hedged=result.hedged, cached=result.cached)
+            outcome = "cached" if result.cached else "ok"
+            _record_call(model_config_name, "invoke", outcome, time.perf_counter() - started)
+            return result
+
+    async def _invoke_rounds(
+        self,
+        provider: str,
+        model_config_name: str,
+        msg: "Msg",
+        use_cache: bool,
+        timeout: float,
+        retries: int,
+        hedge_after: float
+    ) -> InvocationResult:
+        """invoke 的重试与对冲逻辑"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + timeout
+        attempts = 0
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        for round_no in range(retries + 1):
+            if round_no:
+                self._count("retried")
+                await asyncio.sleep(min(RETRY_BACKOFF * 2 ** (round_no - 1), max(0.0, deadline - loop.time())))
+            if loop.time() >= deadline:
+                break
+
+            tasks = {asyncio.ensure_future(self._attempt(provider, model_config_name, msg, use_cache, deadline))}
+            attempts += 1
+            hedge_pending = bool(hedge_after)
+            try:
+                while tasks:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    wait = min(hedge_after, remaining) if hedge_pending else remaining
+                    done, tasks = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        if hedge_pending:
+                            # 首个请求迟迟没有返回：再发出一个相同请求，取先完成者
+                            hedge_pending = False
+                            hedged = True
+                            self._count("hedges")
+                            attempts += 1
+                            tasks.add(asyncio.ensure_future(
+                                self._attempt(provider, model_config_name, msg, use_cache, deadline)
+                            ))
+                        continue
+                    for task in done:
+                        if task.exception() is None:
+                            response, cached = task.result()
+                            return InvocationResult(response, provider, loop.time() - start, attempts, hedged, cached)
+                        last_error = task.exception()
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        if last_error is not None and not isinstance(last_error, asyncio.TimeoutError):
+            raise last_error
+        self._count("timeouts")
+        raise AgentCallTimeout(f"{model_config_name} 调用超时（{timeout:g} 秒）")
+
+    async def stream(
+        self,
+        model_config_name: str,
+        msg: "Msg",
+        use_cache: bool = True,
+        timeout: Optional[float] = None,
+        info: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """异步流式调用，逐段返回回复文本（不重试、不对冲）
+
+        调用方停止迭代或被取消后，后台线程在下一段输出到达时停止读取。
+
+        Args:
+            info: 提供时在流结束后写入 provider、latency（秒）和 cached
+
+        Raises:
+            AgentCallTimeout: 超过截止时间
+        """
+        loop = asyncio.get_running_loop()
+        provider = model_provider(model_config_name)
+        start = loop.time()
+        deadline = start + (timeout or self.timeout)
+        queue: asyncio.Queue = asyncio.Queue()
+        cached = []
+        stop = threading.Event()
+        self._count("calls")
+
+        def produce() -> None:
+            try:
+                with self.pool.acquire(model_config_name, cache=self.cache) as agent:
+                    output = []
+                    for chunk in stream_agent_reply(agent, msg, use_cache=use_cache):
+                        if stop.is_set():
+                            break
+                        output.append(chunk)
+                        loop.call_soon_threadsafe(queue.put_nowait, (chunk, None))
+                    cached.append(bool(getattr(agent, "last_hit", False)))
+                    if not cached[-1]:
+                        _count_tokens(model_config_name, agent, msg, "".join(output))
+            except BaseException as e:  # noqa: B902 - 异常转交给事件循环一侧抛出
+                loop.call_soon_threadsafe(queue.put_nowait, (_STREAM_END, e))
+                return
+            loop.call_soon_threadsafe(queue.put_nowait, (_STREAM_END, None))
+
+        # 异步生成器可能在不同任务中恢复执行，这里不切换当前 Span，只显式记录
+        span = tracing.start_span("llm.stream", model=model_config_name, provider=provider)
+        semaphore = self._semaphore(provider)
+        try:
+            await _acquire(semaphore, max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError as e:
+            self._count("timeouts")
+            span.end(error=e)
+            _record_call(model_config_name, "stream", "timeout", loop.time() - start)
+            raise AgentCallTimeout(f"{model_config_name} 排队超时")
+        span.set(queue_ms=round((loop.time() - start) * 1000, 1))
+
+        chunks = 0
+        outcome = "error"
+        failure: Optional[BaseException] = None
+        with self._lock:
+            self._in_flight[provider] = self._in_flight.get(provider, 0) + 1
+        future = self._executor(provider).submit(tracing.wrap(produce, span))
+        try:
+            while True:
+                try:
+                    chunk, error = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    self._count("timeouts")
+                    outcome = "timeout"
+                    raise AgentCallTimeout(f"{model_config_name} 调用超时")
+                if chunk is _STREAM_END:
+                    if error is not None:
+                        raise error
+                    if info is not None:
+                        info.update(provider=provider, latency=loop.time() - start, cached=any(cached))
+                    span.set(chunks=chunks, cached=any(cached))
+                    outcome = "cached" if any(cached) else "ok"
+                    return
+                if not chunks:
+                    span.set(ttft_ms=round((loop.time() - start) * 1000, 1))
+                    metrics.LLM_TTFT.labels(model_config_name).observe(loop.time() - start)
+                chunks += 1
+                yield chunk
+        except (GeneratorExit, asyncio.CancelledError) as e:
+            outcome = "cancelled"
+            failure = e
+            raise
+        except Exception as e:
+            failure = e
+            raise
+        finally:
+            span.end(error=failure)
+            _record_call(model_config_name, "stream", outcome, loop.time() - start)
+            stop.set()
+            # 后台线程读到下一段输出（或流结束）后才退出，名额随之归还
+            self._release_when_done(future, semaphore, provider, loop)
+
+    def invoke_sync(self, model_config_name: str, msg: "Msg", **kwargs: Any) -> InvocationResult:
+        """在没有事件循环的线程中同步调用（命令行脚本等）"""
+        return asyncio.run(self.invoke(model_config_name, msg, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "retried": self.retried,
+                "hedges": self.hedges,
+                "in_flight": dict(self._in_flight),
+                "limits": {provider: self.limit(provider) for provider in self._executors}
+            }
+
+
+designer_invoker = AsyncAgentInvoker(designer_pool)
+evaluator_invoker = AsyncAgentInvoker(evaluator_pool)
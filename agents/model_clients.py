@@ -0,0 +1,353 @@
+"""模型客户端：按模型配置限流与连接复用
+
+所有智能体都通过 build_dialog_agent 创建，同一 config_name 的智能体共享
+一个模型包装器（RateLimitedModel），从而在一处统一执行：
+- 令牌桶限速（requests_per_minute / burst），收到 429 后清空令牌桶，
+  让后续请求整体退避，而不是各自立即重试
+- 最大并发请求数（max_in_flight），等待超过 acquire_timeout 时抛出
+  RateLimitTimeout；流式调用在流读完或 close() 后才归还名额
+- 连接复用：共享的包装器只持有一个底层客户端；OpenAI 兼容接口的客户端
+  换成该配置共享的 keep-alive httpx 连接池（pool_connections /
+  keepalive_expiry），进程退出时由 close_http_clients 关闭。DashScope SDK
+  每次调用自行建立会话，只适用限速与并发上限
+
+限额配置（默认 config/provider_limits.json）按 config_name 给出，未列出的
+配置使用 default：
+    {"default": {...}, "limits": {"qwen-max": {"requests_per_minute": 60, ...}}}
+
+环境变量：
+- LINGNEXUS_PROVIDER_LIMITS_FILE：限额配置文件路径
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+
+from tools.lazy_imports import LazyModule
+
+if TYPE_CHECKING:
+    from agentscope.agents import DialogAgent
+
+# AgentScope 在首次创建智能体时导入一次（见 tools.lazy_imports）
+agents = LazyModule("agentscope.agents")
+
+
+DEFAULT_LIMITS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "provider_limits.json"
+)
+
+DEFAULT_LIMITS: Dict[str, float] = {
+    "requests_per_minute": 60,
+    "burst": 5,
+    "max_in_flight": 4,
+    "acquire_timeout": 60,
+    "pool_connections": 8,
+    "keepalive_expiry": 60
+}
+
+_RATE_LIMIT_ERROR = re.compile(r"\b429\b|rate.?limit|throttl|too many requests", re.IGNORECASE)
+
+
+class RateLimitTimeout(TimeoutError):
+    """等待限流令牌或并发名额超时"""
+
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: 每秒补充的令牌数，0 表示不限速
+            capacity: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """取出一个令牌，必要时等待
+
+        Returns:
+            float: 等待的秒数
+
+        Raises:
+            RateLimitTimeout: 在 timeout 秒内没有可用令牌
+        """
+        if not self.rate:
+            return 0.0
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                wait = (1 - self._tokens) / self.rate
+            if timeout is not None and now + wait - start > timeout:
+                raise RateLimitTimeout(f"等待限流令牌超时（{timeout:.1f} 秒）")
+            time.sleep(wait)
+
+    def penalize(self) -> None:
+        """收到限流错误后清空令牌桶并额外欠下一整桶，所有调用方一起退避"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - self.capacity
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """判断异常是否为提供方返回的限流错误（HTTP 429 等）"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return bool(_RATE_LIMIT_ERROR.search(str(error)))
+
+
+_limits_cache: Dict[str, Dict[str, Any]] = {}
+_limits_lock = threading.Lock()
+
+
+def load_provider_limits(path: Optional[str] = None) -> Dict[str, Any]:
+    """加载限额配置（每个文件只读取一次），文件不存在时全部使用内置默认值"""
+    path = path or os.environ.get("LINGNEXUS_PROVIDER_LIMITS_FILE") or DEFAULT_LIMITS_PATH
+    with _limits_lock:
+        if path not in _limits_cache:
+            data: Dict[str, Any] = {}
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            _limits_cache[path] = data
+        return _limits_cache[path]
+
+
+def get_provider_limits(model_config_name: str, path: Optional[str] = None) -> Dict[str, float]:
+    """返回某个模型配置生效的限额（内置默认值 < 文件 default < 文件中该配置）"""
+    data = load_provider_limits(path)
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(data.get("default", {}))
+    limits.update(data.get("limits", {}).get(model_config_name, {}))
+    return limits
+
+
+class _CallSlot:
+    """一次调用占用的并发名额，只归还一次"""
+
+    def __init__(self, model: "RateLimitedModel"):
+        self.model = model
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.model._release()
+
+
+def _iter_stream(stream, slot: _CallSlot) -> Iterator[Any]:
+    try:
+        yield from stream
+    except Exception as e:
+        slot.model._record_error(e)
+        raise
+    finally:
+        slot.release()
+
+
+class _StreamingResponse:
+    """流式响应的代理：流读完、出错或 close() 时归还并发名额，其余属性透传
+
+    调用方不读完流时必须调用 close()（或用 with 语句），否则名额不会归还。
+    """
+
+    def __init__(self, response, stream, slot: _CallSlot):
+        self._response = response
+        self._raw_stream = stream
+        self._slot = slot
+        self.stream = _iter_stream(stream, slot)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+    @property
+    def text(self) -> Any:
+        # 未经 stream 读取时，先读完流（名额随之归还），再取完整文本
+        for _ in self.stream:
+            pass
+        return self._response.text
+
+    def close(self) -> None:
+        """停止读取并关闭底层流，归还并发名额（可重复调用）"""
+        try:
+            self.stream.close()
+            close = getattr(self._raw_stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            # 流从未开始读取时生成器的 finally 不会执行，这里直接归还
+            self._slot.release()
+
+    def __enter__(self) -> "_StreamingResponse":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class RateLimitedModel:
+    """为模型包装器加上限速与并发上限，其余属性（format 等）透传"""
+
+    def __init__(self, model, model_config_name: str, limits: Dict[str, float]):
+        self.model = model
+        self.model_config_name = model_config_name
+        self.limits = limits
+        self.bucket = TokenBucket(limits["requests_per_minute"] / 60.0, limits["burst"])
+        self._slots = threading.BoundedSemaphore(int(limits["max_in_flight"]))
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.wait_time = 0.0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        timeout = self.limits["acquire_timeout"]
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=timeout):
+            raise RateLimitTimeout(f"{self.model_config_name} 并发请求数已达上限，等待超时（{timeout:g} 秒）")
+        try:
+            self.bucket.acquire(timeout=max(0.0, timeout - (time.monotonic() - start)))
+        except BaseException:
+            self._slots.release()
+            raise
+        waited = time.monotonic() - start
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.wait_time += waited
+            self.throttled += waited > 0.01
+
+        slot = _CallSlot(self)
+        try:
+            response = self.model(*args, **kwargs)
+            stream = getattr(response, "stream", None)
+        except BaseException as e:
+            slot.release()
+            self._record_error(e)
+            raise
+        if stream is None:
+            slot.release()
+            return response
+        # 流式响应在读取流时才真正占用提供方的连接，名额随流一起归还
+        return _StreamingResponse(response, stream, slot)
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _record_error(self, error: BaseException) -> None:
+        if is_rate_limit_error(error):
+            self.bucket.penalize()
+            with self._lock:
+                self.rate_limited += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "in_flight": self.in_flight,
+                "throttled": self.throttled,
+                "rate_limited": self.rate_limited,
+                "wait_time": self.wait_time,
+                "requests_per_minute": self.limits["requests_per_minute"],
+                "max_in_flight": self.limits["max_in_flight"]
+            }
+
+
+_shared_models: Dict[str, RateLimitedModel] = {}
+_http_clients: Dict[str, Any] = {}
+_shared_lock = threading.Lock()
+
+
+def _pool_http_client(model, model_config_name: str, limits: Dict[str, float]) -> None:
+    """为 OpenAI 兼容客户端换上该配置共享的 keep-alive httpx 连接池
+
+    调用方需持有 _shared_lock。模型没有 OpenAI 风格的 client 或未安装 httpx 时不做处理。
+    """
+    client = getattr(model, "client", None)
+    if client is None or not hasattr(client, "with_options"):
+        return
+    try:
+        import httpx
+    except ImportError:
+        return
+
+    http_client = _http_clients.get(model_config_name)
+    if http_client is None:
+        http_client = _http_clients[model_config_name] = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=int(limits["pool_connections"]),
+                max_keepalive_connections=int(limits["pool_connections"]),
+                keepalive_expiry=limits["keepalive_expiry"]
+            )
+        )
+    model.client = client.with_options(http_client=http_client)
+
+
+def close_http_clients() -> None:
+    """关闭共享的 HTTP 连接池（进程退出时自动调用）"""
+    with _shared_lock:
+        clients = list(_http_clients.values())
+        _http_clients.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_http_clients)
+
+
+def get_shared_model(model_config_name: str, model=None) -> Optional[RateLimitedModel]:
+    """返回某个模型配置共享的限流包装器
+
+    Args:
+        model_config_name: 模型配置名称
+        model: 首次调用时用作底层的模型包装器（通常取自第一个创建的智能体）
+    """
+    with _shared_lock:
+        shared = _shared_models.get(model_config_name)
+        if shared is None and model is not None:
+            limits = get_provider_limits(model_config_name)
+            _pool_http_client(model, model_config_name, limits)
+            shared = _shared_models[model_config_name] = RateLimitedModel(model, model_config_name, limits)
+        return shared
+
+
+def build_dialog_agent(name: str, sys_prompt: str, model_config_name: str) -> "DialogAgent":
+    """创建 DialogAgent 并换上该模型配置共享的限流模型包装器"""
+    agent = agents.DialogAgent(name=name, sys_prompt=sys_prompt, model_config_name=model_config_name)
+    model = getattr(agent, "model", None)
+    if model is not None and not isinstance(model, RateLimitedModel):
+        agent.model = get_shared_model(model_config_name, model)
+    return agent
+
+
+def provider_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """各模型配置的限流统计"""
+    with _shared_lock:
+        models = dict(_shared_models)
+    return {name: model.stats() for name, model in models.items()}
@@ -3,7 +3,13 @@
 负责根据靶点名称生成候选分子的 SMILES 结构
 """
 
-from agentscope.agents import DialogAgent
+from typing import TYPE_CHECKING, Optional, Union
+
+from .model_clients import build_dialog_agent
+from .response_cache import CachedAgent, ResponseCache
+
+if TYPE_CHECKING:
+    from agentscope.agents import DialogAgent
 
 
 # 优化的 Prompt：强约束输出格式，确保可解析性
@@ -27,17 +33,24 @@ c1ccc(CNc2ncnc3[nH]ccc23)cc1
 """
 
 
-def create_molecule_designer_agent(model_config_name: str = "qwen-max") -> DialogAgent:
+def create_molecule_designer_agent(
+    model_config_name: str = "qwen-max",
+    cache: Optional[ResponseCache] = None
+) -> Union["DialogAgent", CachedAgent]:
     """创建分子设计智能体
     
     Args:
         model_config_name: 模型配置名称（qwen-max/deepseek/gemini）
+        cache: 响应缓存，提供时返回带缓存的包装器
         
     Returns:
-        DialogAgent: 分子设计智能体实例
+        DialogAgent: 分子设计智能体实例（提供 cache 时为 CachedAgent）
     """
-    return DialogAgent(
+    agent = build_dialog_agent(
         name="MoleculeDesigner",
         sys_prompt=MOLECULE_DESIGNER_PROMPT,
         model_config_name=model_config_name,
     )
+    if cache is not None:
+        return CachedAgent(agent, model_config_name, cache)
+    return agent
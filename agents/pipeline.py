@@ -0,0 +1,234 @@
+"""流水线执行器
+
+把 ProjectManager 描述的工作流（设计 → 筛选 → 评估 → 汇总）建模为由
+asyncio 队列连接的阶段。每个阶段是一个异步生成器函数：接收一个输入
+（或一批输入），产出任意个输出交给下一阶段；各阶段同时运行，因此设计
+智能体仍在流式输出时，已通过筛选的分子就可以交给评估智能体点评。
+
+消费方（如图形界面回调）迭代 Pipeline.run() 得到 PipelineEvent：
+- 各阶段通过 ctx.emit() 发出的进度事件
+- 最后一个阶段的输出（kind 为 "output"）
+汇总即在消费方完成。端到端耗时接近最慢的单个阶段，而不是各阶段之和；
+stats() 给出每个阶段的累计耗时，便于对比。追踪时（提供 parent_span 或
+存在当前 Span）整个流水线记录为 "pipeline:<名称>" Span，每个阶段每处理
+一个输入记录一个 Span（见 tools.tracing）。
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from tools import tracing
+
+
+_END = object()
+
+
+async def _gather_or_cancel(*aws) -> None:
+    """并发运行 aws；任一抛出异常（或自身被取消）时取消其余任务，等待它们退出后重新抛出
+
+    asyncio.gather 在某个任务失败时不会取消其他任务，这里补上这一点。
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class PipelineEvent:
+    """流水线事件"""
+
+    def __init__(self, stage: str, kind: str, data: Any = None, elapsed: float = 0.0):
+        self.stage = stage
+        self.kind = kind
+        self.data = data
+        self.elapsed = elapsed
+
+
+class StageContext:
+    """传给阶段函数的上下文，用于发出进度事件"""
+
+    def __init__(self, pipeline: "Pipeline", stage: "Stage"):
+        self._pipeline = pipeline
+        self.stage = stage
+
+    def emit(self, kind: str, data: Any = None) -> None:
+        self._pipeline._publish(self.stage.name, kind, data)
+
+
+class Stage:
+    """流水线中的一个阶段"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any, StageContext], AsyncIterator[Any]],
+        concurrency: int = 1,
+        batch_size: Optional[int] = None
+    ):
+        """
+        Args:
+            name: 阶段名称
+            func: 异步生成器函数 func(item, ctx)，产出交给下一阶段的输出
+            concurrency: 同时处理输入的工作协程数（输出顺序不保证）
+            batch_size: 提供时 func 收到输入列表：等到至少一个输入后，
+                取出队列中已有的输入（最多 batch_size 个）一起处理
+        """
+        self.name = name
+        self.func = func
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.items = 0
+        self.outputs = 0
+        self.busy = 0.0
+        self.first_output: Optional[float] = None
+        self.finished: Optional[float] = None
+
+
+class Pipeline:
+    """由队列连接的异步阶段流水线"""
+
+    def __init__(self, name: str = "pipeline", maxsize: int = 0, parent_span=None):
+        """
+        Args:
+            name: 流水线名称（用于统计信息）
+            maxsize: 阶段间队列的容量，0 表示不限（大于 0 时下游处理慢会反压上游）
+            parent_span: 追踪时的父 Span（见 tools.tracing），默认为运行时的当前 Span
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.parent_span = parent_span
+        self.stages: List[Stage] = []
+        self._events: Optional[asyncio.Queue] = None
+        self._start = 0.0
+        self.elapsed = 0.0
+
+    def add_stage(
+        self,
+        name: str,
+        func: Callable[[Any, StageContext], AsyncIterator[Any]],
+        concurrency: int = 1,
+        batch_size: Optional[int] = None
+    ) -> "Pipeline":
+        """追加一个阶段（参数见 Stage），返回自身以便链式调用"""
+        self.stages.append(Stage(name, func, concurrency, batch_size))
+        return self
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time() - self._start
+
+    def _publish(self, stage: str, kind: str, data: Any = None) -> None:
+        self._events.put_nowait(PipelineEvent(stage, kind, data, self._now()))
+
+    async def _take(self, stage: Stage, inbox: asyncio.Queue) -> Any:
+        """取出下一个输入（批处理阶段取出一批），输入结束时返回 _END"""
+        item = await inbox.get()
+        if item is _END or not stage.batch_size:
+            return item
+        batch = [item]
+        while len(batch) < stage.batch_size and not inbox.empty():
+            item = inbox.get_nowait()
+            if item is _END:
+                # 放回结束标记，本批处理完后再结束
+                inbox.put_nowait(_END)
+                break
+            batch.append(item)
+        return batch
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]) -> None:
+        ctx = StageContext(self, stage)
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._take(stage, inbox)
+            if item is _END:
+                # 留给同一阶段的其他工作协程
+                inbox.put_nowait(_END)
+                return
+            stage.items += len(item) if stage.batch_size else 1
+            began = loop.time()
+            with tracing.span(stage.name):
+                async for output in stage.func(item, ctx):
+                    stage.outputs += 1
+                    if stage.first_output is None:
+                        stage.first_output = self._now()
+                    if outbox is None:
+                        self._publish(stage.name, "output", output)
+                    else:
+                        await outbox.put(output)
+            stage.busy += loop.time() - began
+
+    async def _run_stage(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]) -> None:
+        await _gather_or_cancel(*(self._worker(stage, inbox, outbox) for _ in range(stage.concurrency)))
+        stage.finished = self._now()
+        if outbox is not None:
+            await outbox.put(_END)
+
+    async def run(self, seed: Any) -> AsyncIterator[PipelineEvent]:
+        """运行流水线
+
+        Args:
+            seed: 第一个阶段的唯一输入
+
+        Yields:
+            PipelineEvent: 进度事件与最后一个阶段的输出
+
+        任一阶段抛出异常时取消其余阶段并重新抛出；消费方停止迭代或被
+        取消时，所有阶段随之取消。
+        """
+        if not self.stages:
+            raise ValueError("流水线中没有阶段")
+        loop = asyncio.get_running_loop()
+        self._start = loop.time()
+        self._events = asyncio.Queue()
+        queues = [asyncio.Queue(self.maxsize) for _ in self.stages]
+        queues[0].put_nowait(seed)
+        queues[0].put_nowait(_END)
+
+        async def supervise() -> None:
+            # 在监督任务中切换当前 Span，各阶段的工作任务随之继承
+            try:
+                with tracing.span(f"pipeline:{self.name}", parent=self.parent_span):
+                    await _gather_or_cancel(*(
+                        self._run_stage(stage, queues[i], queues[i + 1] if i + 1 < len(queues) else None)
+                        for i, stage in enumerate(self.stages)
+                    ))
+            except Exception as e:
+                self._events.put_nowait(e)
+            else:
+                self._events.put_nowait(_END)
+
+        supervisor = asyncio.ensure_future(supervise())
+        try:
+            while True:
+                event = await self._events.get()
+                if event is _END:
+                    break
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            self.elapsed = loop.time() - self._start
+            supervisor.cancel()
+            # 等待各阶段的工作任务处理完取消，调用方提前停止时不会留下仍在运行的任务
+            await asyncio.gather(supervisor, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """端到端耗时与各阶段的处理量、累计耗时（秒）"""
+        return {
+            "name": self.name,
+            "elapsed": self.elapsed,
+            "stage_time": sum(stage.busy for stage in self.stages),
+            "stages": {
+                stage.name: {
+                    "items": stage.items,
+                    "outputs": stage.outputs,
+                    "busy": stage.busy,
+                    "first_output": stage.first_output,
+                    "finished": stage.finished
+                }
+                for stage in self.stages
+            }
+        }
@@ -3,7 +3,12 @@
 负责协调整个药物发现流程
 """
 
-from agentscope.agents import DialogAgent
+from typing import TYPE_CHECKING
+
+from .model_clients import build_dialog_agent
+
+if TYPE_CHECKING:
+    from agentscope.agents import DialogAgent
 
 
 PROJECT_MANAGER_PROMPT = """你是一名药物发现项目的 AI 项目经理，负责协调分子设计和评估流程。
@@ -33,7 +38,7 @@ PROJECT_MANAGER_PROMPT = """你是一名药物发现项目的 AI 项目经理，
 """
 
 
-def create_project_manager_agent(model_config_name: str = "qwen-max") -> DialogAgent:
+def create_project_manager_agent(model_config_name: str = "qwen-max") -> "DialogAgent":
     """创建项目经理智能体
     
     Args:
@@ -42,7 +47,7 @@ def create_project_manager_agent(model_config_name: str = "qwen-max") -> DialogA
     Returns:
         DialogAgent: 项目经理智能体实例
     """
-    return DialogAgent(
+    return build_dialog_agent(
         name="ProjectManager",
         sys_prompt=PROJECT_MANAGER_PROMPT,
         model_config_name=model_config_name,
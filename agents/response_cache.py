@@ -0,0 +1,172 @@
+"""智能体响应缓存
+
+演示和回归测试中经常对同一靶点、同一模型发出完全相同的请求。
+以「模型配置 + 系统提示哈希 + 用户消息」为键缓存智能体回复，
+支持 TTL 过期、容量上限（LRU 淘汰）以及按请求跳过缓存。
+
+通过环境变量配置默认缓存：
+- LINGNEXUS_RESPONSE_CACHE_SIZE：最大条目数（0 表示关闭）
+- LINGNEXUS_RESPONSE_CACHE_TTL：过期时间（秒）
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from tools.lazy_imports import LazyModule
+
+if TYPE_CHECKING:
+    from agentscope.message import Msg
+
+# AgentScope 在首次使用时导入一次（见 tools.lazy_imports）
+message = LazyModule("agentscope.message")
+
+
+CONFIG_PATH = "./config/model_config.json"
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 3600.0
+
+_config_fingerprints: Dict[str, str] = {}
+
+
+def _model_config_fingerprint(model_config_name: str, config_path: str = CONFIG_PATH) -> str:
+    """返回模型配置（不含 api_key）的哈希，配置变更后旧缓存自动失效"""
+    fingerprint = _config_fingerprints.get(model_config_name)
+    if fingerprint is not None:
+        return fingerprint
+
+    config: Dict[str, Any] = {"config_name": model_config_name}
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            for entry in json.load(f):
+                if entry.get("config_name") == model_config_name:
+                    config = {k: v for k, v in entry.items() if k != "api_key"}
+                    break
+    except (OSError, ValueError):
+        pass
+
+    fingerprint = hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+    _config_fingerprints[model_config_name] = fingerprint
+    return fingerprint
+
+
+class ResponseCache:
+    """线程安全的内存响应缓存（TTL + LRU）"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        """
+        Args:
+            max_entries: 最大条目数，超出后淘汰最久未使用的条目
+            ttl: 条目有效期（秒）
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_config_name: str, sys_prompt: str, content: str) -> str:
+        """由模型配置、系统提示和用户消息生成缓存键"""
+        parts = (
+            _model_config_fingerprint(model_config_name),
+            hashlib.sha256(sys_prompt.encode("utf-8")).hexdigest(),
+            content
+        )
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """查询缓存，过期或不存在时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, content: str) -> None:
+        """写入缓存"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中率统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl
+            }
+
+
+class CachedAgent:
+    """为 DialogAgent 加上响应缓存的包装器
+
+    调用方式与 DialogAgent 相同，额外支持 use_cache=False 跳过缓存。
+    命中缓存时不会调用模型，也不会写入智能体的记忆。
+    """
+
+    def __init__(self, agent, model_config_name: str, cache: ResponseCache):
+        self.agent = agent
+        self.model_config_name = model_config_name
+        self.cache = cache
+        self.last_hit = False
+
+    def __call__(self, msg: "Msg", use_cache: bool = True) -> "Msg":
+        key = ResponseCache.make_key(self.model_config_name, self.agent.sys_prompt, str(msg.content))
+
+        if use_cache:
+            content = self.cache.get(key)
+            if content is not None:
+                self.last_hit = True
+                return message.Msg(name=self.agent.name, content=content, role="assistant")
+
+        self.last_hit = False
+        response = self.agent(msg)
+        if isinstance(response.content, str) and response.content:
+            self.cache.put(key, response.content)
+        return response
+
+    def __getattr__(self, name: str):
+        return getattr(self.agent, name)
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """返回全局默认响应缓存（按环境变量创建），容量为 0 时返回 None"""
+    global _default_cache
+
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                max_entries = int(os.environ.get("LINGNEXUS_RESPONSE_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+                if max_entries <= 0:
+                    return None
+                _default_cache = ResponseCache(
+                    max_entries=max_entries,
+                    ttl=float(os.environ.get("LINGNEXUS_RESPONSE_CACHE_TTL", DEFAULT_TTL))
+                )
+    return _default_cache
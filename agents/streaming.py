@@ -0,0 +1,95 @@
+"""智能体流式调用
+
+按模型的流式输出逐段返回文本，便于下游在整段回复结束前就开始处理。
+模型包装器不支持流式时退化为一次性返回完整回复。
+"""
+
+from typing import TYPE_CHECKING, Iterator
+
+from tools.lazy_imports import LazyModule
+
+from .response_cache import CachedAgent, ResponseCache
+
+if TYPE_CHECKING:
+    from agentscope.message import Msg
+
+# AgentScope 在首次使用时导入一次（见 tools.lazy_imports）
+message = LazyModule("agentscope.message")
+
+
+def _iter_model_text(agent, msg: "Msg") -> Iterator[str]:
+    """直接调用智能体的模型包装器并以流式方式返回增量文本
+
+    与 DialogAgent.reply 相同：系统提示 + 记忆组成 prompt，回复写回记忆。
+    """
+    model = getattr(agent, "model", None)
+    if model is None or not hasattr(model, "format"):
+        yield agent(msg).content
+        return
+
+    memory = getattr(agent, "memory", None)
+    if memory is not None:
+        memory.add(msg)
+    prompt = model.format(
+        message.Msg("system", agent.sys_prompt, role="system"),
+        memory.get_memory() if memory is not None else msg
+    )
+
+    try:
+        response = model(prompt, stream=True)
+    except TypeError:
+        response = model(prompt)
+
+    stream = getattr(response, "stream", None)
+    full_text = ""
+    try:
+        if stream is None:
+            full_text = response.text or ""
+            yield full_text
+        else:
+            # 流式生成器每次给出截至当前的完整文本，这里转换为增量
+            for _, text in stream:
+                delta = text[len(full_text):] if text.startswith(full_text) else text
+                full_text = text
+                if delta:
+                    yield delta
+    finally:
+        # 调用方提前停止读取或出错时也关闭流，归还限流名额（见 agents.model_clients）
+        close = getattr(response, "close", None)
+        if close is not None:
+            close()
+
+    if memory is not None:
+        memory.add(message.Msg(agent.name, full_text, role="assistant"))
+
+
+def stream_agent_reply(agent, msg: "Msg", use_cache: bool = True) -> Iterator[str]:
+    """流式调用智能体，逐段返回回复文本
+
+    Args:
+        agent: DialogAgent 或 CachedAgent
+        msg: 用户消息
+        use_cache: agent 为 CachedAgent 时是否使用缓存；命中缓存时一次性返回
+
+    Yields:
+        str: 回复文本的增量片段
+    """
+    if not isinstance(agent, CachedAgent):
+        yield from _iter_model_text(agent, msg)
+        return
+
+    key = ResponseCache.make_key(agent.model_config_name, agent.agent.sys_prompt, str(msg.content))
+    if use_cache:
+        content = agent.cache.get(key)
+        if content is not None:
+            agent.last_hit = True
+            yield content
+            return
+
+    agent.last_hit = False
+    chunks = []
+    for chunk in _iter_model_text(agent.agent, msg):
+        chunks.append(chunk)
+        yield chunk
+    if chunks:
+        agent.cache.put(key, "".join(chunks))
@@ -0,0 +1,153 @@
+"""药物发现工作流流水线
+
+按 ProjectManager 描述的流程构建流水线（见 pipeline.py）：
+    designer  流式调用分子设计智能体，每凑齐一批完整的 SMILES 行就交给下游
+    filter    规范化去重 + ADMET 打分（在线程中计算），通过的分子交给下游
+    evaluator 按小批调用 ADMET 评估智能体点评，设计智能体仍在输出时即可开始
+汇总由消费方根据事件完成：
+    designer  "designed" 事件：原始回复、解析统计、调用耗时与是否命中缓存
+    filter    "scored" 事件：本批的筛选结果（screen_molecules 格式）
+    evaluator 输出（kind 为 "output"）：{"numbers", "content", "timed_out"}
+"""
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tools.admet_rules import get_rule_set
+from tools.chem_tools import screen_molecules
+from tools import tracing
+from tools.lazy_imports import LazyModule
+from tools.smiles_extractor import StreamingSmilesParser
+from tools.standardize import SmilesDeduplicator
+
+from .async_invoker import AgentCallTimeout, AsyncAgentInvoker, designer_invoker, evaluator_invoker
+from .pipeline import Pipeline, StageContext
+
+if TYPE_CHECKING:
+    from agentscope.message import Msg
+
+# AgentScope 在首次使用时导入一次（见 tools.lazy_imports）
+message = LazyModule("agentscope.message")
+
+
+# 每次评估调用最多点评的分子数
+EVAL_BATCH_SIZE = 4
+# 同时进行的评估调用数
+EVAL_CONCURRENCY = 2
+
+
+def build_evaluation_prompt(target_name: str, molecules: Iterable[Tuple[int, Dict]]) -> str:
+    """生成评估智能体的提示：molecules 为 (分子编号, 筛选结果)"""
+    molecules = list(molecules)
+    rule_set = get_rule_set()
+    prompt = f"请评估以下 {len(molecules)} 个 {target_name} 抑制剂候选物：\n\n"
+    for number, mol_data in molecules:
+        props = mol_data['properties']
+        prompt += f"分子 {number}: {mol_data['smiles']}\n"
+        for rule in rule_set.rules:
+            prompt += f"- {rule.label}: {rule.format_value(props[rule.descriptor])}\n"
+        prompt += "\n"
+    return prompt
+
+
+def _screen(molecules: List[Tuple[str, Any]]) -> List[Dict]:
+    return list(screen_molecules(molecules))
+
+
+def build_discovery_pipeline(
+    model_name: str,
+    target_name: str,
+    use_cache: bool = True,
+    screen: Callable[[List[Tuple[str, Any]]], List[Dict]] = _screen,
+    dedup: Optional[SmilesDeduplicator] = None,
+    evaluate: bool = True,
+    designer: AsyncAgentInvoker = designer_invoker,
+    evaluator: AsyncAgentInvoker = evaluator_invoker,
+    parent_span=None
+) -> Pipeline:
+    """构建 设计 → 筛选 → 评估 流水线，运行时以用户消息（Msg）为输入
+
+    Args:
+        model_name: 设计与评估使用的模型配置名称
+        target_name: 靶点名称（用于评估提示）
+        use_cache: 是否使用响应缓存
+        screen: 筛选函数，输入去重后的 (规范 SMILES, Mol) 列表（见 SmilesDeduplicator.filter_mols），
+            返回 screen_molecules 格式的结果
+        dedup: 去重器，默认每条流水线独立
+        evaluate: False 时不调用评估智能体，通过的分子（编号, 结果）作为输出
+        designer: 设计智能体调用器
+        evaluator: 评估智能体调用器
+        parent_span: 追踪时的父 Span（见 tools.tracing）
+    """
+    dedup = dedup if dedup is not None else SmilesDeduplicator()
+    passed_count = 0
+
+    async def design(msg: "Msg", ctx: StageContext) -> AsyncIterator[List[str]]:
+        parser = StreamingSmilesParser()
+        raw_chunks: List[str] = []
+        info: Dict[str, Any] = {}
+        timer = tracing.phase_timer()
+        async for chunk in designer.stream(model_name, msg, use_cache=use_cache, info=info):
+            raw_chunks.append(chunk)
+            began = time.perf_counter()
+            smiles_batch = parser.feed(chunk)
+            if timer is not None:
+                timer.add("smiles.extract", time.perf_counter() - began)
+            if smiles_batch:
+                yield smiles_batch
+        smiles_batch = parser.close()
+        if timer is not None:
+            timer.flush()
+        if smiles_batch:
+            yield smiles_batch
+        ctx.emit("designed", dict(info, raw_response="".join(raw_chunks), parse_stats=parser.stats))
+
+    async def filter_stage(smiles_batch: List[str], ctx: StageContext) -> AsyncIterator[Tuple[int, Dict]]:
+        nonlocal passed_count
+        # 同一分子的不同写法在计算描述符之前合并，解析得到的 Mol 直接用于打分；
+        # 打分在线程中进行，不阻塞事件循环
+        def dedupe_and_screen() -> List[Dict]:
+            with tracing.span("smiles.standardize"):
+                unique = dedup.dedupe_mols(smiles_batch)
+            return screen(unique)
+
+        results = await asyncio.to_thread(dedupe_and_screen)
+        ctx.emit("scored", results)
+        for result in results:
+            if result["passed"]:
+                passed_count += 1
+                yield passed_count, result
+
+    async def evaluate_stage(batch: List[Tuple[int, Dict]], ctx: StageContext) -> AsyncIterator[Dict]:
+        msg = message.Msg(name="System", content=build_evaluation_prompt(target_name, batch), role="user")
+        numbers = [number for number, _ in batch]
+        try:
+            result = await evaluator.invoke(model_name, msg, use_cache=use_cache)
+            yield {"numbers": numbers, "content": result.content, "timed_out": False}
+        except AgentCallTimeout as e:
+            # 点评超时不影响已完成的筛选结果
+            yield {"numbers": numbers, "content": f"⚠️ {e}，请稍后重试", "timed_out": True}
+
+    pipeline = Pipeline(name=model_name, parent_span=parent_span)
+    pipeline.add_stage("designer", design)
+    pipeline.add_stage("filter", filter_stage)
+    if evaluate:
+        pipeline.add_stage("evaluator", evaluate_stage, concurrency=EVAL_CONCURRENCY, batch_size=EVAL_BATCH_SIZE)
+    return pipeline
+
+
+def render_evaluations(evaluations: List[Dict]) -> str:
+    """按分子编号顺序拼接各批评估意见"""
+    sections = []
+    for evaluation in sorted(evaluations, key=lambda e: e["numbers"][0]):
+        numbers = evaluation["numbers"]
+        title = f"分子 {numbers[0]}" if len(numbers) == 1 else f"分子 {numbers[0]}–{numbers[-1]}"
+        sections.append(f"#### {title}\n\n{evaluation['content']}")
+    return "\n\n".join(sections)
+
+
+def format_stage_times(stats: Dict[str, Any]) -> str:
+    """流水线耗时摘要，如 "总耗时 3.2 秒（各阶段累计 5.1 秒：designer 2.9 / filter 0.3 / evaluator 1.9）" """
+    stages = " / ".join(f"{name} {stage['busy']:.1f}" for name, stage in stats["stages"].items())
+    return f"总耗时 {stats['elapsed']:.1f} 秒（各阶段累计 {stats['stage_time']:.1f} 秒：{stages}）"
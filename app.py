@@ -9,159 +9,239 @@ except ImportError:
     print("错误：未安装 Gradio。请运行：pip install gradio")
     exit(1)
 
-import agentscope
-from agentscope.message import Msg
-from agents.molecule_designer import create_molecule_designer_agent
-from agents.admet_evaluator import create_admet_evaluator_agent
-from tools.chem_tools import admet_filter, calculate_molecular_properties
-import re
-from typing import Tuple, List
+from agents.workflow import build_discovery_pipeline, format_stage_times, render_evaluations
+from tools.admet_rules import get_rule_set
+from tools.standardize import SmilesDeduplicator
+from tools.chem_tools import warm_up as warm_up_chem_tools
+from tools.lazy_imports import LazyModule
+from tools.metrics import REQUESTS, RequestTracker, record_generation, track_request
+from tools.tracing import Trace, format_flame_summary, start_span
+from serving import GateFull, RequestGate, format_queue_status, launch, parse_serving_args
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, List, Tuple
 
 
+# AgentScope 在首次使用时导入（启动后由后台预热完成，见 serving.launch）
+agentscope = LazyModule("agentscope")
+message = LazyModule("agentscope.message")
+
 # 初始化标志
 _initialized = False
+_init_lock = threading.Lock()
+
+# “生成分子”事件的请求闸门（并发数与排队上限在启动时按服务参数配置）
+request_gate = RequestGate("generate")
 
 
 def initialize_agentscope():
-    """初始化 AgentScope（只执行一次）"""
+    """初始化 AgentScope（只执行一次；后台预热与请求可能同时调用）"""
     global _initialized
-    if not _initialized:
-        agentscope.init(
-            model_configs="./config/model_config.json",
-            project="LingNexus",
-            save_code=False,
-            save_api_invoke=False,
-        )
-        _initialized = True
+    with _init_lock:
+        if not _initialized:
+            agentscope.init(
+                model_configs="./config/model_config.json",
+                project="LingNexus",
+                save_code=False,
+                save_api_invoke=False,
+            )
+            _initialized = True
 
 
-def parse_smiles_from_response(response_text: str) -> List[str]:
-    """从智能体响应中提取 SMILES"""
-    lines = response_text.strip().split('\n')
-    smiles_list = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line or '请提供' in line or len(line) < 5:
-            continue
-        line = re.sub(r'^[\d\-\.\)]+\s*', '', line)
-        
-        if line and not line.startswith(('#', '//')):
-            smiles_list.append(line)
-    
-    return smiles_list
+def render_molecule_table(idx: int, mol_data: Dict) -> str:
+    """渲染单个通过筛选分子的性质表格（指标与阈值来自当前 ADMET 规则集）"""
+    return f"""
+**分子 {idx}**: `{mol_data['smiles']}`
+
+{get_rule_set().render_markdown_table(mol_data['properties'])}
+---
+"""
+
+
+def render_smiles_list(scored: List[Dict]) -> str:
+    """渲染已评分的 SMILES 列表"""
+    smiles_output = "### 生成的 SMILES 结构\n\n"
+    for idx, result in enumerate(scored, 1):
+        mark = "✅" if result["passed"] else ("❌" if not result["valid"] else "⚠️")
+        smiles_output += f"{idx}. `{result['smiles']}` {mark}\n"
+    return smiles_output
 
 
-def generate_molecules(
+async def generate_molecules(
     target_name: str,
     model_name: str,
     requirements: str,
+    bypass_cache: bool = False,
+    show_trace: bool = False,
     progress=gr.Progress()
-) -> Tuple[str, str, str]:
+) -> AsyncIterator[Tuple[str, str, str, str]]:
     """生成分子并评估（图形界面回调函数）
     
-    Returns:
-        Tuple[str, str, str]: (状态信息, 生成的SMILES, 评估结果)
+    请求先经过 request_gate 排队（状态框显示排队位置与预计等待），放行后：
+    设计智能体以流式方式输出，每收到完整的一行就立即解析、规范化去重、
+    验证并进行 ADMET 打分；通过的分子按小批交给评估智能体点评，与仍在
+    进行的生成同时运行。SMILES 和评估面板随之逐步刷新。
+    模型调用经由异步调用层（按提供方限流、带截止时间），用户关闭页面或点击
+    “停止”时 Gradio 取消本协程，排队名额释放，流式读取与评估调用随之停止。
+    
+    Args:
+        bypass_cache: 为 True 时跳过响应缓存，强制重新调用模型
+        show_trace: 为 True 时在完成后给出本次请求的耗时分析（见 tools.tracing）
+    
+    Yields:
+        Tuple[str, str, str, str]: (状态信息, 生成的SMILES, 评估结果, 耗时分析)
     """
     
     if not target_name.strip():
-        return "❌ 错误：请输入靶点名称", "", ""
+        yield "❌ 错误：请输入靶点名称", "", "", ""
+        return
+    
+    try:
+        async with request_gate.ticket() as ticket:
+            async for position, eta in ticket.wait():
+                yield format_queue_status(position, eta), "", "", ""
+            with track_request("generate", model_name) as request:
+                outputs = _generate_molecules(
+                    target_name, model_name, requirements, bypass_cache, show_trace, request, progress
+                )
+                try:
+                    async for output in outputs:
+                        yield output
+                finally:
+                    # 客户端断开时立即停止内层流水线，而不是等待垃圾回收
+                    await outputs.aclose()
+    except GateFull as e:
+        REQUESTS.labels("generate", "rejected").inc()
+        yield f"❌ {e}", "", "", ""
+
+
+async def _generate_molecules(
+    target_name: str,
+    model_name: str,
+    requirements: str,
+    bypass_cache: bool,
+    show_trace: bool,
+    request: RequestTracker,
+    progress
+) -> AsyncIterator[Tuple[str, str, str, str]]:
+    """generate_molecules 获得放行后的处理过程（失败时将 request.outcome 记为 error）"""
     
+    # 本次请求的追踪：结束时导出到 LINGNEXUS_TRACE_FILE（若已设置）
+    trace = Trace("generate_molecules", model=model_name, target=target_name)
     try:
         # 1. 初始化
         progress(0.1, desc="初始化 AgentScope...")
-        initialize_agentscope()
+        init_span = start_span("agentscope.init", parent=trace.root)
+        await asyncio.to_thread(initialize_agentscope)  # 未预热完成时导入较慢，不阻塞事件循环
+        init_span.end()
         
-        # 2. 创建智能体
-        progress(0.2, desc="创建分子设计智能体...")
-        designer = create_molecule_designer_agent(model_config_name=model_name)
-        evaluator = create_admet_evaluator_agent(model_config_name=model_name)
+        # 2. 准备智能体（调用层从实例池借出，避免每次请求重新构建）
+        progress(0.2, desc="准备分子设计智能体...")
+        use_cache = not bypass_cache
         
-        # 3. 生成分子
+        # 3. 流式生成分子，逐行解析并打分
         progress(0.4, desc=f"正在为 {target_name} 生成候选分子...")
         user_request = f"设计 {target_name} 抑制剂"
         if requirements:
             user_request += f"，{requirements}"
         
-        user_msg = Msg(name="User", content=user_request, role="user")
-        designer_response = designer(user_msg)
-        
-        raw_response = designer_response.content
+        user_msg = message.Msg(name="User", content=user_request, role="user")
+        dedup = SmilesDeduplicator()
+        pipeline = build_discovery_pipeline(
+            model_name, target_name, use_cache=use_cache, dedup=dedup, parent_span=trace.root
+        )
+        scored = []
+        passed_molecules = []
+        evaluations = []
+        tables = "### ✅ 通过 ADMET 筛选的候选分子\n\n"
+        raw_response = ""
+        prose_lines = 0
+        first_scored_time = None
         
-        # 4. 解析 SMILES
-        progress(0.6, desc="解析 SMILES 结构...")
-        smiles_list = parse_smiles_from_response(raw_response)
+        # 设计 → 筛选 → 评估 各阶段同时运行：设计仍在输出时，已通过的分子就开始点评
+        async for event in pipeline.run(user_msg):
+            if event.kind == "designed":
+                raw_response = event.data["raw_response"]
+                prose_lines = event.data["parse_stats"].prose_lines
+                continue
+            if event.kind == "scored":
+                for result in event.data:
+                    scored.append(result)
+                    if result["passed"]:
+                        passed_molecules.append(result)
+                        tables += render_molecule_table(len(passed_molecules), result)
+                if first_scored_time is None:
+                    first_scored_time = event.elapsed
+                progress(0.6, desc="ADMET 筛选与专家点评中...")
+            elif event.kind == "output":
+                evaluations.append(event.data)
+            
+            evaluated = sum(len(evaluation["numbers"]) for evaluation in evaluations)
+            status = (
+                f"⏳ 正在生成...\n\n"
+                f"📊 已评估：{len(scored)} 个候选分子\n"
+                f"🔁 已去重：{dedup.duplicates} 个重复分子\n"
+                f"✅ 已通过：{len(passed_molecules)} 个\n"
+                f"🔬 专家已点评：{evaluated} 个"
+            )
+            if first_scored_time is not None:
+                status += f"\n⚡ 首个分子评分耗时：{first_scored_time:.2f} 秒"
+            yield status, render_smiles_list(scored), render_evaluation_panel(
+                tables, evaluations, evaluated < len(passed_molecules)
+            ), ""
         
-        if not smiles_list:
-            return (
+        trace.finish()
+        trace_summary = format_flame_summary(trace) if show_trace else ""
+        invalid = sum(1 for result in scored if not result["valid"])
+        record_generation(model_name, len(scored), len(passed_molecules), invalid, prose_lines)
+        if not scored:
+            request.outcome = "error"
+            yield (
                 "❌ 错误：未能从模型响应中提取有效的 SMILES",
                 raw_response,
-                "无法进行评估"
+                "无法进行评估",
+                trace_summary
             )
+            return
         
-        # 5. ADMET 筛选
-        progress(0.8, desc="进行 ADMET 筛选...")
-        passed_molecules = admet_filter(smiles_list, verbose=False)
-        
-        # 6. 格式化输出
-        progress(1.0, desc="完成！")
-        
-        # 状态信息
+        # 4. 格式化输出
         status = f"""
 ✅ 成功完成分子生成与评估
 
 📌 靶点：{target_name}
 🤖 模型：{model_name}
-📊 生成：{len(smiles_list)} 个候选分子
+📊 生成：{len(scored)} 个候选分子（去除 {dedup.duplicates} 个重复）
 ✅ 通过：{len(passed_molecules)} 个分子通过 ADMET 筛选
+⚡ 首个分子评分耗时：{first_scored_time:.2f} 秒
+⏱️ {format_stage_times(pipeline.stats())}
         """
         
-        # SMILES 列表
-        smiles_output = "### 生成的 SMILES 结构\n\n"
-        for idx, smi in enumerate(smiles_list, 1):
-            smiles_output += f"{idx}. `{smi}`\n"
-        
-        # 评估结果
+        # 5. 评估结果
         if passed_molecules:
-            eval_output = "### ✅ 通过 ADMET 筛选的候选分子\n\n"
-            
-            for idx, mol_data in enumerate(passed_molecules, 1):
-                props = mol_data['properties']
-                eval_output += f"""
-**分子 {idx}**: `{mol_data['smiles']}`
-
-| 指标 | 数值 | 状态 |
-|------|------|------|
-| 分子量 (MW) | {props['molecular_weight']:.1f} Da | {'✅' if props['molecular_weight'] < 500 else '⚠️'} |
-| 类药性 (QED) | {props['qed']:.3f} | {'✅' if props['qed'] > 0.6 else '⚠️'} |
-| LogP | {props['logp']:.2f} | {'✅' if 1 <= props['logp'] <= 5 else '⚠️'} |
-| TPSA | {props['tpsa']:.1f} Ų | {'✅' if props['tpsa'] < 140 else '⚠️'} |
-| 可旋转键 | {props['rotatable_bonds']} | {'✅' if props['rotatable_bonds'] < 10 else '⚠️'} |
-
----
-"""
-            
-            # 请 AI 专家点评
-            eval_prompt = f"请评估以下 {len(passed_molecules)} 个 {target_name} 抑制剂候选物：\n\n"
-            for idx, mol_data in enumerate(passed_molecules, 1):
-                props = mol_data['properties']
-                eval_prompt += f"分子 {idx}: {mol_data['smiles']}\n"
-                eval_prompt += f"- 分子量: {props['molecular_weight']:.1f} Da\n"
-                eval_prompt += f"- QED: {props['qed']:.2f}\n"
-                eval_prompt += f"- LogP: {props['logp']:.2f}\n\n"
-            
-            eval_msg = Msg(name="System", content=eval_prompt, role="user")
-            eval_response = evaluator(eval_msg)
-            
-            eval_output += f"\n### 🔬 ADMET 专家评估\n\n{eval_response.content}"
-            
+            eval_output = render_evaluation_panel(tables, evaluations, False)
         else:
             eval_output = "### ⚠️ 无分子通过筛选\n\n所有候选分子均未通过 ADMET 筛选。建议：\n- 放宽筛选条件\n- 调整生成要求\n- 重新生成"
         
-        return status, smiles_output, eval_output
+        progress(1.0, desc="完成！")
+        yield status, render_smiles_list(scored), eval_output, trace_summary
         
     except Exception as e:
-        return f"❌ 错误：{str(e)}", "", ""
+        trace.finish(error=e)
+        request.outcome = "error"
+        yield f"❌ 错误：{str(e)}", "", "", ""
+    finally:
+        # 取消（客户端断开或点击“停止”）时同样记录已完成的部分
+        trace.finish()
+
+
+def render_evaluation_panel(tables: str, evaluations: List[Dict], pending: bool) -> str:
+    """评估面板：通过筛选的分子表格 + 已完成的专家点评"""
+    if not evaluations and not pending:
+        return tables
+    panel = f"{tables}\n### 🔬 ADMET 专家评估\n\n{render_evaluations(evaluations)}"
+    if pending:
+        panel += "\n\n⏳ ADMET 专家评估中..."
+    return panel
 
 
 def create_demo():
@@ -204,12 +284,24 @@ def create_demo():
                     lines=2
                 )
                 
-                generate_btn = gr.Button(
-                    "🚀 生成候选分子",
-                    variant="primary",
-                    size="lg"
+                bypass_cache_input = gr.Checkbox(
+                    label="跳过缓存（强制重新生成）",
+                    value=False
+                )
+                
+                show_trace_input = gr.Checkbox(
+                    label="显示耗时分析",
+                    value=False
                 )
                 
+                with gr.Row():
+                    generate_btn = gr.Button(
+                        "🚀 生成候选分子",
+                        variant="primary",
+                        size="lg"
+                    )
+                    stop_btn = gr.Button("⏹️ 停止", size="lg")
+                
                 status_output = gr.Textbox(
                     label="状态",
                     lines=8,
@@ -224,16 +316,21 @@ def create_demo():
                 
                 with gr.Tab("ADMET 评估"):
                     eval_output = gr.Markdown()
+                
+                with gr.Tab("耗时分析"):
+                    trace_output = gr.Markdown()
         
         # 绑定事件
-        generate_btn.click(
+        generate_event = generate_btn.click(
             fn=generate_molecules,
-            inputs=[target_input, model_choice, requirements_input],
-            outputs=[status_output, smiles_output, eval_output]
+            inputs=[target_input, model_choice, requirements_input, bypass_cache_input, show_trace_input],
+            outputs=[status_output, smiles_output, eval_output, trace_output]
         )
+        # 取消排队中或进行中的请求，停止继续调用模型
+        stop_btn.click(fn=None, cancels=[generate_event])
         
         # 示例
-        gr.Markdown("""
+        gr.Markdown(f"""
 ---
 ### 💡 使用建议
 
@@ -242,7 +339,7 @@ def create_demo():
    - `qwen-max`：🇨🇳 阿里通义千问（中文优化）
    - `deepseek`：🧠 DeepSeek 3.2（推理能力强）
    - `gemini`：🔥 Gemini 3 Pro Preview（最新最强）
-3. **ADMET 筛选**：分子量<500、QED>0.6、LogP 1-5
+3. **ADMET 筛选**：{get_rule_set().summary()}
 
 **⚠️ 注意**：首次运行需配置 API Key（见 `config/model_config.json`）
         """)
@@ -251,12 +348,12 @@ def create_demo():
 
 
 if __name__ == "__main__":
+    config = parse_serving_args("LingNexus 图形界面", default_port=7860)
     demo = create_demo()
-    demo.launch(
-        server_name="127.0.0.1",
-        server_port=7860,
-        share=False,
-        show_error=True
+    print("\n✨ LingNexus 图形界面启动中...")
+    print(f"🌐 访问地址：http://{config.host}:{config.port}")
+    print(f"👥 同时处理 {config.concurrency} 个请求，最多排队 {config.max_queue} 个")
+    launch(  # 同时启用 Gradio 队列（流式刷新需要）
+        demo, config, gates=[request_gate],
+        warm_up=[initialize_agentscope, warm_up_chem_tools]
     )
-    print("\n✨ LingNexus 图形界面已启动！")
-    print("🌐 访问地址：http://127.0.0.1:7860")
@@ -9,69 +9,232 @@ except ImportError:
     print("错误：未安装 Gradio。请运行：pip install gradio")
     exit(1)
 
-import agentscope
-from agentscope.message import Msg
-from agents.molecule_designer import create_molecule_designer_agent
-from tools.chem_tools import admet_filter, calculate_molecular_properties
-import re
-import time
-from typing import List, Tuple, Dict
-
+from agents.workflow import build_discovery_pipeline, format_stage_times, render_evaluations
+from tools.admet_rules import get_rule_set
+from tools.chem_tools import screen_molecules, warm_up as warm_up_chem_tools
+from tools.columnar import ADMETTable
+from tools.standardize import SmilesDeduplicator
+from tools.lazy_imports import LazyModule
+from tools.metrics import REQUESTS, RequestTracker, record_generation, track_request
+from tools.tracing import Trace, format_flame_summary, start_span
+from serving import GateFull, RequestGate, format_queue_status, launch, parse_serving_args
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+
+# AgentScope 在首次使用时导入（启动后由后台预热完成，见 serving.launch）
+agentscope = LazyModule("agentscope")
+message = LazyModule("agentscope.message")
 
 # 初始化标志
 _initialized = False
+_init_lock = threading.Lock()
+
+# “开始对比”事件的请求闸门（并发数与排队上限在启动时按服务参数配置）
+request_gate = RequestGate("compare")
+
+# 对比报告中取平均值的描述符：规则集未用到时也要计算（admet_filter 只计算规则需要的描述符）
+REPORT_DESCRIPTORS = ("molecular_weight", "qed", "logp")
 
 
 def initialize_agentscope():
-    """初始化 AgentScope（只执行一次）"""
+    """初始化 AgentScope（只执行一次；后台预热与请求可能同时调用）"""
     global _initialized
-    if not _initialized:
-        agentscope.init(
-            model_configs="./config/model_config.json",
-            project="LingNexus",
-            save_code=False,
-            save_api_invoke=False,
-        )
-        _initialized = True
+    with _init_lock:
+        if not _initialized:
+            agentscope.init(
+                model_configs="./config/model_config.json",
+                project="LingNexus",
+                save_code=False,
+                save_api_invoke=False,
+            )
+            _initialized = True
+
+
+class SharedScreening:
+    """多个模型共享的 ADMET 筛选结果：相同的规范 SMILES 只打分一次"""
+    
+    def __init__(self):
+        self._results: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.reused = 0
+    
+    def results(self, molecules: List[Tuple[str, Any]]) -> List[Dict]:
+        """筛选已去重的 (规范 SMILES, Mol) 列表，其他模型已评过的分子直接复用结果"""
+        # 打分只需几十毫秒，持锁计算可保证并发完成的模型不会重复打分
+        with self._lock:
+            missing = [item for item in molecules if item[0] not in self._results]
+            self.reused += len(molecules) - len(missing)
+            for result in screen_molecules(missing, extra_descriptors=REPORT_DESCRIPTORS):
+                self._results[result["smiles"]] = result
+            return [self._results[smi] for smi, _ in molecules]
+    
+    def screen(self, smiles_list: List[str]) -> ADMETTable:
+        """已经由 results 筛选过的分子的列式结果（不计入 reused）"""
+        with self._lock:
+            return ADMETTable.from_results([self._results[smi] for smi in smiles_list])
 
 
-def parse_smiles_from_response(response_text: str) -> List[str]:
-    """从智能体响应中提取 SMILES"""
-    lines = response_text.strip().split('\n')
-    smiles_list = []
+async def run_single_model(
+    model_name: str,
+    target_name: str,
+    user_request: str,
+    use_cache: bool = True,
+    screening: Optional[SharedScreening] = None,
+    evaluate: bool = True,
+    parent_span=None
+) -> Dict:
+    """运行单个模型的 设计 → 筛选 → 评估 流水线（多个模型的流水线并发执行）
     
-    for line in lines:
-        line = line.strip()
-        if not line or '请提供' in line or len(line) < 5:
-            continue
-        line = re.sub(r'^[\d\-\.\)]+\s*', '', line)
-        
-        if line and not line.startswith(('#', '//')):
-            smiles_list.append(line)
+    Args:
+        target_name: 靶点名称（用于评估提示）
+        use_cache: 是否使用响应缓存（False 时强制重新调用模型）
+        screening: 多个模型共享的筛选结果，默认只在本模型内复用
+        evaluate: 是否调用 ADMET 评估智能体点评通过的分子
+        parent_span: 追踪时的父 Span（见 tools.tracing）
     
-    return smiles_list
+    Returns:
+        Dict: 该模型的统计结果，generation_time 只计入本模型设计智能体的
+            调用耗时（含排队）；生成数与通过率按去重后的分子计算
+    """
+    try:
+        screening = screening or SharedScreening()
+        dedup = SmilesDeduplicator()
+        pipeline = build_discovery_pipeline(
+            model_name, target_name, use_cache=use_cache,
+            screen=screening.results, dedup=dedup, evaluate=evaluate, parent_span=parent_span
+        )
+        
+        # 设计智能体流式输出的同时筛选，通过的分子按小批交给评估智能体
+        user_msg = message.Msg(name="User", content=user_request, role="user")
+        designed = {}
+        smiles_list = []
+        invalid = 0
+        evaluations = []
+        async for event in pipeline.run(user_msg):
+            if event.kind == "designed":
+                designed = event.data
+            elif event.kind == "scored":
+                smiles_list.extend(result["smiles"] for result in event.data)
+                invalid += sum(1 for result in event.data if not result["valid"])
+            elif event.kind == "output":
+                evaluations.append(event.data)
+        
+        if not smiles_list:
+            record_generation(model_name, 0, 0, 0, designed["parse_stats"].prose_lines if designed else 0)
+            return {
+                "success": False,
+                "error": "无法提取 SMILES",
+                "raw_response": designed.get("raw_response", "")
+            }
+        
+        # 列式结果（各分子已打过分，直接复用），统计量向量化计算
+        table = await asyncio.to_thread(screening.screen, smiles_list)
+        passed_molecules = table.to_records()
+        parse_stats = designed["parse_stats"]
+        record_generation(model_name, len(smiles_list), len(passed_molecules), invalid, parse_stats.prose_lines)
+        
+        # 计算统计
+        pass_rate = len(passed_molecules) / len(smiles_list) * 100 if smiles_list else 0
+        avg_mw = table.mean("molecular_weight", table.passed)
+        avg_qed = table.mean("qed", table.passed)
+        avg_logp = table.mean("logp", table.passed)
+        
+        return {
+            "success": True,
+            "generated_count": len(smiles_list),
+            "duplicate_count": dedup.duplicates,
+            "passed_count": len(passed_molecules),
+            "pass_rate": pass_rate,
+            "generation_time": designed["latency"],
+            "cached": designed["cached"],
+            "parse_quality": parse_stats.quality,
+            "parse_stats": parse_stats.as_dict(),
+            "smiles_list": smiles_list,
+            "passed_molecules": passed_molecules,
+            "avg_mw": avg_mw,
+            "avg_qed": avg_qed,
+            "avg_logp": avg_logp,
+            "evaluation": render_evaluations(evaluations),
+            "pipeline_time": format_stage_times(pipeline.stats()),
+            "raw_response": designed["raw_response"]
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
 
 
-def compare_models_ui(
+async def compare_models_ui(
     target_name: str,
     model1: str,
     model2: str,
     requirements: str,
+    bypass_cache: bool = False,
+    show_trace: bool = False,
     progress=gr.Progress()
-) -> Tuple[str, str, str]:
+) -> AsyncIterator[Tuple[str, str, str]]:
     """图形界面：对比两个模型的分子生成能力
     
-    Returns:
+    请求先经过 request_gate 排队（报告区显示排队位置与预计等待），放行后
+    各模型的 设计 → 筛选 → 评估 流水线同时运行，总耗时约等于最慢的单个模型；
+    每个模型完成后立即刷新其详情面板。用户关闭页面或点击“停止”时未完成的
+    调用被取消。
+    
+    Args:
+        bypass_cache: 为 True 时跳过响应缓存，强制重新调用模型
+        show_trace: 为 True 时在对比报告末尾附上本次请求的耗时分析（见 tools.tracing）
+    
+    Yields:
         Tuple[str, str, str]: (对比报告, 模型1结果, 模型2结果)
     """
     
     if not target_name.strip():
-        return "❌ 错误：请输入靶点名称", "", ""
+        yield "❌ 错误：请输入靶点名称", "", ""
+        return
+    
+    try:
+        async with request_gate.ticket() as ticket:
+            async for position, eta in ticket.wait():
+                yield format_queue_status(position, eta), "", ""
+            with track_request("compare", *dict.fromkeys([model1, model2])) as request:
+                outputs = _compare_models(
+                    target_name, model1, model2, requirements, bypass_cache, show_trace, request, progress
+                )
+                try:
+                    async for output in outputs:
+                        yield output
+                finally:
+                    # 客户端断开时立即停止内层流水线，而不是等待垃圾回收
+                    await outputs.aclose()
+    except GateFull as e:
+        REQUESTS.labels("compare", "rejected").inc()
+        yield f"❌ {e}", "", ""
+
+
+async def _compare_models(
+    target_name: str,
+    model1: str,
+    model2: str,
+    requirements: str,
+    bypass_cache: bool,
+    show_trace: bool,
+    request: RequestTracker,
+    progress
+) -> AsyncIterator[Tuple[str, str, str]]:
+    """compare_models_ui 获得放行后的处理过程（失败时将 request.outcome 记为 error）"""
     
+    # 本次请求的追踪：结束时导出到 LINGNEXUS_TRACE_FILE（若已设置）
+    trace = Trace("compare_models", models=f"{model1},{model2}", target=target_name)
     try:
         # 初始化
         progress(0.05, desc="初始化 AgentScope...")
-        initialize_agentscope()
+        init_span = start_span("agentscope.init", parent=trace.root)
+        await asyncio.to_thread(initialize_agentscope)  # 未预热完成时导入较慢，不阻塞事件循环
+        init_span.end()
         
         # 准备请求
         user_request = f"设计 {target_name} 抑制剂"
@@ -80,83 +243,54 @@ def compare_models_ui(
         
         models = [model1, model2]
         results = {}
-        
-        # 测试每个模型
-        for idx, model_name in enumerate(models):
-            progress_val = 0.1 + (idx * 0.4)
-            progress(progress_val, desc=f"正在测试 {model_name.upper()}...")
-            
-            try:
-                # 创建智能体
-                designer = create_molecule_designer_agent(model_config_name=model_name)
-                
-                # 生成分子
-                start_time = time.time()
-                user_msg = Msg(name="User", content=user_request, role="user")
-                designer_response = designer(user_msg)
-                end_time = time.time()
-                
-                generation_time = end_time - start_time
-                
-                # 解析 SMILES
-                smiles_list = parse_smiles_from_response(designer_response.content)
-                
-                if not smiles_list:
-                    results[model_name] = {
-                        "success": False,
-                        "error": "无法提取 SMILES",
-                        "raw_response": designer_response.content
-                    }
-                    continue
-                
-                # ADMET 评估
-                passed_molecules = admet_filter(smiles_list, verbose=False)
-                
-                # 计算统计
-                pass_rate = len(passed_molecules) / len(smiles_list) * 100 if smiles_list else 0
-                
-                if passed_molecules:
-                    avg_mw = sum(m['properties']['molecular_weight'] for m in passed_molecules) / len(passed_molecules)
-                    avg_qed = sum(m['properties']['qed'] for m in passed_molecules) / len(passed_molecules)
-                    avg_logp = sum(m['properties']['logp'] for m in passed_molecules) / len(passed_molecules)
-                else:
-                    avg_mw = avg_qed = avg_logp = 0
-                
-                results[model_name] = {
-                    "success": True,
-                    "generated_count": len(smiles_list),
-                    "passed_count": len(passed_molecules),
-                    "pass_rate": pass_rate,
-                    "generation_time": generation_time,
-                    "smiles_list": smiles_list,
-                    "passed_molecules": passed_molecules,
-                    "avg_mw": avg_mw,
-                    "avg_qed": avg_qed,
-                    "avg_logp": avg_logp,
-                    "raw_response": designer_response.content
-                }
+        details = {
+            model_name: f"⏳ {model_name.upper()} 正在生成分子..."
+            for model_name in models
+        }
+        
+        # 并发测试每个模型（相同模型只运行一次）
+        unique_models = list(dict.fromkeys(models))
+        progress(0.1, desc=f"正在并发测试 {', '.join(m.upper() for m in unique_models)}...")
+        
+        # 各模型生成的分子取并集后只打分一次
+        screening = SharedScreening()
+        
+        async def run(model_name: str) -> Tuple[str, Dict]:
+            return model_name, await run_single_model(
+                model_name, target_name, user_request, not bypass_cache, screening, parent_span=trace.root
+            )
+        
+        tasks = [asyncio.ensure_future(run(model_name)) for model_name in unique_models]
+        try:
+            for done_count, next_done in enumerate(asyncio.as_completed(tasks), 1):
+                model_name, results[model_name] = await next_done
+                details[model_name] = generate_model_detail(model_name, results[model_name])
                 
-            except Exception as e:
-                results[model_name] = {
-                    "success": False,
-                    "error": str(e)
-                }
-        
-        progress(0.95, desc="生成对比报告...")
+                progress(0.1 + 0.85 * done_count / len(unique_models), desc=f"{model_name.upper()} 已完成")
+                pending = [m.upper() for m in unique_models if m not in results]
+                waiting = f"⏳ 等待 {', '.join(pending)} 完成..." if pending else "⏳ 生成对比报告..."
+                yield waiting, details[model1], details[model2]
+        finally:
+            for task in tasks:
+                task.cancel()
         
         # 生成对比报告
         report = generate_comparison_report(target_name, models, results)
-        
-        # 生成详细结果
-        model1_detail = generate_model_detail(model1, results.get(model1, {}))
-        model2_detail = generate_model_detail(model2, results.get(model2, {}))
+        trace.finish()
+        if show_trace:
+            report += f"\n\n---\n\n## ⏱️ 耗时分析\n\n{format_flame_summary(trace)}\n"
         
         progress(1.0, desc="完成！")
         
-        return report, model1_detail, model2_detail
+        yield report, details[model1], details[model2]
         
     except Exception as e:
-        return f"❌ 错误：{str(e)}", "", ""
+        trace.finish(error=e)
+        request.outcome = "error"
+        yield f"❌ 错误：{str(e)}", "", ""
+    finally:
+        # 取消（客户端断开或点击“停止”）时同样记录已完成的部分
+        trace.finish()
 
 
 def generate_comparison_report(target_name: str, models: List[str], results: Dict) -> str:
@@ -212,6 +346,12 @@ def generate_comparison_report(target_name: str, models: List[str], results: Dic
         winner2 = "🏆" if r2['generation_time'] < r1['generation_time'] else ""
         report += f"| 生成速度(秒) | {r1['generation_time']:.2f} {winner} | {r2['generation_time']:.2f} {winner2} | {models[0].upper() if winner else models[1].upper()} |\n"
         
+        shared = set(r1['smiles_list']) & set(r2['smiles_list']) if models[0] != models[1] else set()
+        report += f"\n🔁 已去除重复分子：{models[0].upper()} {r1['duplicate_count']} 个，{models[1].upper()} {r2['duplicate_count']} 个"
+        if shared:
+            report += f"；两个模型共同生成 {len(shared)} 个相同分子（只评分一次）"
+        report += "\n"
+        
         report += "\n---\n\n"
         
         # 输出格式质量
@@ -219,19 +359,16 @@ def generate_comparison_report(target_name: str, models: List[str], results: Dic
         
         for model_name in models:
             r = results[model_name]
-            raw_text = r['raw_response']
-            
-            has_explanation = any(keyword in raw_text for keyword in 
-                                 ['分子', '抑制剂', '设计', '具有', '该', '这', '可以', 'The', 'This'])
-            has_numbering = bool(re.search(r'^\d+[\.\)、]', raw_text, re.MULTILINE))
+            quality = r['parse_quality']
             
             report += f"**{model_name.upper()}**: "
-            if not has_explanation and not has_numbering:
-                report += "✅ 优秀（纯 SMILES，无解释）\n\n"
-            elif not has_explanation:
-                report += "⚠️ 良好（有编号，但无解释）\n\n"
+            if quality >= 0.95:
+                report += "✅ 优秀（纯 SMILES，无解释）"
+            elif r['parse_stats']['prose_lines'] == 0:
+                report += "⚠️ 良好（有编号或标记，但无解释）"
             else:
-                report += "⚠️ 一般（包含解释性文字）\n\n"
+                report += "⚠️ 一般（包含解释性文字）"
+            report += f"，格式评分 {quality * 100:.0f}/100\n\n"
         
         report += "---\n\n"
         
@@ -307,10 +444,11 @@ def generate_model_detail(model_name: str, result: Dict) -> str:
 
 ## 📊 统计信息
 
-- **生成分子数**: {result['generated_count']}
+- **生成分子数**: {result['generated_count']}（已去除 {result['duplicate_count']} 个重复）
 - **通过筛选数**: {result['passed_count']}
 - **通过率**: {result['pass_rate']:.1f}%
-- **生成耗时**: {result['generation_time']:.2f} 秒
+- **生成耗时**: {result['generation_time']:.2f} 秒{'（命中缓存）' if result.get('cached') else ''}
+- **流水线**: {result['pipeline_time']}
 
 ---
 
@@ -324,21 +462,14 @@ def generate_model_detail(model_name: str, result: Dict) -> str:
     detail += "\n---\n\n## ✅ 通过 ADMET 筛选的分子\n\n"
     
     if result['passed_molecules']:
+        rule_set = get_rule_set()
         for idx, mol_data in enumerate(result['passed_molecules'], 1):
-            props = mol_data['properties']
             detail += f"""
 ### 分子 {idx}
 
 **SMILES**: `{mol_data['smiles']}`
 
-| 指标 | 数值 | 状态 |
-|------|------|------|
-| 分子量 (MW) | {props['molecular_weight']:.1f} Da | {'✅' if props['molecular_weight'] < 500 else '⚠️'} |
-| 类药性 (QED) | {props['qed']:.3f} | {'✅' if props['qed'] > 0.6 else '⚠️'} |
-| LogP | {props['logp']:.2f} | {'✅' if 1 <= props['logp'] <= 5 else '⚠️'} |
-| TPSA | {props['tpsa']:.1f} Ų | {'✅' if props['tpsa'] < 140 else '⚠️'} |
-| 可旋转键 | {props['rotatable_bonds']} | {'✅' if props['rotatable_bonds'] < 10 else '⚠️'} |
-
+{rule_set.render_markdown_table(mol_data['properties'])}
 ---
 """
         
@@ -350,6 +481,9 @@ def generate_model_detail(model_name: str, result: Dict) -> str:
 - **平均类药性**: {result['avg_qed']:.3f}
 - **平均 LogP**: {result['avg_logp']:.2f}
 """
+        
+        if result.get('evaluation'):
+            detail += f"\n---\n\n## 🔬 ADMET 专家评估\n\n{result['evaluation']}\n"
     else:
         detail += "\n⚠️ 没有分子通过 ADMET 筛选\n"
     
@@ -404,13 +538,25 @@ def create_demo():
                     lines=2
                 )
                 
-                compare_btn = gr.Button(
-                    "🔬 开始对比",
-                    variant="primary",
-                    size="lg"
+                bypass_cache_input = gr.Checkbox(
+                    label="跳过缓存（强制重新生成）",
+                    value=False
                 )
                 
-                gr.Markdown("""
+                show_trace_input = gr.Checkbox(
+                    label="显示耗时分析",
+                    value=False
+                )
+                
+                with gr.Row():
+                    compare_btn = gr.Button(
+                        "🔬 开始对比",
+                        variant="primary",
+                        size="lg"
+                    )
+                    stop_btn = gr.Button("⏹️ 停止", size="lg")
+                
+                gr.Markdown(f"""
 ---
 ### 💡 使用提示
 
@@ -424,6 +570,7 @@ def create_demo():
    - Qwen-Max vs DeepSeek（国产双雄）
    - DeepSeek vs Gemini（推理对决）·
 4. **对比维度**：通过率、QED、速度、输出格式
+5. **ADMET 筛选**：{get_rule_set().summary()}
                 """)
         
             with gr.Column(scale=2):
@@ -439,11 +586,13 @@ def create_demo():
                     model2_detail = gr.Markdown()
         
         # 绑定事件
-        compare_btn.click(
+        compare_event = compare_btn.click(
             fn=compare_models_ui,
-            inputs=[target_input, model1_choice, model2_choice, requirements_input],
+            inputs=[target_input, model1_choice, model2_choice, requirements_input, bypass_cache_input, show_trace_input],
             outputs=[report_output, model1_detail, model2_detail]
         )
+        # 取消排队中或进行中的对比，停止继续调用模型
+        stop_btn.click(fn=None, cancels=[compare_event])
         
         # 示例
         gr.Markdown("""
@@ -463,12 +612,12 @@ def create_demo():
 
 
 if __name__ == "__main__":
+    config = parse_serving_args("LingNexus 模型对比工具", default_port=7861)  # 默认使用不同端口避免冲突
     demo = create_demo()
-    demo.launch(
-        server_name="127.0.0.1",
-        server_port=7861,  # 使用不同端口避免冲突
-        share=False,
-        show_error=True
+    print("\n✨ LingNexus 模型对比工具启动中...")
+    print(f"🌐 访问地址：http://{config.host}:{config.port}")
+    print(f"👥 同时处理 {config.concurrency} 个对比，最多排队 {config.max_queue} 个")
+    launch(  # 同时启用 Gradio 队列（流式刷新需要）
+        demo, config, gates=[request_gate],
+        warm_up=[initialize_agentscope, warm_up_chem_tools]
     )
-    print("\n✨ LingNexus 模型对比工具已启动！")
-    print("🌐 访问地址：http://127.0.0.1:7861")
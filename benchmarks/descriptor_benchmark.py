@@ -0,0 +1,547 @@
+"""化学热路径微基准测试（描述符 / PAINS / ADMET 筛选）
+
+在固定的 SMILES 语料（1k / 100k / 1M，由固定随机种子从片段拼接生成，
+重原子数从小分子片段到 60+ 的大分子都有，并混入约 0.5% 的无效 SMILES）上测量：
+- parse：Chem.MolFromSmiles
+- descriptor.<名称>：注册表中每个描述符单独的耗时（依赖已预先算好；RDKit 在 Mol 上
+  缓存的中间结果如 Crippen 原子贡献，由先计算的 logp 承担，molar_refractivity 直接复用）
+- pains：PAINS 结构警示匹配
+- admet.serial / admet.parallel / admet.cached / admet.cascade：
+  admet_filter 端到端（串行无缓存、多进程、预热后的描述符缓存、级联早停）
+
+每个用例在独立子进程中运行，报告分子/秒（多次重复取最快一次）和峰值 RSS
+（含子进程）。指定 --output 时结果写入 JSON/CSV；--baseline 指定之前保存的 JSON 结果时逐项
+对比，吞吐量下降或峰值 RSS 增长超过容差即判为性能回退，脚本以退出码 1 结束。
+
+用法：
+    python -m benchmarks.descriptor_benchmark --sizes 1k 100k --repeats 3 --output descriptor_bench.json
+    python -m benchmarks.descriptor_benchmark --sizes 1k 100k --baseline descriptor_bench.json
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+CASES = ("parse", "descriptors", "pains", "admet.serial", "admet.parallel", "admet.cached", "admet.cascade")
+
+# 解析与描述符用例分块处理，内存占用不随语料大小增长
+CHUNK_SIZE = 10_000
+
+DEFAULT_SEED = 20240501
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "lingnexus_bench")
+
+# 语料片段：首片段的最后一个原子、连接片段的首尾原子、末片段的首个原子各留有一个空余价键，
+# 因此任意拼接都是合法的 SMILES；环编号在片段内闭合，可在片段之间重复使用
+START_FRAGMENTS = (
+    "C", "CC", "CO", "Cl", "F", "N#C", "FC(F)(F)", "CC(C)", "OC(=O)", "CN(C)", "COc1ccccc1", "Cc1ccccc1"
+)
+LINKER_FRAGMENTS = (
+    "c1ccc(cc1)", "c1cccc(c1)", "c1ccncc1", "c1cnc(nc1)", "c1nc(sc1)", "c1ccc2ccccc2c1", "c1ccc2[nH]ccc2c1",
+    "C1CCN(CC1)", "N1CCN(CC1)", "C1CCOCC1", "C1CC1", "C(=O)N", "NC(=O)", "C(=O)", "O", "N", "S", "CC",
+    "CCC", "C=C", "C#C", "OCCO", "S(=O)(=O)N", "C(=S)N", "C=NN", "N=N",
+    # 常见的 PAINS 结构片段（儿茶酚、二烷基苯胺、对羟基苯乙烯），使 PAINS 用例有命中
+    "c1ccc(O)c(O)c1", "c1cc(N(C)C)ccc1", "C=Cc1ccc(O)cc1"
+)
+END_FRAGMENTS = (
+    "C", "F", "Cl", "Br", "O", "N", "C(F)(F)F", "C#N", "C(=O)O", "C(=O)N", "S(=O)(=O)C", "OC", "N(C)C",
+    "c1ccccc1", "c1ccncc1"
+)
+# 分子大小分布：(权重, 最少连接片段数, 最多连接片段数)
+SIZE_MIX = ((0.25, 0, 1), (0.60, 2, 5), (0.15, 6, 12))
+INVALID_RATE = 0.005
+
+
+def parse_size(text: str) -> int:
+    """解析语料大小，如 "1k"、"100k"、"1M"、"5000" """
+    text = text.strip()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:].lower(), 1)
+    number = text[:-1] if scale > 1 else text
+    try:
+        size = int(float(number) * scale)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的语料大小: {text}（示例：1k、100k、1M）")
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"语料大小必须为正数: {text}")
+    return size
+
+
+def format_size(size: int) -> str:
+    for scale, suffix in ((1_000_000, "M"), (1_000, "k")):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{suffix}"
+    return str(size)
+
+
+def generate_corpus(size: int, seed: int = DEFAULT_SEED) -> Iterator[str]:
+    """生成确定性的 SMILES 语料（同一 size 与 seed 总是得到相同序列）"""
+    rng = random.Random(f"{seed}:{size}")
+    weights = [weight for weight, _, _ in SIZE_MIX]
+    for _ in range(size):
+        _, low, high = rng.choices(SIZE_MIX, weights)[0]
+        linkers = rng.choices(LINKER_FRAGMENTS, k=rng.randint(low, high))
+        smiles = rng.choice(START_FRAGMENTS) + "".join(linkers) + rng.choice(END_FRAGMENTS)
+        if rng.random() < INVALID_RATE:
+            # 未闭合的环或分支
+            smiles += rng.choice(("1", "("))
+        yield smiles
+
+
+def ensure_corpus(size: int, seed: int = DEFAULT_SEED, corpus_dir: str = DEFAULT_CORPUS_DIR) -> Tuple[str, str]:
+    """生成（或复用已生成的）语料文件
+
+    Returns:
+        Tuple: (文件路径, 内容的 SHA-256)
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    path = os.path.join(corpus_dir, f"corpus_{format_size(size)}_{seed}.smi")
+    if not os.path.exists(path):
+        partial = path + ".part"
+        with open(partial, "w", encoding="utf-8") as f:
+            for smiles in generate_corpus(size, seed):
+                f.write(smiles + "\n")
+        os.replace(partial, path)
+    return path, file_sha256(path)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_corpus(path: str) -> Iterator[str]:
+    """逐行读取语料（跳过空行与 # 注释；.smi 中 SMILES 之后的名称列被忽略）"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line.split()[0]
+
+
+def _chunks(path: str) -> Iterator[List[str]]:
+    chunk = []
+    for smiles in read_corpus(path):
+        chunk.append(smiles)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def peak_rss_mb() -> Optional[float]:
+    """本进程与已结束子进程中最大的峰值 RSS（MB），不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Linux 的 ru_maxrss 单位为 KB，macOS 为字节
+    unit = 1 if sys.platform == "darwin" else 1024
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    return peak * unit / (1 << 20)
+
+
+# ---------------------------------------------------------------------------
+# 用例（在子进程中运行）：返回 {结果名称: (分子数, 耗时秒数)} 以及附加信息
+# ---------------------------------------------------------------------------
+
+def _case_parse(path: str, options: Dict[str, Any]) -> Tuple[Dict[str, Tuple[int, float]], Dict[str, Any]]:
+    from rdkit import Chem
+
+    total = 0
+    elapsed = 0.0
+    heavy_atoms = []
+    for chunk in _chunks(path):
+        began = time.perf_counter()
+        mols = [Chem.MolFromSmiles(smiles) for smiles in chunk]
+        elapsed += time.perf_counter() - began
+        total += len(chunk)
+        heavy_atoms.extend(mol.GetNumHeavyAtoms() for mol in mols if mol is not None)
+    sizes = np.asarray(heavy_atoms, dtype=np.int32)
+    corpus = {
+        "molecules": total,
+        "valid": len(heavy_atoms),
+        "heavy_atoms_p5_p50_p95": [float(v) for v in np.percentile(sizes, (5, 50, 95))] if len(sizes) else [],
+        "heavy_atoms_max": int(sizes.max()) if len(sizes) else 0
+    }
+    return {"parse": (total, elapsed)}, {"corpus": corpus}
+
+
+def _parsed_chunks(path: str) -> Iterator[list]:
+    from rdkit import Chem
+
+    for chunk in _chunks(path):
+        yield [mol for mol in map(Chem.MolFromSmiles, chunk) if mol is not None]
+
+
+def _case_descriptors(path: str, options: Dict[str, Any]) -> Tuple[Dict[str, Tuple[int, float]], Dict[str, Any]]:
+    from tools.descriptors import get_descriptor_registry
+
+    registry = get_descriptor_registry()
+    # 按依赖顺序逐个计算，计算某个描述符时其依赖已在 values 中，计时只包含它自身
+    order = registry.resolve(registry.names())
+    timings = {name: 0.0 for name in order}
+    total = 0
+    for mols in _parsed_chunks(path):
+        values = [{} for _ in mols]
+        for name in order:
+            began = time.perf_counter()
+            for mol, known in zip(mols, values):
+                registry.evaluate(mol, name, known)
+            timings[name] += time.perf_counter() - began
+        total += len(mols)
+    return {f"descriptor.{name}": (total, seconds) for name, seconds in timings.items()}, {}
+
+
+def _case_pains(path: str, options: Dict[str, Any]) -> Tuple[Dict[str, Tuple[int, float]], Dict[str, Any]]:
+    from tools.structural_alerts import find_structural_alerts, get_filter_catalog
+
+    get_filter_catalog(("PAINS",))  # 目录构建是一次性开销，不计入
+    total = 0
+    hits = 0
+    elapsed = 0.0
+    for mols in _parsed_chunks(path):
+        began = time.perf_counter()
+        hits += sum(1 for mol in mols if find_structural_alerts(mol, ("PAINS",)))
+        elapsed += time.perf_counter() - began
+        total += len(mols)
+    return {"pains": (total, elapsed)}, {"pains_hit_rate": hits / total if total else 0.0}
+
+
+def _admet_case(name: str, **kwargs: Any) -> Callable:
+    def run(path: str, options: Dict[str, Any]) -> Tuple[Dict[str, Tuple[int, float]], Dict[str, Any]]:
+        from tools.chem_tools import admet_filter
+
+        began = time.perf_counter()
+        passed = admet_filter(read_corpus(path), verbose=False, **kwargs, **options.get(name, {}))
+        elapsed = time.perf_counter() - began
+        return {name: (options["molecules"], elapsed)}, {"passed": len(passed)}
+    return run
+
+
+CASE_FUNCS = {
+    "parse": _case_parse,
+    "descriptors": _case_descriptors,
+    "pains": _case_pains,
+    "admet.serial": _admet_case("admet.serial", use_cache=False),
+    "admet.parallel": _admet_case("admet.parallel", use_cache=False),
+    "admet.cached": _admet_case("admet.cached", use_cache=True),
+    "admet.cascade": _admet_case("admet.cascade", use_cache=False, cascade=True)
+}
+
+
+def run_case_in_process(case: str, path: str, molecules: int, repeats: int, workers: int) -> Dict[str, Any]:
+    """在当前进程中运行一个用例 repeats 次，每个结果取最快一次"""
+    options: Dict[str, Any] = {"molecules": molecules, "admet.parallel": {"workers": workers}}
+
+    cache_dir = None
+    if case == "admet.cached":
+        from tools.chem_tools import admet_filter
+        from tools.descriptor_cache import configure_descriptor_cache
+
+        # 独立的缓存文件，预热一遍后再计时（只测命中路径，不受已有缓存内容影响）
+        cache_dir = tempfile.TemporaryDirectory(prefix="lingnexus_bench_cache_")
+        configure_descriptor_cache(path=os.path.join(cache_dir.name, "descriptors.sqlite3"))
+        admet_filter(read_corpus(path), verbose=False, use_cache=True)
+
+    best: Dict[str, Tuple[int, float]] = {}
+    extra: Dict[str, Any] = {}
+    try:
+        for _ in range(repeats):
+            results, extra = CASE_FUNCS[case](path, options)
+            for name, (count, seconds) in results.items():
+                if name not in best or seconds < best[name][1]:
+                    best[name] = (count, seconds)
+    finally:
+        if cache_dir is not None:
+            from tools.descriptor_cache import configure_descriptor_cache
+
+            configure_descriptor_cache(enabled=False)
+            cache_dir.cleanup()
+
+    return {
+        "results": [
+            {"case": name, "molecules": count, "seconds": seconds,
+             "mol_per_s": count / seconds if seconds > 0 else float("inf")}
+            for name, (count, seconds) in best.items()
+        ],
+        "peak_rss_mb": peak_rss_mb(),
+        "extra": extra
+    }
+
+
+def run_case(case: str, path: str, molecules: int, repeats: int, workers: int) -> Dict[str, Any]:
+    """在独立子进程中运行用例，使峰值 RSS 只反映该用例"""
+    with tempfile.TemporaryDirectory(prefix="lingnexus_bench_") as tmp:
+        result_file = os.path.join(tmp, "result.json")
+        command = [
+            sys.executable, "-m", "benchmarks.descriptor_benchmark",
+            "--run-case", case, "--corpus", path, "--result-file", result_file,
+            "--repeats", str(repeats), "--workers", str(workers), "--molecules", str(molecules)
+        ]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0 or not os.path.exists(result_file):
+            tail = (completed.stderr.strip().splitlines() or ["（无输出）"])[-1]
+            raise RuntimeError(f"用例 {case} 运行失败：{tail}")
+        with open(result_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _rdkit_version() -> str:
+    try:
+        from rdkit import rdBase
+        return rdBase.rdkitVersion
+    except ImportError:
+        return "unknown"
+
+
+def run_benchmark(
+    sizes: Sequence[int],
+    cases: Sequence[str] = CASES,
+    repeats: int = 3,
+    workers: int = 0,
+    seed: int = DEFAULT_SEED,
+    corpus_dir: str = DEFAULT_CORPUS_DIR,
+    corpus_file: Optional[str] = None
+) -> Dict[str, Any]:
+    """对每个语料运行全部用例
+
+    Args:
+        sizes: 语料大小（corpus_file 给定时忽略）
+        cases: 要运行的用例（见 CASES）
+        repeats: 每个用例的重复次数，取最快一次
+        workers: admet.parallel 的进程数，0 表示全部 CPU 核心
+        seed: 语料随机种子
+        corpus_dir: 生成的语料文件的保存目录
+        corpus_file: 使用已有的 SMILES 文件代替生成的语料
+
+    Returns:
+        Dict: 运行参数、每个语料的信息以及 summary（每行一个 语料 × 结果）
+    """
+    if corpus_file:
+        count = sum(1 for _ in read_corpus(corpus_file))
+        corpora = [(os.path.basename(corpus_file), corpus_file, file_sha256(corpus_file), count)]
+    else:
+        corpora = []
+        for size in sizes:
+            print(f"📦 准备语料 {format_size(size)} ...")
+            path, digest = ensure_corpus(size, seed, corpus_dir)
+            corpora.append((format_size(size), path, digest, size))
+
+    start_time = time.perf_counter()
+    summary = []
+    corpus_info = {}
+    for label, path, digest, count in corpora:
+        corpus_info[label] = {"path": path, "sha256": digest, "molecules": count}
+        for case in cases:
+            print(f"⏱️  {label} × {case} ...", flush=True)
+            result = run_case(case, path, count, repeats, workers)
+            corpus_info[label].update(result["extra"].get("corpus", {}))
+            for key, value in result["extra"].items():
+                if key != "corpus":
+                    corpus_info[label][f"{case}.{key}"] = value
+            for row in result["results"]:
+                summary.append({"corpus": label, **row, "peak_rss_mb": result["peak_rss_mb"]})
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        "params": {
+            "sizes": [label for label, _, _, _ in corpora],
+            "cases": list(cases),
+            "repeats": repeats,
+            "workers": workers or os.cpu_count() or 1,
+            "seed": seed,
+            "rdkit_version": _rdkit_version(),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU"
+        },
+        "wall_time": wall_time,
+        "corpora": corpus_info,
+        "summary": summary
+    }
+
+
+def compare_with_baseline(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = 0.15,
+    rss_tolerance: float = 0.25
+) -> List[Dict[str, Any]]:
+    """逐项对比吞吐量与峰值 RSS
+
+    只对比语料内容（SHA-256）相同的结果；语料不同的行 status 为 "corpus changed"。
+
+    Returns:
+        List[Dict]: 每行包含 corpus、case、baseline/current 的分子/秒与峰值 RSS、
+            变化比例以及 status（ok / regression / improved / new / corpus changed）
+    """
+    base_rows = {(row["corpus"], row["case"]): row for row in baseline.get("summary", [])}
+    base_corpora = baseline.get("corpora", {})
+
+    rows = []
+    for row in report["summary"]:
+        key = (row["corpus"], row["case"])
+        base = base_rows.get(key)
+        entry = {
+            "corpus": row["corpus"], "case": row["case"],
+            "baseline_mol_per_s": None, "current_mol_per_s": row["mol_per_s"], "speed_change": None,
+            "baseline_rss_mb": None, "current_rss_mb": row["peak_rss_mb"], "rss_change": None
+        }
+        if base is None:
+            entry["status"] = "new"
+        elif base_corpora.get(row["corpus"], {}).get("sha256") != report["corpora"][row["corpus"]]["sha256"]:
+            entry["status"] = "corpus changed"
+        else:
+            entry["baseline_mol_per_s"] = base["mol_per_s"]
+            entry["speed_change"] = row["mol_per_s"] / base["mol_per_s"] - 1 if base["mol_per_s"] else 0.0
+            if base.get("peak_rss_mb") and row["peak_rss_mb"]:
+                entry["baseline_rss_mb"] = base["peak_rss_mb"]
+                entry["rss_change"] = row["peak_rss_mb"] / base["peak_rss_mb"] - 1
+            if entry["speed_change"] < -tolerance or (entry["rss_change"] or 0.0) > rss_tolerance:
+                entry["status"] = "regression"
+            elif entry["speed_change"] > tolerance:
+                entry["status"] = "improved"
+            else:
+                entry["status"] = "ok"
+        rows.append(entry)
+    return rows
+
+
+def write_results(report: Dict[str, Any], output: str) -> None:
+    """写出结果：.csv 只写汇总表，其余写完整 JSON（可作为之后的 --baseline）"""
+    if output.lower().endswith(".csv"):
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(report["summary"][0].keys()))
+            writer.writeheader()
+            writer.writerows(report["summary"])
+    else:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def _format_rss(value: Optional[float]) -> str:
+    return f"{value:.0f}" if value is not None else "-"
+
+
+def print_summary(report: Dict[str, Any]) -> None:
+    params = report["params"]
+    print(f"\n=== 描述符基准测试结果（总耗时 {report['wall_time']:.1f} 秒，RDKit {params['rdkit_version']}，"
+          f"{params['machine']}）===")
+    for label, info in report["corpora"].items():
+        sizes = info.get("heavy_atoms_p5_p50_p95")
+        if sizes:
+            print(f"语料 {label}: {info['molecules']} 条，有效 {info['valid']} 条，"
+                  f"重原子数 p5/p50/p95 = {sizes[0]:.0f}/{sizes[1]:.0f}/{sizes[2]:.0f}，最大 {info['heavy_atoms_max']}")
+    print(f"{'语料':<8}{'用例':<34}{'分子数':>10}{'耗时(s)':>10}{'分子/秒':>12}{'峰值RSS(MB)':>13}")
+    for row in report["summary"]:
+        print(f"{row['corpus']:<8}{row['case']:<34}{row['molecules']:>10}{row['seconds']:>10.3f}"
+              f"{row['mol_per_s']:>12.0f}{_format_rss(row['peak_rss_mb']):>13}")
+
+
+def print_comparison(rows: List[Dict[str, Any]], tolerance: float, rss_tolerance: float) -> None:
+    marks = {"ok": "✅", "improved": "🚀", "regression": "❌", "new": "🆕", "corpus changed": "⚠️"}
+    print(f"\n=== 与基线对比（吞吐量容差 {tolerance:.0%}，峰值 RSS 容差 {rss_tolerance:.0%}）===")
+    print(f"{'':<3}{'语料':<8}{'用例':<34}{'基线分子/秒':>12}{'当前':>12}{'变化':>9}{'RSS变化':>9}")
+    for row in rows:
+        base = f"{row['baseline_mol_per_s']:.0f}" if row["baseline_mol_per_s"] is not None else "-"
+        speed = f"{row['speed_change']:+.1%}" if row["speed_change"] is not None else row["status"]
+        rss = f"{row['rss_change']:+.1%}" if row["rss_change"] is not None else "-"
+        print(f"{marks[row['status']]:<3}{row['corpus']:<8}{row['case']:<34}{base:>12}"
+              f"{row['current_mol_per_s']:>12.0f}{speed:>9}{rss:>9}")
+
+
+def _run_case_main(args: argparse.Namespace) -> int:
+    """子进程入口：运行单个用例并把结果写入 --result-file"""
+    result = run_case_in_process(args.run_case, args.corpus, args.molecules, args.repeats, args.workers)
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="LingNexus 描述符 / ADMET 筛选微基准测试")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[1_000],
+                        help="语料大小，如 1k 100k 1M（默认 1k）")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES), help="要运行的用例（默认全部）")
+    parser.add_argument("--repeats", type=int, default=3, help="每个用例的重复次数，取最快一次")
+    parser.add_argument("--workers", type=int, default=0, help="admet.parallel 的进程数，0 表示全部 CPU 核心")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="语料随机种子")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR, help="生成的语料文件的保存目录")
+    parser.add_argument("--corpus", help="使用已有的 SMILES 文件代替生成的语料")
+    parser.add_argument("--output", help="输出文件（.json 或 .csv），不指定时只打印结果")
+    parser.add_argument("--baseline", help="之前保存的 JSON 结果，性能回退时以退出码 1 结束")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="允许的吞吐量下降比例")
+    parser.add_argument("--rss-tolerance", type=float, default=0.25, help="允许的峰值 RSS 增长比例")
+    # 子进程内部使用
+    parser.add_argument("--run-case", choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    parser.add_argument("--molecules", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        return _run_case_main(args)
+
+    if args.repeats < 1:
+        print("❌ --repeats 至少为 1")
+        return 2
+    if args.corpus and not os.path.exists(args.corpus):
+        print(f"❌ 语料文件不存在: {args.corpus}")
+        return 2
+
+    baseline = None
+    if args.baseline:
+        # 先读取基线，避免与 --output 为同一文件时被覆盖
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    try:
+        report = run_benchmark(
+            args.sizes, args.cases, args.repeats, args.workers, args.seed, args.corpus_dir, args.corpus
+        )
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 2
+    print_summary(report)
+    if args.output:
+        write_results(report, args.output)
+        print(f"\n📄 结果已写入 {os.path.abspath(args.output)}")
+
+    if baseline is None:
+        return 0
+
+    if baseline.get("params", {}).get("rdkit_version") != report["params"]["rdkit_version"]:
+        print(f"⚠️  基线的 RDKit 版本为 {baseline.get('params', {}).get('rdkit_version')}，"
+              f"当前为 {report['params']['rdkit_version']}")
+    if baseline.get("params", {}).get("machine") != report["params"]["machine"]:
+        print(f"⚠️  基线运行环境为 {baseline.get('params', {}).get('machine')}，结果可能不可比")
+
+    rows = compare_with_baseline(report, baseline, args.tolerance, args.rss_tolerance)
+    print_comparison(rows, args.tolerance, args.rss_tolerance)
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n❌ 性能回退：{len(regressions)} 项超出容差 — "
+              + ", ".join(f"{row['corpus']} × {row['case']}" for row in regressions))
+        return 1
+    print("\n✅ 未发现性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
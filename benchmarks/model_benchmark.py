@@ -0,0 +1,205 @@
+"""分子生成模型基准测试（无界面）
+
+对 config/model_config.json 中任意模型子集，在多个靶点上重复运行 K 次，
+统计延迟分位数、吞吐量、解析失败率、格式评分、有效性、唯一性和 ADMET 通过率，
+结果写入 JSON/CSV 文件，便于在版本之间 diff。
+
+用法：
+    python -m benchmarks.model_benchmark --models qwen-max deepseek \\
+        --targets BTK EGFR JAK2 --repeats 5 --concurrency 4 --output bench.json
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import agentscope
+from agentscope.message import Msg
+
+from agents.molecule_designer import create_molecule_designer_agent
+from tools.chem_tools import screen_molecules
+from tools.smiles_extractor import extract_smiles
+
+
+CONFIG_PATH = "./config/model_config.json"
+
+
+def load_config_names(config_path: str = CONFIG_PATH) -> List[str]:
+    """读取模型配置文件中的全部 config_name"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return [config["config_name"] for config in json.load(f)]
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """线性插值分位数（pct 取 0~100），空序列返回 NaN"""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _canonical(smiles: str) -> Optional[str]:
+    from rdkit import Chem
+    
+    mol = Chem.MolFromSmiles(smiles)
+    return Chem.MolToSmiles(mol) if mol is not None else None
+
+
+def run_trial(model_name: str, target: str, repeat: int, requirements: str = "") -> Dict[str, Any]:
+    """运行一次生成 + 解析 + ADMET 筛选，返回该次试验的原始记录"""
+    trial = {"model": model_name, "target": target, "repeat": repeat}
+    
+    user_request = f"设计 {target} 抑制剂"
+    if requirements:
+        user_request += f"，{requirements}"
+    
+    try:
+        designer = create_molecule_designer_agent(model_config_name=model_name)
+        start_time = time.perf_counter()
+        response = designer(Msg(name="User", content=user_request, role="user"))
+        trial["latency"] = time.perf_counter() - start_time
+    except Exception as e:
+        trial.update(error=str(e), latency=None, extracted=[], valid=[], passed=0, parse_quality=0.0)
+        return trial
+    
+    extracted, parse_stats = extract_smiles(response.content)
+    results = list(screen_molecules(extracted))
+    valid = [r["smiles"] for r in results if r["valid"]]
+    
+    trial.update(
+        error=None,
+        extracted=extracted,
+        parse_quality=parse_stats.quality,
+        valid=valid,
+        canonical=[_canonical(smi) for smi in valid],
+        passed=sum(1 for r in results if r["passed"])
+    )
+    return trial
+
+
+def summarize(model_name: str, trials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """汇总一个模型的全部试验"""
+    ok = [t for t in trials if t["error"] is None]
+    latencies = [t["latency"] for t in ok]
+    extracted = sum(len(t["extracted"]) for t in ok)
+    valid = sum(len(t["valid"]) for t in ok)
+    passed = sum(t["passed"] for t in ok)
+    unique = {smi for t in ok for smi in t["canonical"] if smi}
+    total_latency = sum(latencies)
+    
+    return {
+        "model": model_name,
+        "trials": len(trials),
+        "errors": len(trials) - len(ok),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "latency_mean": total_latency / len(latencies) if latencies else math.nan,
+        # 吞吐量：生成的分子数 / 累计 LLM 调用耗时
+        "throughput_mol_per_s": extracted / total_latency if total_latency else 0.0,
+        "parse_failure_rate": sum(1 for t in ok if not t["extracted"]) / len(ok) if ok else math.nan,
+        "parse_quality": sum(t["parse_quality"] for t in ok) / len(ok) if ok else math.nan,
+        "generated": extracted,
+        "validity": valid / extracted if extracted else 0.0,
+        "uniqueness": len(unique) / valid if valid else 0.0,
+        "admet_pass_rate": passed / extracted if extracted else 0.0
+    }
+
+
+def run_benchmark(
+    models: Sequence[str],
+    targets: Sequence[str],
+    repeats: int = 3,
+    concurrency: int = 4,
+    requirements: str = ""
+) -> Dict[str, Any]:
+    """以有界并发运行 models × targets × repeats 次试验
+    
+    Returns:
+        Dict: 包含运行参数、每个模型的汇总 summary 以及全部 trials
+    """
+    jobs = [(m, t, r) for m in models for t in targets for r in range(repeats)]
+    
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        trials = list(pool.map(lambda job: run_trial(*job, requirements=requirements), jobs))
+    wall_time = time.perf_counter() - start_time
+    
+    return {
+        "params": {
+            "models": list(models),
+            "targets": list(targets),
+            "repeats": repeats,
+            "concurrency": concurrency,
+            "requirements": requirements
+        },
+        "wall_time": wall_time,
+        "summary": [summarize(m, [t for t in trials if t["model"] == m]) for m in models],
+        "trials": trials
+    }
+
+
+def write_results(report: Dict[str, Any], output: str) -> None:
+    """写出结果：.csv 只写汇总表，其余写完整 JSON"""
+    if output.lower().endswith(".csv"):
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(report["summary"][0].keys()))
+            writer.writeheader()
+            writer.writerows(report["summary"])
+    else:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def print_summary(report: Dict[str, Any]) -> None:
+    print(f"\n=== 基准测试结果（总耗时 {report['wall_time']:.1f} 秒）===")
+    print(f"{'模型':<12}{'p50':>8}{'p95':>8}{'p99':>8}{'分子/秒':>10}"
+          f"{'解析失败':>10}{'格式评分':>10}{'有效性':>8}{'唯一性':>8}{'通过率':>8}")
+    for s in report["summary"]:
+        print(f"{s['model']:<12}{s['latency_p50']:>8.2f}{s['latency_p95']:>8.2f}{s['latency_p99']:>8.2f}"
+              f"{s['throughput_mol_per_s']:>10.2f}{s['parse_failure_rate']:>10.1%}{s['parse_quality']:>10.2f}"
+              f"{s['validity']:>8.1%}{s['uniqueness']:>8.1%}{s['admet_pass_rate']:>8.1%}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    available = load_config_names()
+    
+    parser = argparse.ArgumentParser(description="LingNexus 分子生成模型基准测试")
+    parser.add_argument("--models", nargs="+", default=available, help="要测试的 config_name（默认全部）")
+    parser.add_argument("--targets", nargs="+", default=["BTK", "EGFR", "JAK2"], help="靶点列表")
+    parser.add_argument("--repeats", type=int, default=3, help="每个 模型×靶点 的重复次数")
+    parser.add_argument("--concurrency", type=int, default=4, help="最大并发请求数")
+    parser.add_argument("--requirements", default="", help="附加的生成要求")
+    parser.add_argument("--output", default="benchmark_results.json", help="输出文件（.json 或 .csv）")
+    args = parser.parse_args(argv)
+    
+    unknown = [m for m in args.models if m not in available]
+    if unknown:
+        print(f"❌ 未知模型配置: {', '.join(unknown)}（可选：{', '.join(available)}）")
+        return 2
+    
+    agentscope.init(
+        model_configs=CONFIG_PATH,
+        project="LingNexus",
+        save_code=False,
+        save_api_invoke=False,
+    )
+    
+    report = run_benchmark(args.models, args.targets, args.repeats, args.concurrency, args.requirements)
+    write_results(report, args.output)
+    print_summary(report)
+    print(f"\n📄 结果已写入 {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
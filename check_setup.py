@@ -128,5 +128,21 @@ def main():
     
     print("=" * 60)
 
+def report_import_time(module: str = "app") -> None:
+    """打印图形界面的启动导入耗时（按顶层包汇总）"""
+    from tools.lazy_imports import importtime_report
+
+    print()
+    try:
+        total, ranked = importtime_report(module)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    print(f"⏱️ import {module}：{total * 1000:.0f} ms（-X importtime，按顶层包汇总）")
+    for package, seconds in ranked:
+        print(f"   {seconds * 1000:8.1f} ms  {package}")
+
 if __name__ == "__main__":
     main()
+    if "--import-time" in sys.argv:
+        report_import_time()
@@ -0,0 +1,61 @@
+"""化合物库批量 ADMET 筛选（命令行）
+
+流式读取 .smi / .csv / .tsv / .sdf（可带 .gz）化合物库，结果增量写入
+CSV 或 JSONL 文件；中断后重新运行同一命令即可从断点继续（.gz 输入续跑时
+需要先从头解压到断点）。
+
+默认使用级联早停：结果确定后不再计算剩余描述符，输出中这些描述符为空；
+需要每个分子都有完整的规则描述符时加 --no-cascade。
+
+用法：
+    python screen_library.py vendor.smi.gz passed.csv --workers 8 --only-passed
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+from tools.admet_rules import load_rule_sets
+from tools.ingest import screen_library
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    _, rule_sets = load_rule_sets()
+    
+    parser = argparse.ArgumentParser(description="LingNexus 化合物库批量 ADMET 筛选")
+    parser.add_argument("input", help="化合物库文件（.smi / .csv / .tsv / .sdf，可带 .gz）")
+    parser.add_argument("output", help="结果文件（.csv 或 .jsonl）")
+    parser.add_argument("--format", choices=["smi", "csv", "tsv", "sdf"], help="输入格式（默认按扩展名判断）")
+    parser.add_argument("--smiles-column", help="CSV/TSV 的 SMILES 列名（默认自动识别）")
+    parser.add_argument("--name-column", help="CSV/TSV 的名称列名（默认自动识别）")
+    parser.add_argument("--rules", choices=sorted(rule_sets), help="ADMET 规则集（默认使用配置中的默认规则集）")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数，0 表示全部 CPU 核心")
+    parser.add_argument("--chunksize", type=int, default=None, help="每个分块的分子数（每个分块保存一次检查点）")
+    parser.add_argument("--pains", action="store_true", help="剔除含 PAINS 结构的分子")
+    parser.add_argument("--only-passed", action="store_true", help="只写出通过筛选的分子")
+    parser.add_argument("--no-cascade", action="store_true", help="关闭级联早停，计算规则需要的全部描述符"
+                        "（默认开启级联时，提前判定的分子部分描述符列为空）")
+    parser.add_argument("--restart", action="store_true", help="忽略检查点，从头开始")
+    parser.add_argument("--start-offset", type=int, default=None, help="从指定的输入字节偏移开始（解压后的偏移；.gz 输入需要从头解压到该位置）")
+    args = parser.parse_args(argv)
+    
+    screen_library(
+        args.input,
+        args.output,
+        resume=not args.restart,
+        start_offset=args.start_offset,
+        fmt=args.format,
+        smiles_column=args.smiles_column,
+        name_column=args.name_column,
+        only_passed=args.only_passed,
+        workers=args.workers,
+        chunksize=args.chunksize,
+        check_pains=args.pains,
+        rule_set=args.rules,
+        cascade=not args.no_cascade
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""图形界面的多用户服务配置
+
+app.py / app_compare.py 共用：
+- 服务参数来自命令行或环境变量（命令行优先）
+- RequestGate：应用层请求闸门。每个事件（如“生成分子”）限制同时处理的
+  请求数，排队请求按先到先得放行，并在状态框中显示排队位置和预计等待；
+  排队请求数达到上限时立即拒绝（反压），而不是让请求无限堆积
+- 客户端断开或点击“停止”时 Gradio 取消回调协程，闸门名额随之释放，
+  流水线中的模型调用一并取消，不再消耗 API 配额
+- 预热：RDKit、AgentScope 均为延迟导入，界面先启动，再在后台线程中
+  完成导入与初始化，首个请求不必等待冷启动
+- 指标：与界面同一端口提供 /metrics（Prometheus 文本格式，见 tools.metrics），
+  包括各闸门的排队深度与处理中请求数
+
+环境变量：
+- LINGNEXUS_HOST / LINGNEXUS_PORT：监听地址与端口
+- LINGNEXUS_SHARE：设为 1 时创建 Gradio 公网分享链接
+- LINGNEXUS_CONCURRENCY：每个事件同时处理的请求数
+- LINGNEXUS_MAX_QUEUE：每个事件最多排队的请求数
+- LINGNEXUS_WARM_UP：设为 0 时不在后台预热
+- LINGNEXUS_METRICS：设为 0 时不提供 /metrics（直接使用 Gradio 自带的服务器）
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tools.lazy_imports import format_import_report
+from tools.metrics import CONTENT_TYPE, Gauge, render_metrics
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_QUEUE = 16
+
+# 还没有完成过请求时，按该时长（秒）估计每个请求的处理时间
+DEFAULT_SERVICE_TIME = 30.0
+# 处理时间的指数滑动平均系数
+SERVICE_TIME_ALPHA = 0.3
+# 排队时刷新状态的间隔（秒）
+QUEUE_POLL_INTERVAL = 0.2
+QUEUE_STATUS_INTERVAL = 1.0
+
+METRICS_PATH = "/metrics"
+
+
+class GateFull(RuntimeError):
+    """排队请求数已达上限"""
+
+
+class ServingConfig:
+    """图形界面服务参数"""
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = 7860,
+        share: bool = False,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        warm_up: bool = True,
+        import_report: bool = False,
+        metrics: bool = True
+    ):
+        self.host = host
+        self.port = port
+        self.share = share
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.warm_up = warm_up
+        self.import_report = import_report
+        self.metrics = metrics
+
+    @classmethod
+    def from_env(cls, default_port: int) -> "ServingConfig":
+        return cls(
+            host=os.environ.get("LINGNEXUS_HOST", DEFAULT_HOST),
+            port=int(os.environ.get("LINGNEXUS_PORT", default_port)),
+            share=os.environ.get("LINGNEXUS_SHARE", "").lower() in ("1", "true", "yes"),
+            concurrency=int(os.environ.get("LINGNEXUS_CONCURRENCY", DEFAULT_CONCURRENCY)),
+            max_queue=int(os.environ.get("LINGNEXUS_MAX_QUEUE", DEFAULT_MAX_QUEUE)),
+            warm_up=os.environ.get("LINGNEXUS_WARM_UP", "1").lower() not in ("0", "false", "no"),
+            metrics=os.environ.get("LINGNEXUS_METRICS", "1").lower() not in ("0", "false", "no")
+        )
+
+
+def parse_serving_args(description: str, default_port: int, argv: Optional[List[str]] = None) -> ServingConfig:
+    """解析服务参数：命令行 > 环境变量 > 默认值"""
+    defaults = ServingConfig.from_env(default_port)
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--host", default=defaults.host, help="监听地址（局域网共享用 0.0.0.0）")
+    parser.add_argument("--port", type=int, default=defaults.port, help="监听端口")
+    parser.add_argument("--share", action="store_true", default=defaults.share, help="创建 Gradio 公网分享链接")
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency, help="每个事件同时处理的请求数")
+    parser.add_argument("--max-queue", type=int, default=defaults.max_queue, help="每个事件最多排队的请求数，超出时拒绝")
+    parser.add_argument("--no-warm-up", dest="warm_up", action="store_false", default=defaults.warm_up,
+                        help="不在后台预热（首个请求时再导入 RDKit / AgentScope）")
+    parser.add_argument("--import-report", action="store_true", help="预热完成后打印延迟导入与预热耗时")
+    parser.add_argument("--no-metrics", dest="metrics", action="store_false", default=defaults.metrics,
+                        help=f"不提供 {METRICS_PATH} 指标端点")
+    args = parser.parse_args(argv)
+    return ServingConfig(
+        args.host, args.port, args.share, args.concurrency, args.max_queue, args.warm_up, args.import_report,
+        args.metrics
+    )
+
+
+class _Ticket:
+    """一个请求在闸门中的排队凭证"""
+
+    def __init__(self, gate: "RequestGate"):
+        self.gate = gate
+        self.admitted = False
+        self.started = 0.0
+
+    async def __aenter__(self) -> "_Ticket":
+        gate = self.gate
+        if len(gate._waiting) >= gate.max_waiting:
+            gate.rejected += 1
+            raise GateFull(f"服务繁忙：当前已有 {len(gate._waiting)} 个请求在排队，请稍后重试")
+        gate._waiting.append(self)
+        return self
+
+    async def wait(self) -> AsyncIterator[Tuple[int, float]]:
+        """等待放行；排队期间定期产出 (前面的请求数, 预计等待秒数)"""
+        gate = self.gate
+        last_status = None
+        while True:
+            if gate._waiting[0] is self and gate.active < gate.limit:
+                gate._waiting.popleft()
+                gate.active += 1
+                self.admitted = True
+                self.started = time.monotonic()
+                return
+            now = time.monotonic()
+            if last_status is None or now - last_status >= QUEUE_STATUS_INTERVAL:
+                last_status = now
+                position = gate.position(self)
+                yield position, gate.estimate_wait(position)
+            await asyncio.sleep(QUEUE_POLL_INTERVAL)
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        gate = self.gate
+        if self.admitted:
+            gate.active -= 1
+            if exc_type is None:
+                gate.completed += 1
+                gate.record(time.monotonic() - self.started)
+            else:
+                # 中途取消的请求不计入平均处理时间
+                gate.cancelled += 1
+        else:
+            gate._waiting.remove(self)
+            if exc_type is not None:
+                gate.abandoned += 1
+
+
+class RequestGate:
+    """单个事件的请求闸门（并发上限 + 先到先得排队 + 排队上限）"""
+
+    def __init__(self, name: str, limit: int = DEFAULT_CONCURRENCY, max_waiting: int = DEFAULT_MAX_QUEUE):
+        """
+        Args:
+            name: 事件名称
+            limit: 同时处理的请求数
+            max_waiting: 最多排队的请求数，超出时进入 ticket() 抛出 GateFull
+        """
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.active = 0
+        self._waiting: "deque[_Ticket]" = deque()
+        self.service_time = DEFAULT_SERVICE_TIME
+        self.completed = 0
+        self.rejected = 0
+        self.abandoned = 0
+        self.cancelled = 0
+
+    def configure(self, limit: int, max_waiting: int) -> None:
+        self.limit = max(1, limit)
+        self.max_waiting = max(0, max_waiting)
+
+    def ticket(self) -> _Ticket:
+        """排队凭证（异步上下文管理器）：
+            async with gate.ticket() as ticket:
+                async for position, eta in ticket.wait():
+                    ...  # 显示排队状态
+                ...      # 处理请求
+        """
+        return _Ticket(self)
+
+    def position(self, ticket: _Ticket) -> int:
+        """排在该请求前面的排队请求数"""
+        return self._waiting.index(ticket)
+
+    def estimate_wait(self, position: int) -> float:
+        """按平均处理时间估计排在 position 的请求还需等待的秒数"""
+        return math.ceil((position + 1) / self.limit) * self.service_time
+
+    def record(self, duration: float) -> None:
+        self.service_time += SERVICE_TIME_ALPHA * (duration - self.service_time)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "active": self.active,
+            "waiting": len(self._waiting),
+            "limit": self.limit,
+            "max_waiting": self.max_waiting,
+            "service_time": self.service_time,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "abandoned": self.abandoned,
+            "cancelled": self.cancelled
+        }
+
+
+# 已启动服务的请求闸门，/metrics 抓取时读取其当前状态
+_served_gates: List[RequestGate] = []
+
+QUEUE_DEPTH = Gauge(
+    "lingnexus_queue_depth", "各事件排队中的请求数", ("event",),
+    callback=lambda: {(gate.name,): len(gate._waiting) for gate in _served_gates}
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "lingnexus_requests_in_flight", "各事件处理中的请求数", ("event",),
+    callback=lambda: {(gate.name,): gate.active for gate in _served_gates}
+)
+SERVICE_TIME = Gauge(
+    "lingnexus_request_service_time_seconds", "各事件请求处理时间的滑动平均（秒）", ("event",),
+    callback=lambda: {(gate.name,): gate.service_time for gate in _served_gates}
+)
+
+
+def format_queue_status(position: int, eta: float) -> str:
+    """状态框中的排队提示"""
+    return f"⏳ 排队中：第 {position + 1} 位，预计等待约 {eta:.0f} 秒\n\n（关闭页面或点击“停止”即可取消）"
+
+
+def run_warm_up(steps: Iterable[Callable[[], Any]], report: bool = False) -> Dict[str, float]:
+    """依次执行预热步骤并记录耗时
+
+    步骤返回 {阶段: 秒数} 字典时按其中的阶段记录，否则按函数名记录整体耗时；
+    预热失败只打印警告，请求到来时会再次尝试。
+    """
+    timings: Dict[str, float] = {}
+    for step in steps:
+        name = getattr(step, "__name__", repr(step))
+        start = time.perf_counter()
+        try:
+            result = step()
+        except Exception as e:
+            print(f"⚠️ 预热 {name} 失败：{e}")
+            continue
+        if isinstance(result, dict):
+            timings.update(result)
+        else:
+            timings[name] = time.perf_counter() - start
+    if report:
+        print(format_import_report(timings))
+    return timings
+
+
+def start_warm_up(steps: Iterable[Callable[[], Any]], report: bool = False) -> threading.Thread:
+    """在后台守护线程中执行预热，不阻塞界面启动"""
+    thread = threading.Thread(target=run_warm_up, args=(list(steps), report), name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def launch(
+    demo,
+    config: ServingConfig,
+    gates: Iterable[RequestGate] = (),
+    warm_up: Iterable[Callable[[], Any]] = ()
+) -> None:
+    """按服务参数配置请求闸门与 Gradio 队列并启动界面
+
+    Args:
+        demo: Gradio Blocks
+        config: 服务参数
+        gates: 需要按服务参数配置的请求闸门
+        warm_up: 预热步骤（无参函数），config.warm_up 为真时在后台线程中执行
+    """
+    gates = list(gates)
+    for gate in gates:
+        gate.configure(config.concurrency, config.max_queue)
+        if gate not in _served_gates:
+            _served_gates.append(gate)
+    # 排队中的请求也占用 Gradio 的处理名额（用于刷新排队状态），名额需覆盖处理中与排队中的请求；
+    # 再超出的请求在 Gradio 队列中最多排 max_queue 个
+    workers = max(1, len(gates)) * (config.concurrency + config.max_queue)
+    demo.queue(concurrency_count=workers, max_size=config.max_queue, api_open=False)
+    if config.warm_up:
+        start_warm_up(warm_up, report=config.import_report)
+    if config.metrics and not config.share and _serve_with_metrics(demo, config):
+        return
+    if config.metrics and config.share:
+        print(f"⚠️ 使用 --share 时由 Gradio 自带的服务器启动，不提供 {METRICS_PATH}")
+    demo.launch(
+        server_name=config.host,
+        server_port=config.port,
+        share=config.share,
+        show_error=True
+    )
+
+
+def _serve_with_metrics(demo, config: ServingConfig) -> bool:
+    """把界面挂载到 FastAPI 应用上，与 /metrics 共用同一端口（阻塞运行）
+
+    Returns:
+        bool: 缺少 FastAPI / uvicorn（通常随 Gradio 安装）时返回 False，由调用方改用 demo.launch
+    """
+    try:
+        import gradio as gr
+        import uvicorn
+        from fastapi import FastAPI
+        from fastapi.responses import Response
+    except ImportError:
+        print(f"警告：未安装 FastAPI / uvicorn，不提供 {METRICS_PATH}。请运行：pip install fastapi uvicorn")
+        return False
+
+    app = FastAPI()
+
+    @app.get(METRICS_PATH, include_in_schema=False)
+    def metrics_endpoint() -> Response:
+        return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+    demo.show_error = True
+    app = gr.mount_gradio_app(app, demo, path="/")
+    print(f"📈 指标：http://{config.host}:{config.port}{METRICS_PATH}")
+    uvicorn.run(app, host=config.host, port=config.port, log_level="warning")
+    return True
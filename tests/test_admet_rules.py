@@ -0,0 +1,63 @@
+"""tools.admet_rules 规则引擎的测试"""
+
+import json
+
+import numpy as np
+import pytest
+
+from tools.admet_rules import Rule, compile_rule_set, get_rule_set, load_rule_sets
+
+PROPS = [
+    {"molecular_weight": 180.2, "logp": 1.3, "h_bond_donors": 1, "h_bond_acceptors": 3},
+    {"molecular_weight": 620.0, "logp": 6.1, "h_bond_donors": 2, "h_bond_acceptors": 9},
+    {"molecular_weight": 520.0, "logp": 4.0, "h_bond_donors": 6, "h_bond_acceptors": 12},
+]
+
+
+def test_rule_operators_on_scalars_and_columns():
+    between = Rule("logp", "between", [1, 5])
+    assert between.check(1.0) and between.check(5.0) and not between.check(5.01)
+    assert between.check(np.array([0.5, 3.0, np.nan])).tolist() == [False, True, False]
+    assert Rule("tpsa", "<", 140).check(140.0) == False  # noqa: E712
+    with pytest.raises(ValueError, match="不支持的规则运算符"):
+        Rule("tpsa", "!=", 140)
+
+
+def test_vectorized_evaluation_matches_per_molecule_evaluation():
+    rules = get_rule_set("lipinski")
+    columns = {name: np.array([props[name] for props in PROPS], dtype=float) for name in rules.descriptors}
+    score, passed = rules.evaluate_columns(columns)
+    assert list(zip(score.tolist(), passed.tolist())) == [rules.evaluate(props) for props in PROPS]
+    assert passed.tolist() == [True, False, False]
+
+
+def test_min_passed_and_summary():
+    rules = get_rule_set("lipinski")
+    assert rules.min_passed == 3
+    assert rules.with_min_passed(4).evaluate(PROPS[0]) == (4, True)
+    assert rules.with_min_passed(4).evaluate(PROPS[1]) == (2, False)
+    assert rules.summary().endswith("（至少满足 3 条）")
+    assert get_rule_set("veber").summary().endswith("（全部满足）")
+
+
+def test_rendering_uses_rule_labels_and_formats():
+    rules = get_rule_set("lipinski")
+    assert rules.format_properties(PROPS[1]) == "MW=620.0, LogP=6.10, HBD=2, HBA=9"
+    table = rules.render_markdown_table(PROPS[1]).splitlines()
+    assert table[2] == "| 分子量 (MW) | 620.0 Da | ⚠️ |"
+    assert table[4] == "| 氢键供体 | 2 | ✅ |"
+
+
+def test_custom_rules_file_and_unknown_rule_set(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "default": "small",
+        "rule_sets": {"small": {"rules": [{"descriptor": "molecular_weight", "op": "<", "value": 300}]}}
+    }), encoding="utf-8")
+    default_name, rule_sets = load_rule_sets(str(path))
+    assert default_name == "small" and list(rule_sets) == ["small"]
+    assert get_rule_set(path=str(path)).descriptors == ("molecular_weight",)
+    with pytest.raises(ValueError, match="未知的规则集"):
+        get_rule_set("missing", path=str(path))
+    with pytest.raises(ValueError, match="不包含任何规则"):
+        compile_rule_set("empty", {"rules": []})
@@ -0,0 +1,280 @@
+"""agents.async_invoker、限流模型包装器与响应缓存的测试"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agents import async_invoker, model_clients
+from agents.agent_pool import AgentPool
+from agents.async_invoker import AgentCallTimeout, AsyncAgentInvoker
+from agents.model_clients import RateLimitedModel, RateLimitTimeout, TokenBucket
+from agents.response_cache import ResponseCache
+
+MODEL = "fake-model"
+
+
+class FakeMsg:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeAgent:
+    """按脚本执行的同步智能体：记录同时在执行的调用数"""
+
+    name = "fake"
+    sys_prompt = "system"
+
+    def __init__(self, script):
+        self.script = script
+
+    def __call__(self, msg):
+        with self.script.lock:
+            self.script.active += 1
+            self.script.peak = max(self.script.peak, self.script.active)
+            self.script.calls += 1
+            call = self.script.calls
+        try:
+            time.sleep(self.script.delay)
+            if call <= self.script.failures:
+                raise RuntimeError(f"call {call} failed")
+            return FakeMsg(f"reply {call}")
+        finally:
+            with self.script.lock:
+                self.script.active -= 1
+
+
+class Script:
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+
+def make_invoker(script, limit=1, **kwargs):
+    pool = AgentPool(lambda name: FakeAgent(script))
+    return AsyncAgentInvoker(pool, limits={MODEL: limit}, cache=ResponseCache(), **kwargs)
+
+
+def test_invoke_returns_reply_and_counts_call():
+    invoker = make_invoker(Script())
+    result = asyncio.run(invoker.invoke(MODEL, FakeMsg("hi"), use_cache=False))
+    assert result.content == "reply 1"
+    assert result.attempts == 1
+    assert invoker.stats()["calls"] == 1
+    assert invoker.stats()["in_flight"] == {MODEL: 0}
+
+
+def test_failed_attempt_is_retried(monkeypatch):
+    monkeypatch.setattr(async_invoker, "RETRY_BACKOFF", 0.01)
+    invoker = make_invoker(Script(failures=1))
+    result = asyncio.run(invoker.invoke(MODEL, FakeMsg("hi"), use_cache=False, retries=1))
+    assert result.content == "reply 2"
+    assert result.attempts == 2
+    assert invoker.stats()["retried"] == 1
+
+
+def test_error_is_raised_when_retries_are_exhausted(monkeypatch):
+    monkeypatch.setattr(async_invoker, "RETRY_BACKOFF", 0.01)
+    invoker = make_invoker(Script(failures=5))
+    with pytest.raises(RuntimeError, match="call 2 failed"):
+        asyncio.run(invoker.invoke(MODEL, FakeMsg("hi"), use_cache=False, retries=1))
+
+
+def test_timeout_keeps_slot_until_blocking_call_finishes():
+    script = Script(delay=0.3)
+    invoker = make_invoker(script)
+
+    async def scenario():
+        with pytest.raises(AgentCallTimeout):
+            await invoker.invoke(MODEL, FakeMsg("slow"), use_cache=False, timeout=0.05, retries=0)
+        # 超时后线程仍在执行：被取消的尝试结束后名额也没有归还，下一个调用只能排队
+        await asyncio.sleep(0.01)
+        assert invoker.stats()["in_flight"] == {MODEL: 1}
+        with pytest.raises(AgentCallTimeout):
+            await invoker.invoke(MODEL, FakeMsg("queued"), use_cache=False, timeout=0.05, retries=0)
+        await asyncio.sleep(0.4)
+        assert invoker.stats()["in_flight"] == {MODEL: 0}
+        return await invoker.invoke(MODEL, FakeMsg("next"), use_cache=False, timeout=1.0)
+
+    result = asyncio.run(scenario())
+    assert result.content == "reply 2"
+    assert script.peak == 1
+    assert invoker.stats()["timeouts"] == 2
+
+
+def test_cancelled_call_does_not_exceed_concurrency_limit():
+    script = Script(delay=0.2)
+    invoker = make_invoker(script)
+
+    async def scenario():
+        first = asyncio.ensure_future(invoker.invoke(MODEL, FakeMsg("a"), use_cache=False))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert invoker.stats()["in_flight"] == {MODEL: 1}
+        return await invoker.invoke(MODEL, FakeMsg("b"), use_cache=False, timeout=2.0)
+
+    result = asyncio.run(scenario())
+    assert result.content == "reply 2"
+    assert script.peak == 1
+
+
+def test_acquire_timeout_and_cancel_do_not_leak_permits():
+    async def scenario():
+        semaphore = asyncio.Semaphore(1)
+        await semaphore.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await async_invoker._acquire(semaphore, 0.01)
+        waiter = asyncio.ensure_future(async_invoker._acquire(semaphore, 1.0))
+        await asyncio.sleep(0)
+        # 释放与取消发生在同一轮事件循环：已交给 waiter 的名额必须被归还
+        semaphore.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        await async_invoker._acquire(semaphore, 0.01)
+        assert semaphore.locked()
+
+    asyncio.run(scenario())
+
+
+def test_stream_yields_reply_and_releases_slot():
+    invoker = make_invoker(Script())
+    info = {}
+
+    async def scenario():
+        return [chunk async for chunk in invoker.stream(MODEL, FakeMsg("hi"), use_cache=False, info=info)]
+
+    assert asyncio.run(scenario()) == ["reply 1"]
+    assert info["cached"] is False
+    assert invoker.stats()["in_flight"] == {MODEL: 0}
+
+
+def test_token_bucket_throttles_and_penalizes():
+    bucket = TokenBucket(rate=20.0, capacity=1)
+    assert bucket.acquire() < 0.01
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=0.01)
+    assert bucket.acquire(timeout=1.0) > 0.0
+    bucket.penalize()
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=0.05)
+
+
+class FakeModel:
+    def __init__(self, error=None, delay=0.0):
+        self.error = error
+        self.delay = delay
+
+    def __call__(self, prompt):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return FakeMsg("ok")
+
+
+LIMITS = {"requests_per_minute": 0, "burst": 1, "max_in_flight": 1, "acquire_timeout": 0.05}
+
+
+def test_rate_limited_model_penalizes_on_429():
+    model = RateLimitedModel(FakeModel(error=RuntimeError("HTTP 429 Too Many Requests")), MODEL,
+                             dict(LIMITS, requests_per_minute=600))
+    with pytest.raises(RuntimeError):
+        model("prompt")
+    assert model.stats()["rate_limited"] == 1
+    assert model.stats()["in_flight"] == 0
+    with pytest.raises(RateLimitTimeout):
+        model.bucket.acquire(timeout=0.01)
+
+
+def test_rate_limited_model_caps_in_flight_requests():
+    model = RateLimitedModel(FakeModel(delay=0.2), MODEL, LIMITS)
+    worker = threading.Thread(target=model, args=("first",))
+    worker.start()
+    time.sleep(0.05)
+    with pytest.raises(RateLimitTimeout):
+        model("second")
+    worker.join()
+    assert model("third").content == "ok"
+    assert model.stats()["calls"] == 2
+
+
+class StreamResponse:
+    def __init__(self, chunks):
+        self.closed = False
+        self.text = chunks[-1][1]
+        self.stream = self._chunks(chunks)
+
+    def _chunks(self, chunks):
+        try:
+            yield from chunks
+        finally:
+            self.closed = True
+
+
+class StreamModel:
+    def __call__(self, prompt):
+        return StreamResponse([("a", "x"), ("a", "xy")])
+
+
+def test_streaming_response_releases_slot_on_close():
+    model = RateLimitedModel(StreamModel(), MODEL, LIMITS)
+    with model("first") as response:
+        assert next(response.stream) == ("a", "x")
+        assert model.stats()["in_flight"] == 1
+    assert model.stats()["in_flight"] == 0
+    assert response._response.closed
+
+    # 从未读取的流同样在 close() 时归还名额，重复关闭不会多归还
+    unread = model("second")
+    assert model.stats()["in_flight"] == 1
+    unread.close()
+    unread.close()
+    assert model.stats()["in_flight"] == 0
+    assert model("third").text == "xy"
+    assert model.stats()["in_flight"] == 0
+
+
+class OpenAIClient:
+    def __init__(self, http_client=None):
+        self.http_client = http_client
+
+    def with_options(self, http_client):
+        return OpenAIClient(http_client)
+
+
+def test_shared_models_share_one_keep_alive_pool(monkeypatch):
+    pytest.importorskip("httpx")
+    monkeypatch.setattr(model_clients, "_shared_models", {})
+    monkeypatch.setattr(model_clients, "_http_clients", {})
+    first, second = StreamModel(), StreamModel()
+    first.client, second.client = OpenAIClient(), OpenAIClient()
+    model_clients.get_shared_model("pooled", first)
+    model_clients._pool_http_client(second, "pooled", model_clients.get_provider_limits("pooled"))
+    http_client = first.client.http_client
+    assert http_client is not None and second.client.http_client is http_client
+
+    model_clients.close_http_clients()
+    assert http_client.is_closed
+    assert model_clients._http_clients == {}
+
+
+def test_response_cache_expires_and_evicts():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.put(key, key.upper())
+    assert cache.get("a") is None
+    assert cache.get("c") == "C"
+
+    expired = ResponseCache(ttl=0.0)
+    expired.put("a", "A")
+    time.sleep(0.01)
+    assert expired.get("a") is None
+    assert expired.stats()["misses"] == 1
@@ -0,0 +1,55 @@
+"""tools.chem_tools 筛选引擎的测试"""
+
+import pytest
+
+from tools.chem_tools import screen_molecules
+
+SMILES = ["CCO", "CC(=O)Oc1ccccc1C(=O)O", "not-a-smiles"]
+REPORT = ("molecular_weight", "qed", "logp")
+
+
+def test_extra_descriptors_are_reported_for_any_rule_set():
+    for cascade in (False, True):
+        results = list(screen_molecules(
+            SMILES, use_cache=False, rule_set="lipinski", cascade=cascade, extra_descriptors=REPORT
+        ))
+        for result in results[:2]:
+            assert result["passed"]
+            assert set(REPORT) <= set(result["properties"])
+        assert results[2]["properties"] is None
+
+
+def test_properties_only_contain_rule_descriptors_by_default():
+    (result,) = screen_molecules(["CCO"], use_cache=False, rule_set="lipinski")
+    assert "qed" not in result["properties"]
+
+
+PARITY_SMILES = [
+    "CC(=O)Oc1ccccc1C(=O)O",
+    "CN1C=NC2=C1C(=O)N(C(=O)N2C)C",
+    "CC(C)Cc1ccc(cc1)C(C)C(=O)O",
+    "Oc1ccc(O)c(N=Nc2ccccc2)c1",
+    "CCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCC(=O)O",
+    "C",
+    "not-a-smiles",
+]
+
+
+@pytest.mark.parametrize("rule_set", ["lingnexus", "lipinski", "veber", "ghose", "egan"])
+def test_cascade_and_full_screening_agree(rule_set):
+    full = list(screen_molecules(PARITY_SMILES, use_cache=False, rule_set=rule_set, check_pains=True))
+    cascade = list(screen_molecules(
+        PARITY_SMILES, use_cache=False, rule_set=rule_set, check_pains=True, cascade=True
+    ))
+    for expected, result in zip(full, cascade, strict=True):
+        assert (result["smiles"], result["valid"], result["passed"]) == (
+            expected["smiles"], expected["valid"], expected["passed"]
+        )
+        if not expected["valid"]:
+            assert result["rejected_by"] == "invalid"
+            continue
+        # 级联模式只算了部分描述符，已算出的值必须与完整模式一致
+        assert set(result["properties"]) <= set(expected["properties"])
+        for name, value in result["properties"].items():
+            assert value == pytest.approx(expected["properties"][name])
+        assert (result["rejected_by"] is None) == expected["passed"]
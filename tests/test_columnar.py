@@ -0,0 +1,28 @@
+"""tools.columnar 的测试"""
+
+import numpy as np
+
+from tools.chem_tools import screen_molecules
+from tools.columnar import ADMETTable
+
+AZO_PHENOL = "Oc1ccc(O)c(N=Nc2ccccc2)c1"
+SMILES = ["CC(=O)Oc1ccccc1C(=O)O", AZO_PHENOL, "not-a-smiles", "CCO"]
+
+
+def test_alert_counts_are_int64_and_match_results():
+    results = list(screen_molecules(SMILES, check_pains=True, use_cache=False))
+    table = ADMETTable.from_results(results)
+    assert table.alert_count.dtype == np.int64
+    assert table.alert_count.tolist() == [len(r["alerts"]) if "alerts" in r else 0 for r in results]
+    assert table.alert_count[1] > 0
+
+
+def test_records_round_trip():
+    results = list(screen_molecules(SMILES, use_cache=False))
+    table = ADMETTable.from_results(results)
+    expected = [
+        {"smiles": r["smiles"], "properties": r["properties"], "score": r["score"], "passed": r["passed"]}
+        for r in results if r["valid"]
+    ]
+    assert table.to_records(only_passed=False) == expected
+    assert table.rethreshold().passed.tolist() == table.passed.tolist()
@@ -0,0 +1,79 @@
+"""tools.descriptor_cache 与缓存命中/未命中结果一致性的测试"""
+
+import sqlite3
+
+from tools import chem_tools
+from tools.chem_tools import screen_molecules
+from tools.descriptor_cache import _COMMIT_EVERY, DescriptorCache, configure_descriptor_cache
+
+SMILES = [
+    "CC(=O)Oc1ccccc1C(=O)O",
+    "CN1C=NC2=C1C(=O)N(C(=O)N2C)C",
+    "CC(C)Cc1ccc(cc1)C(C)C(=O)O",
+    "O=C(O)c1ccccc1O",
+    "not-a-smiles",
+]
+
+
+def _strip(results):
+    return [(r["smiles"], r["valid"], r["properties"], r["score"], r["passed"]) for r in results]
+
+
+def test_cache_hit_and_miss_give_identical_results(tmp_path):
+    cache = configure_descriptor_cache(str(tmp_path / "cache.sqlite3"))
+    try:
+        uncached = _strip(screen_molecules(SMILES, use_cache=False))
+        cold = _strip(screen_molecules(SMILES))
+        assert cache.stats()["misses"] == 4
+        warm = _strip(screen_molecules(SMILES))
+        assert cache.stats()["memory_hits"] == 4
+
+        cache.flush()
+        cache._memory.clear()
+        disk = _strip(screen_molecules(SMILES))
+        assert cache.stats()["disk_hits"] == 4
+        assert uncached == cold == warm == disk
+    finally:
+        configure_descriptor_cache(enabled=False)
+
+
+def test_cheap_rule_sets_skip_the_cache(tmp_path, monkeypatch):
+    cache = configure_descriptor_cache(str(tmp_path / "cache.sqlite3"))
+    try:
+        results = _strip(screen_molecules(SMILES, rule_set="lipinski"))
+        assert cache.stats()["lookups"] == 0
+        assert results == _strip(screen_molecules(SMILES, rule_set="lipinski", use_cache=False))
+
+        monkeypatch.setattr(chem_tools, "CACHE_MIN_COST", 0)
+        list(screen_molecules(SMILES, rule_set="lipinski"))
+        assert cache.stats()["lookups"] == 4
+    finally:
+        configure_descriptor_cache(enabled=False)
+
+
+def test_disk_hits_batch_last_access_updates(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = DescriptorCache(path)
+    cache.put("CCO", {"molecular_weight": 46.07})
+    cache.flush()
+    with sqlite3.connect(path) as conn:
+        (before,) = conn.execute("SELECT last_access FROM descriptors").fetchone()
+
+    cache._memory.clear()
+    assert cache.get("CCO") == {"molecular_weight": 46.07}
+    assert cache._pending_writes == 0
+    assert len(cache._touched) == 1
+
+    cache.flush()
+    with sqlite3.connect(path) as conn:
+        (after,) = conn.execute("SELECT last_access FROM descriptors").fetchone()
+    assert after >= before
+    assert not cache._touched
+
+    for i in range(_COMMIT_EVERY):
+        cache.put(f"C{'C' * i}O", {"molecular_weight": float(i)})
+    cache.flush()
+    for i in range(_COMMIT_EVERY):
+        cache.get(f"C{'C' * i}O")
+    assert len(cache._touched) == 0
+    cache.close()
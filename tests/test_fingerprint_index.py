@@ -0,0 +1,67 @@
+"""tools.fingerprint_index 的正确性与检索耗时测试"""
+
+import json
+import os
+import time
+
+import numpy as np
+from rdkit import Chem, DataStructs
+from rdkit.Chem import rdFingerprintGenerator
+
+from tools.fingerprint_index import FingerprintIndex
+
+SMILES = (
+    ["C" * n + "O" for n in range(1, 16)]
+    + ["c1ccccc1" + "C" * n for n in range(0, 10)]
+    + ["CC(=O)Oc1ccccc1C(=O)O", "CN1C=NC2=C1C(=O)N(C(=O)N2C)C", "CC(C)Cc1ccc(cc1)C(C)C(=O)O",
+       "O=C(O)c1ccccc1O", "Nc1ccc(cc1)S(=O)(=O)N", "CC(=O)Nc1ccc(O)cc1", "c1ccc2ccccc2c1"]
+)
+
+
+def test_similarities_match_rdkit_bulk_tanimoto(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "index"))
+    index.add(SMILES)
+    generator = rdFingerprintGenerator.GetMorganGenerator(radius=index.radius, fpSize=index.n_bits)
+    fps = [generator.GetFingerprint(Chem.MolFromSmiles(smiles)) for smiles in SMILES]
+    for query, query_fp in zip(SMILES[::5], fps[::5]):
+        expected = DataStructs.BulkTanimotoSimilarity(query_fp, fps)
+        np.testing.assert_allclose(index.similarities(query), expected, rtol=1e-6)
+        top = index.search(query, k=5)
+        assert [hit["similarity"] for hit in top] == sorted((hit["similarity"] for hit in top), reverse=True)
+        assert top[0]["similarity"] == 1.0
+
+
+def test_ties_are_broken_by_row_index(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "index"))
+    index.add(["CCO", "CCCC"] + ["c1ccccc1"] * 6)
+    for threshold in (None, 0.5):
+        hits = index.search("c1ccccc1", k=3, threshold=threshold)
+        assert [hit["index"] for hit in hits] == [2, 3, 4]
+
+
+def _synthetic_index(path, rows, words=32, seed=0):
+    """直接写入随机稀疏指纹（约 3% 置位），跳过 RDKit 指纹计算"""
+    index = FingerprintIndex(path, n_bits=words * 64)
+    rng = np.random.default_rng(seed)
+    packed = rng.integers(0, 2 ** 63, (rows, words), dtype=np.uint64)
+    for _ in range(4):
+        packed &= rng.integers(0, 2 ** 63, (rows, words), dtype=np.uint64)
+    with open(os.path.join(path, "fingerprints.bin"), "wb") as f:
+        f.write(packed.astype("<u8").tobytes())
+    with open(os.path.join(path, "entries.jsonl"), "w", encoding="utf-8") as f:
+        f.write((json.dumps({"smiles": "C", "label": ""}) + "\n") * rows)
+    del index
+    return FingerprintIndex(path), packed
+
+
+def test_search_throughput(tmp_path):
+    rows = 200_000
+    index, packed = _synthetic_index(str(tmp_path / "index"), rows)
+    query = packed[123]
+    index.search(query, k=10)
+    began = time.perf_counter()
+    hits = index.search(query, k=10)
+    elapsed = time.perf_counter() - began
+    assert hits[0]["index"] == 123
+    # 单核约 7M 行/秒（100 万指纹约 140 ms）；这里只防止数量级的退化
+    assert elapsed < rows / 1_000_000, f"{rows} 行检索耗时 {elapsed * 1000:.0f} ms"
@@ -0,0 +1,61 @@
+"""tools.ingest 流式筛选与断点续跑的测试"""
+
+import gzip
+import json
+
+import pytest
+
+from tools.ingest import checkpoint_path, iter_library, read_checkpoint, screen_library
+
+LINES = [
+    "CC(=O)Oc1ccccc1C(=O)O aspirin",
+    "CN1C=NC2=C1C(=O)N(C(=O)N2C)C caffeine",
+    "not-a-smiles broken",
+    "CC(C)Cc1ccc(cc1)C(C)C(=O)O ibuprofen",
+    "CCO ethanol",
+    "O=C(O)c1ccccc1O salicylic_acid",
+    "c1ccccc1 benzene",
+]
+
+
+def _write(path, lines):
+    data = ("smiles name\n" + "".join(line + "\n" for line in lines)).encode()
+    if str(path).endswith(".gz"):
+        with gzip.open(path, "wb") as f:
+            f.write(data)
+    else:
+        path.write_bytes(data)
+
+
+@pytest.mark.parametrize("name", ["library.smi", "library.smi.gz"])
+def test_start_offset_resumes_at_next_record(tmp_path, name):
+    path = tmp_path / name
+    _write(path, LINES)
+    records = list(iter_library(str(path)))
+    assert [record.name for record in records] == [line.split()[1] for line in LINES]
+    resumed = list(iter_library(str(path), start_offset=records[2].next_offset))
+    assert resumed == records[3:]
+
+
+@pytest.mark.parametrize("name", ["library.smi", "library.smi.gz"])
+def test_resume_from_checkpoint_matches_single_run(tmp_path, name):
+    full = tmp_path / name
+    _write(full, LINES)
+    expected = tmp_path / "expected.csv"
+    screen_library(str(full), str(expected), chunksize=2, verbose=False)
+
+    # 先只筛选前 4 条（相当于在第 4 条后中断），再把检查点指向完整的库续跑
+    partial = tmp_path / ("partial_" + name)
+    _write(partial, LINES[:4])
+    output = tmp_path / "resumed.csv"
+    screen_library(str(partial), str(output), chunksize=2, verbose=False)
+    checkpoint = read_checkpoint(str(output))
+    checkpoint["input"] = str(full.resolve())
+    with open(checkpoint_path(str(output)), "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+
+    stats = screen_library(str(full), str(output), chunksize=2, verbose=False)
+    assert output.read_text() == expected.read_text()
+    assert stats["total"] == len(LINES)
+    assert stats["valid"] == len(LINES) - 1
+    assert read_checkpoint(str(output))["offset"] == read_checkpoint(str(expected))["offset"]
@@ -0,0 +1,72 @@
+"""tools.metrics 指标渲染的测试"""
+
+import pytest
+
+from tools import metrics
+from tools.metrics import Counter, Gauge, Histogram, Registry, render_metrics
+
+
+def test_counter_and_gauge_render_prometheus_text():
+    registry = Registry()
+    requests = Counter("test_requests_total", "请求数", ("event", "outcome"), registry=registry)
+    requests.labels("generate", "ok").inc()
+    requests.labels(event="generate", outcome="ok").inc(2)
+    requests.labels("say \"hi\"", "error").inc()
+    Gauge("test_depth", "排队深度", ("event",), callback=lambda: {("generate",): 3}, registry=registry)
+
+    assert render_metrics(registry).splitlines() == [
+        "# HELP test_requests_total 请求数",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{event="generate",outcome="ok"} 3',
+        'test_requests_total{event="say \\"hi\\"",outcome="error"} 1',
+        "# HELP test_depth 排队深度",
+        "# TYPE test_depth gauge",
+        'test_depth{event="generate"} 3',
+    ]
+    with pytest.raises(ValueError, match="需要标签"):
+        requests.labels("generate")
+    with pytest.raises(ValueError, match="已注册"):
+        Counter("test_depth", "重复", registry=registry)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = Histogram("test_latency_seconds", "耗时", buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'test_latency_seconds_bucket{le="0.1"} 2',
+        'test_latency_seconds_bucket{le="1"} 3',
+        'test_latency_seconds_bucket{le="+Inf"} 4',
+        "test_latency_seconds_sum 3.65",
+        "test_latency_seconds_count 4",
+    ]
+
+
+def test_failing_callback_does_not_break_other_metrics():
+    registry = Registry()
+    Gauge("test_broken", "读取失败", callback=lambda: 1 / 0, registry=registry)
+    Counter("test_ok_total", "正常", registry=registry).inc()
+    lines = registry.render().splitlines()
+    assert lines[0].startswith("# test_broken 读取失败")
+    assert lines[-1] == "test_ok_total 1"
+
+
+def test_track_request_records_outcome(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(metrics, "REQUESTS", Counter("r_total", "", ("event", "outcome"), registry=registry))
+    monkeypatch.setattr(metrics, "REQUEST_DURATION", Histogram("r_seconds", "", ("event",), registry=registry))
+    monkeypatch.setattr(metrics, "MODEL_REQUESTS", Counter("m_total", "", ("config_name",), registry=registry))
+
+    with metrics.track_request("generate", "qwen-max"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.track_request("generate"):
+            raise RuntimeError("boom")
+
+    text = registry.render()
+    assert 'r_total{event="generate",outcome="ok"} 1' in text
+    assert 'r_total{event="generate",outcome="error"} 1' in text
+    assert 'r_seconds_count{event="generate"} 2' in text
+    assert 'm_total{config_name="qwen-max"} 1' in text
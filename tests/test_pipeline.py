@@ -0,0 +1,89 @@
+"""agents.pipeline 的回归测试"""
+
+import asyncio
+
+import pytest
+
+from agents.pipeline import Pipeline
+
+
+def test_failing_stage_cancels_sibling_stages():
+    produced = []
+    cancelled = []
+
+    async def source(seed, ctx):
+        try:
+            for i in range(5):
+                produced.append(i)
+                yield i
+                await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append("source")
+            raise
+
+    async def failing(item, ctx):
+        raise RuntimeError("stage failed")
+        yield item
+
+    async def consume():
+        pipeline = Pipeline("test").add_stage("source", source).add_stage("failing", failing)
+        async for _ in pipeline.run(None):
+            pass
+
+    async def main():
+        with pytest.raises(RuntimeError, match="stage failed"):
+            await consume()
+        # 给已取消的任务留出继续运行的机会：若未被取消，source 会在这段时间内产出全部输入
+        await asyncio.sleep(0.3)
+
+    asyncio.run(main())
+    assert cancelled == ["source"]
+    assert len(produced) < 5
+
+
+def test_failing_worker_cancels_other_workers_of_same_stage():
+    finished = []
+
+    async def work(item, ctx):
+        if item == 0:
+            raise ValueError("bad item")
+        await asyncio.sleep(0.2)
+        finished.append(item)
+        yield item
+
+    async def source(seed, ctx):
+        for i in range(3):
+            yield i
+
+    async def main():
+        pipeline = Pipeline("test").add_stage("source", source).add_stage("work", work, concurrency=3)
+        with pytest.raises(ValueError):
+            async for _ in pipeline.run(None):
+                pass
+        await asyncio.sleep(0.3)
+
+    asyncio.run(main())
+    assert finished == []
+
+
+def test_closing_run_early_waits_for_cancelled_stages():
+    cleaned = []
+
+    async def source(seed, ctx):
+        try:
+            for i in range(100):
+                yield i
+                await asyncio.sleep(0.01)
+        finally:
+            await asyncio.sleep(0.01)
+            cleaned.append("source")
+
+    async def main():
+        run = Pipeline("test").add_stage("source", source).run(None)
+        async for _ in run:
+            break
+        await run.aclose()
+        # aclose() 返回时各阶段已处理完取消（包括其中的 await 清理）
+        assert cleaned == ["source"]
+
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""serving.RequestGate 请求闸门的测试"""
+
+import asyncio
+
+import pytest
+
+import serving
+from serving import GateFull, RequestGate
+
+
+def test_gate_admits_in_order_and_rejects_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(serving, "QUEUE_POLL_INTERVAL", 0.001)
+    gate = RequestGate("test", limit=1, max_waiting=2)
+    order = []
+    statuses = []
+
+    async def request(name, hold):
+        async with gate.ticket() as ticket:
+            async for position, eta in ticket.wait():
+                statuses.append((name, position, eta))
+            order.append(name)
+            await hold.wait()
+
+    async def main():
+        first_hold, second_hold = asyncio.Event(), asyncio.Event()
+        first = asyncio.ensure_future(request("first", first_hold))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(request("second", second_hold))
+        await asyncio.sleep(0.01)
+        assert gate.stats()["active"] == 1 and gate.stats()["waiting"] == 1
+
+        third = asyncio.ensure_future(request("third", asyncio.Event()))
+        await asyncio.sleep(0.01)
+        with pytest.raises(GateFull):
+            async with gate.ticket():
+                pass
+
+        # 排队中的请求被取消后离开队列，后面的请求前移
+        third.cancel()
+        await asyncio.gather(third, return_exceptions=True)
+        first_hold.set()
+        second_hold.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(main())
+    assert order == ["first", "second"]
+    wait = serving.DEFAULT_SERVICE_TIME
+    assert statuses[:2] == [("second", 0, wait), ("third", 1, 2 * wait)]
+    stats = gate.stats()
+    assert (stats["active"], stats["waiting"]) == (0, 0)
+    assert (stats["completed"], stats["rejected"], stats["abandoned"]) == (2, 1, 1)
+
+
+def test_cancelled_request_frees_its_slot_and_is_not_timed(monkeypatch):
+    monkeypatch.setattr(serving, "QUEUE_POLL_INTERVAL", 0.001)
+    gate = RequestGate("test", limit=1, max_waiting=1)
+
+    async def request():
+        async with gate.ticket() as ticket:
+            async for _ in ticket.wait():
+                pass
+            await asyncio.sleep(10)
+
+    async def main():
+        task = asyncio.ensure_future(request())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    assert gate.stats()["active"] == 0
+    assert gate.cancelled == 1
+    assert gate.service_time == serving.DEFAULT_SERVICE_TIME
+
+
+def test_estimate_wait_scales_with_concurrency():
+    gate = RequestGate("test", limit=2)
+    gate.service_time = 10.0
+    assert [gate.estimate_wait(position) for position in range(4)] == [10.0, 10.0, 20.0, 20.0]
+    gate.record(20.0)
+    assert gate.service_time == pytest.approx(10.0 + serving.SERVICE_TIME_ALPHA * 10.0)
@@ -0,0 +1,56 @@
+"""tools.smiles_extractor 的回归测试"""
+
+import pytest
+
+from tools.smiles_extractor import extract_smiles
+
+
+def test_prose_line_starting_with_smiles_like_word_is_not_a_molecule():
+    smiles, stats = extract_smiles("CNS penetration is important.")
+    assert smiles == []
+    assert stats.prose_lines == 1
+    assert stats.quality == 0.0
+
+
+@pytest.mark.parametrize("line", [
+    "- **SMILES**: CC(=O)Nc1ccc(O)cc1",
+    "**SMILES:** CC(=O)Nc1ccc(O)cc1",
+    "SMILES: CC(=O)Nc1ccc(O)cc1",
+    "1. CC(=O)Nc1ccc(O)cc1 对乙酰氨基酚",
+    "`CC(=O)Nc1ccc(O)cc1` 对乙酰氨基酚",
+    "CC(=O)Nc1ccc(O)cc1",
+])
+def test_labelled_or_standalone_smiles_is_extracted(line):
+    smiles, stats = extract_smiles(line)
+    assert smiles == ["CC(=O)Nc1ccc(O)cc1"]
+    assert stats.smiles_lines == 1
+
+
+def test_numbered_english_sentence_is_prose():
+    smiles, stats = extract_smiles("1. CCN is a common amine")
+    assert smiles == []
+    assert stats.prose_lines == 1
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("**分子1**: CCCO", "CCCO"),
+    ("分子 3：CCN", "CCN"),
+    ("SMILES 1: CCO", "CCO"),
+    ("Compound 2: c1ccccc1O", "c1ccccc1O"),
+    ("2. CCO ethanol", "CCO"),
+    ("3. CCO (ethyl alcohol, a common solvent)", "CCO"),
+])
+def test_numbered_labels_are_recognised(line, expected):
+    assert extract_smiles(line)[0] == [expected]
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("N#N", ["N#N"]),
+    ("ICl", ["ICl"]),
+    ("SMILES: CO", ["CO"]),
+    ("1. O", ["O"]),
+    ("CO", []),
+    ("1. I think so", []),
+])
+def test_small_molecules_are_kept_when_unambiguous(line, expected):
+    assert extract_smiles(line)[0] == expected
@@ -0,0 +1,45 @@
+"""tools.standardize 去重阶段的测试"""
+
+import pytest
+from rdkit import Chem
+
+from tools import chem_tools
+from tools.chem_tools import screen_molecules
+from tools.standardize import DedupIndex, SmilesDeduplicator
+
+RAW = ["OCC", "CCO", "C(C)O", "c1ccccc1O", "not-a-smiles", "Oc1ccccc1", "not-a-smiles"]
+
+
+def test_dedupe_keeps_first_occurrence_in_canonical_form():
+    dedup = SmilesDeduplicator()
+    assert dedup.dedupe(RAW) == ["CCO", "Oc1ccccc1", "not-a-smiles"]
+    assert dedup.stats() == {"total": 7, "unique": 3, "duplicates": 4, "invalid": 2}
+
+
+def test_shared_index_dedupes_across_runs():
+    index = DedupIndex()
+    assert SmilesDeduplicator(index=index).dedupe(["CCO"]) == ["CCO"]
+    assert SmilesDeduplicator(index=index).dedupe(["OCC", "CCN"]) == ["CCN"]
+
+
+def test_screening_parsed_molecules_skips_second_parse(monkeypatch):
+    molecules = SmilesDeduplicator().dedupe_mols(RAW)
+    expected = list(screen_molecules([smiles for smiles, _ in molecules], use_cache=False))
+
+    parsed = []
+
+    class CountingChem:
+        def __getattr__(self, name):
+            return getattr(Chem, name)
+
+        def MolFromSmiles(self, smiles):
+            parsed.append(smiles)
+            return Chem.MolFromSmiles(smiles)
+
+    monkeypatch.setattr(chem_tools, "Chem", CountingChem())
+    results = list(screen_molecules(molecules, use_cache=False))
+    assert parsed == []
+    # 原子顺序不同时 Crippen 贡献的求和顺序不同，LogP 只在浮点舍入上有差别
+    assert [{**r, "properties": None} for r in results] == [{**r, "properties": None} for r in expected]
+    for result, reference in zip(results, expected):
+        assert result["properties"] == (pytest.approx(reference["properties"]) if reference["valid"] else None)
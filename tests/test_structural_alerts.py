@@ -0,0 +1,19 @@
+"""tools.structural_alerts 的回归测试"""
+
+from rdkit import Chem
+
+from tools.structural_alerts import batch_structural_alerts, find_structural_alerts, get_filter_catalog
+
+AZO_PHENOL = "Oc1ccc(O)c(N=Nc2ccccc2)c1"
+
+
+def test_overlapping_catalogs_report_each_alert_once():
+    mol = Chem.MolFromSmiles(AZO_PHENOL)
+    combined = find_structural_alerts(mol, ("PAINS", "PAINS_A", "PAINS_B"))
+    assert combined == find_structural_alerts(mol, ("PAINS",))
+    assert len(combined) == len({(a["catalog"], a["description"]) for a in combined})
+    assert get_filter_catalog(("PAINS_A", "PAINS")) is get_filter_catalog(("PAINS",))
+
+
+def test_empty_smiles_is_invalid():
+    assert batch_structural_alerts(["", "CCO"]) == [None, []]
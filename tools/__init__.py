@@ -1,9 +1,92 @@
 """化学工具模块"""
 
-from .chem_tools import admet_filter, calculate_molecular_properties, validate_smiles
+from .admet_rules import CompiledRuleSet, get_rule_set, load_rule_sets
+from .chem_tools import (
+    admet_filter,
+    calculate_molecular_properties,
+    cascade_reject_counts,
+    screen_molecules,
+    screen_molecules_parallel,
+    validate_smiles,
+    warm_up
+)
+from .columnar import ADMETTable, screen_to_table
+from .descriptors import DescriptorRegistry, LazyDescriptors, get_descriptor_registry
+from .descriptor_cache import (
+    DescriptorCache,
+    configure_descriptor_cache,
+    descriptor_cache_stats,
+    get_descriptor_cache
+)
+from .fingerprint_index import FingerprintIndex, open_target_index
+from .ingest import LibraryRecord, iter_library, screen_library
+from .lazy_imports import (
+    LazyModule,
+    available,
+    format_import_report,
+    import_timings,
+    importtime_report,
+    lazy_import
+)
+from .metrics import Counter, Gauge, Histogram, render_metrics, track_request
+from .smiles_extractor import StreamingSmilesParser, extract_smiles, parse_quality, parse_smiles_from_response
+from .standardize import DedupIndex, SmilesDeduplicator, standardize_smiles
+from .structural_alerts import (
+    batch_structural_alerts,
+    find_structural_alerts,
+    get_filter_catalog
+)
+from .tracing import Trace, format_flame_summary, phase_timer, span, start_span
 
 __all__ = [
+    'CompiledRuleSet',
+    'get_rule_set',
+    'load_rule_sets',
     'admet_filter',
     'calculate_molecular_properties',
-    'validate_smiles'
+    'cascade_reject_counts',
+    'screen_molecules',
+    'screen_molecules_parallel',
+    'validate_smiles',
+    'warm_up',
+    'ADMETTable',
+    'screen_to_table',
+    'DescriptorRegistry',
+    'LazyDescriptors',
+    'get_descriptor_registry',
+    'DescriptorCache',
+    'configure_descriptor_cache',
+    'descriptor_cache_stats',
+    'get_descriptor_cache',
+    'FingerprintIndex',
+    'open_target_index',
+    'LibraryRecord',
+    'iter_library',
+    'screen_library',
+    'LazyModule',
+    'available',
+    'format_import_report',
+    'import_timings',
+    'importtime_report',
+    'lazy_import',
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'render_metrics',
+    'track_request',
+    'extract_smiles',
+    'parse_quality',
+    'parse_smiles_from_response',
+    'StreamingSmilesParser',
+    'DedupIndex',
+    'SmilesDeduplicator',
+    'standardize_smiles',
+    'batch_structural_alerts',
+    'find_structural_alerts',
+    'get_filter_catalog',
+    'Trace',
+    'format_flame_summary',
+    'phase_timer',
+    'span',
+    'start_span'
 ]
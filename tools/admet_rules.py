@@ -0,0 +1,208 @@
+"""可配置的 ADMET 规则引擎
+
+规则集以声明式 JSON/YAML 描述（默认 config/admet_rules.json，内置
+LingNexus 默认规则以及 Lipinski / Veber / Ghose / Egan），加载后编译为
+CompiledRuleSet：
+- descriptors 只包含规则实际需要的描述符，筛选引擎据此按需计算
+- 同一套比较运算既可作用于单个分子的性质字典，也可作用于 NumPy 列（向量化）
+- 界面上的指标表格、规则说明均由同一个编译结果渲染
+
+规则格式：
+    {"descriptor": "molecular_weight", "op": "<", "value": 500,
+     "label": "分子量 (MW)", "abbr": "MW", "unit": "Da", "format": ".1f"}
+op 可选 <、<=、>、>=、between（value 为 [下限, 上限]，闭区间）。
+规则集的 min_passed 表示至少满足的规则数，省略时要求全部满足。
+
+环境变量：
+- LINGNEXUS_ADMET_RULES_FILE：规则文件路径
+- LINGNEXUS_ADMET_RULES：默认使用的规则集名称
+"""
+
+import json
+import operator
+import os
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "admet_rules.json")
+
+_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge
+}
+
+
+class Rule:
+    """单条阈值规则"""
+
+    def __init__(
+        self,
+        descriptor: str,
+        op: str,
+        value: Union[float, List[float]],
+        label: Optional[str] = None,
+        abbr: Optional[str] = None,
+        unit: str = "",
+        format: str = ""
+    ):
+        if op == "between":
+            low, high = value
+            value = (float(low), float(high))
+        elif op in _OPS:
+            value = float(value)
+        else:
+            raise ValueError(f"不支持的规则运算符: {op}（可选：<、<=、>、>=、between）")
+
+        self.descriptor = descriptor
+        self.op = op
+        self.value = value
+        self.label = label or descriptor
+        self.abbr = abbr or descriptor
+        self.unit = unit
+        self.format = format
+
+    def check(self, value):
+        """判定是否满足规则；value 可以是标量或 NumPy 数组"""
+        if self.op == "between":
+            return (value >= self.value[0]) & (value <= self.value[1])
+        return _OPS[self.op](value, self.value)
+
+    def describe(self) -> str:
+        """规则的可读描述，例如「分子量 (MW) < 500 Da」"""
+        unit = f" {self.unit}" if self.unit else ""
+        if self.op == "between":
+            return f"{self.label} {self.value[0]:g}~{self.value[1]:g}{unit}"
+        return f"{self.label} {self.op} {self.value:g}{unit}"
+
+    def format_value(self, value: Any) -> str:
+        unit = f" {self.unit}" if self.unit else ""
+        return f"{value:{self.format}}{unit}"
+
+
+class CompiledRuleSet:
+    """编译后的规则集"""
+
+    def __init__(self, name: str, rules: List[Rule], min_passed: Optional[int] = None, description: str = ""):
+        if not rules:
+            raise ValueError(f"规则集 {name} 不包含任何规则")
+        self.name = name
+        self.rules = rules
+        self.min_passed = len(rules) if min_passed is None else min_passed
+        self.description = description
+        # 按出现顺序去重：筛选引擎只计算这些描述符
+        self.descriptors: Tuple[str, ...] = tuple(dict.fromkeys(rule.descriptor for rule in rules))
+
+    def with_min_passed(self, min_passed: int) -> "CompiledRuleSet":
+        """返回规则相同、通过门槛不同的规则集"""
+        return CompiledRuleSet(self.name, self.rules, min_passed, self.description)
+
+    def score(self, props: Mapping[str, Any]) -> int:
+        """单个分子满足的规则数"""
+        return sum(bool(rule.check(props[rule.descriptor])) for rule in self.rules)
+
+    def evaluate(self, props: Mapping[str, Any]) -> Tuple[int, bool]:
+        """单个分子的 (得分, 是否通过)"""
+        score = self.score(props)
+        return score, score >= self.min_passed
+
+    def criteria_columns(self, columns: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """向量化判定每条规则，返回 规则名称 → 布尔数组（NaN 视为不满足）"""
+        with np.errstate(invalid="ignore"):
+            return {rule.label: np.asarray(rule.check(columns[rule.descriptor])) for rule in self.rules}
+
+    def evaluate_columns(self, columns: Mapping[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """向量化评估整列数据，返回 (得分数组, 通过掩码)"""
+        score = np.sum(list(self.criteria_columns(columns).values()), axis=0, dtype=np.int8)
+        return score, score >= self.min_passed
+
+    def summary(self) -> str:
+        """规则说明，用于界面提示"""
+        rules = "、".join(rule.describe() for rule in self.rules)
+        if self.min_passed >= len(self.rules):
+            return f"{rules}（全部满足）"
+        return f"{rules}（至少满足 {self.min_passed} 条）"
+
+    def format_properties(self, props: Mapping[str, Any]) -> str:
+        """单行性质摘要，例如「MW=325.4, QED=0.94」"""
+        return ", ".join(
+            f"{rule.abbr}={props[rule.descriptor]:{rule.format}}"
+            for rule in self.rules if rule.descriptor in props
+        )
+
+    def render_markdown_table(self, props: Mapping[str, Any]) -> str:
+        """渲染「指标 | 数值 | 状态」Markdown 表格"""
+        lines = ["| 指标 | 数值 | 状态 |", "|------|------|------|"]
+        for rule in self.rules:
+            value = props[rule.descriptor]
+            lines.append(f"| {rule.label} | {rule.format_value(value)} | {'✅' if rule.check(value) else '⚠️'} |")
+        return "\n".join(lines) + "\n"
+
+
+def compile_rule_set(name: str, spec: Mapping[str, Any]) -> CompiledRuleSet:
+    """将单个规则集的声明式描述编译为 CompiledRuleSet"""
+    rules = [Rule(**rule) for rule in spec.get("rules", [])]
+    return CompiledRuleSet(name, rules, spec.get("min_passed"), spec.get("description", ""))
+
+
+def _read_rules_file(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("读取 YAML 规则文件需要 PyYAML。请运行：pip install pyyaml")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if not data or not data.get("rule_sets"):
+        raise ValueError(f"规则文件 {path} 中没有定义 rule_sets")
+    return data
+
+
+_compiled: Dict[str, Tuple[str, Dict[str, CompiledRuleSet]]] = {}
+_compiled_lock = threading.Lock()
+
+
+def load_rule_sets(path: Optional[str] = None) -> Tuple[str, Dict[str, CompiledRuleSet]]:
+    """加载并编译规则文件（每个文件只编译一次）
+
+    Args:
+        path: 规则文件路径，默认读取 LINGNEXUS_ADMET_RULES_FILE 或 config/admet_rules.json
+
+    Returns:
+        Tuple: (默认规则集名称, 名称 → CompiledRuleSet)
+    """
+    path = path or os.environ.get("LINGNEXUS_ADMET_RULES_FILE") or DEFAULT_RULES_PATH
+    with _compiled_lock:
+        if path not in _compiled:
+            data = _read_rules_file(path)
+            rule_sets = {name: compile_rule_set(name, spec) for name, spec in data["rule_sets"].items()}
+            _compiled[path] = (data.get("default") or next(iter(rule_sets)), rule_sets)
+        return _compiled[path]
+
+
+def get_rule_set(name: Optional[Union[str, CompiledRuleSet]] = None, path: Optional[str] = None) -> CompiledRuleSet:
+    """获取编译后的规则集
+
+    Args:
+        name: 规则集名称；None 表示默认规则集（LINGNEXUS_ADMET_RULES 或文件中的 default）；
+            传入 CompiledRuleSet 时原样返回
+        path: 规则文件路径
+
+    Returns:
+        CompiledRuleSet: 编译后的规则集
+    """
+    if isinstance(name, CompiledRuleSet):
+        return name
+
+    default_name, rule_sets = load_rule_sets(path)
+    name = name or os.environ.get("LINGNEXUS_ADMET_RULES") or default_name
+    try:
+        return rule_sets[name]
+    except KeyError:
+        raise ValueError(f"未知的规则集: {name}（可选：{', '.join(rule_sets)}）")
@@ -3,7 +3,48 @@
 提供 SMILES 验证、性质计算、ADMET 评估等功能
 """
 
-from typing import List, Dict, Optional
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .admet_rules import CompiledRuleSet, Rule, get_rule_set
+from .descriptor_cache import DescriptorCache, get_descriptor_cache
+from .descriptors import LazyDescriptors, get_descriptor_registry
+from .lazy_imports import LazyModule
+from .metrics import record_screening
+from .structural_alerts import find_structural_alerts, get_filter_catalog
+from .tracing import phase_timer
+
+
+# RDKit 在首次使用时导入一次（见 tools.lazy_imports）
+Chem = LazyModule("rdkit.Chem")
+
+
+# calculate_molecular_properties 默认返回的性质
+DEFAULT_DESCRIPTORS = (
+    "molecular_weight",
+    "logp",
+    "qed",
+    "tpsa",
+    "rotatable_bonds",
+    "h_bond_donors",
+    "h_bond_acceptors",
+    "aromatic_rings"
+)
+
+# 并行模式：输入少于该数量时直接串行执行（进程池启动开销大于收益）
+PARALLEL_MIN_BATCH = 500
+DEFAULT_CHUNKSIZE = 256
+
+# 级联模式：判定到开销不低于该值的描述符（见 tools.descriptors 的 cost）时才查询缓存。
+# 生成缓存键的规范 SMILES 约需 35~100 微秒，分子量、HBD、TPSA、HBA 直接计算更快
+CASCADE_CACHE_MIN_COST = 60
+# 非级联模式：请求的描述符总开销不低于该值时才使用缓存。查询一次缓存（规范 SMILES
+# 加 SQLite 读取）约 100~150 微秒，只含廉价描述符的规则集（如 lipinski）直接计算更快
+CACHE_MIN_COST = 300
 
 
 def validate_smiles(smiles: str) -> bool:
@@ -16,7 +57,6 @@ def validate_smiles(smiles: str) -> bool:
         bool: 是否有效
     """
     try:
-        from rdkit import Chem
         mol = Chem.MolFromSmiles(smiles)
         return mol is not None
     except ImportError:
@@ -24,89 +64,492 @@ def validate_smiles(smiles: str) -> bool:
         return len(smiles) > 0 and not smiles.isspace()
 
 
-def calculate_molecular_properties(smiles: str) -> Optional[Dict[str, float]]:
+def _cached_values(
+    mol,
+    cache: Optional[DescriptorCache],
+    canonical: Optional[str] = None
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """返回 (缓存键, 缓存中已有的性质)；不使用缓存时为 (None, {})
+    
+    canonical 为调用方已知的规范 SMILES（如去重阶段的输出），给出时不再重新生成。
+    """
+    if cache is None:
+        return None, {}
+    
+    key = canonical or Chem.MolToSmiles(mol)
+    return key, cache.get(key) or {}
+
+
+def _store_values(cache: Optional[DescriptorCache], key: Optional[str], values: Dict[str, Any]) -> None:
+    """将公开描述符写回缓存（中间结果不缓存）"""
+    if cache is not None:
+        cache.put(key, {name: value for name, value in values.items() if not name.startswith("_")})
+
+
+def _cache_for(descriptors: Sequence[str], use_cache: bool) -> Optional[DescriptorCache]:
+    """按描述符总开销决定是否查询缓存（见 CACHE_MIN_COST）"""
+    if not use_cache or get_descriptor_registry().total_cost(descriptors) < CACHE_MIN_COST:
+        return None
+    return get_descriptor_cache()
+
+
+def _compute_properties(
+    mol,
+    descriptors: Sequence[str],
+    cache: Optional[DescriptorCache],
+    lazy: bool = False,
+    timer=None,
+    canonical: Optional[str] = None
+) -> Union[Dict[str, float], LazyDescriptors]:
+    """计算单个 Mol 的指定性质，缓存中已有的性质直接复用
+    
+    lazy=True 时返回 LazyDescriptors，访问到的性质才会计算并写回缓存。
+    timer 为追踪时的 PhaseTimer（见 tools.tracing），canonical 为已知的规范 SMILES。
+    """
+    registry = get_descriptor_registry()
+    if timer is None or cache is None:
+        key, values = _cached_values(mol, cache, canonical)
+    else:
+        began = time.perf_counter()
+        key, values = _cached_values(mol, cache, canonical)
+        timer.add("descriptor_cache", time.perf_counter() - began)
+    if lazy:
+        on_compute = (lambda props: cache.put(key, props)) if cache is not None else None
+        return LazyDescriptors(mol, descriptors, registry, values, on_compute)
+    
+    known = len(values)
+    props = registry.compute(mol, descriptors, values, timer=timer)
+    if len(values) > known:
+        _store_values(cache, key, values)
+    return props
+
+
+def calculate_molecular_properties(
+    smiles: str,
+    use_cache: bool = True,
+    descriptors: Optional[Sequence[str]] = None,
+    lazy: bool = False
+) -> Optional[Union[Dict[str, float], LazyDescriptors]]:
     """计算分子性质
     
     Args:
         smiles: SMILES 字符串
+        use_cache: 是否使用描述符缓存（见 tools.descriptor_cache）；lazy=False 且所需
+            描述符都很廉价（总开销低于 CACHE_MIN_COST）时直接计算，不查询缓存
+        descriptors: 只计算这些性质，默认 DEFAULT_DESCRIPTORS（可选名称见 tools.descriptors）
+        lazy: 返回按需计算的 LazyDescriptors 映射，每个性质在首次访问时才计算
         
     Returns:
         Dict: 包含分子量、LogP、QED、TPSA 等性质，若无效则返回 None
     """
     try:
-        from rdkit import Chem
-        from rdkit.Chem import Descriptors, QED
-        
         mol = Chem.MolFromSmiles(smiles)
         if mol is None:
             return None
         
-        properties = {
-            "molecular_weight": Descriptors.MolWt(mol),
-            "logp": Descriptors.MolLogP(mol),
-            "qed": QED.qed(mol),
-            "tpsa": Descriptors.TPSA(mol),
-            "rotatable_bonds": Descriptors.NumRotatableBonds(mol),
-            "h_bond_donors": Descriptors.NumHDonors(mol),
-            "h_bond_acceptors": Descriptors.NumHAcceptors(mol),
-            "aromatic_rings": Descriptors.NumAromaticRings(mol)
-        }
-        
-        return properties
+        names = get_descriptor_registry().validate(DEFAULT_DESCRIPTORS if descriptors is None else descriptors)
+        if lazy:
+            cache = get_descriptor_cache() if use_cache else None
+        else:
+            cache = _cache_for(names, use_cache)
+        return _compute_properties(mol, names, cache, lazy=lazy)
         
     except ImportError:
         print("警告：未安装 RDKit，无法计算分子性质。请运行：pip install rdkit")
         return None
 
 
-def admet_filter(smiles_list: List[str], verbose: bool = True) -> List[Dict[str, any]]:
-    """轻量级 ADMET 过滤（基于 Lipinski 规则和 QED）
+def score_properties(
+    props: Dict[str, float],
+    rule_set: Optional[Union[str, CompiledRuleSet]] = None
+) -> int:
+    """按 ADMET 规则集为分子性质打分
+    
+    Args:
+        props: calculate_molecular_properties 返回的性质字典
+        rule_set: 规则集名称或编译结果，默认使用默认规则集（见 tools.admet_rules）
+        
+    Returns:
+        int: 满足的规则数
+    """
+    return get_rule_set(rule_set).score(props)
+
+
+def _alert_stage(check_pains: bool, alert_catalogs: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+    """确定结构警示阶段使用的目录组合，None 表示不启用该阶段"""
+    names = set(alert_catalogs or ())
+    if check_pains:
+        names.add("PAINS")
+    return tuple(sorted(names)) or None
+
+
+def _cascade_order(rules: CompiledRuleSet) -> List[Rule]:
+    """级联模式的规则顺序：按描述符计算开销从低到高（开销相同时保持规则集中的顺序）"""
+    registry = get_descriptor_registry()
+    return sorted(rules.rules, key=lambda rule: registry.cost(rule.descriptor))
+
+
+def _cascade_cache_from(ordered_rules: List[Rule]) -> int:
+    """级联模式中第一条需要查询缓存的规则的下标（没有时为规则数）"""
+    registry = get_descriptor_registry()
+    for index, rule in enumerate(ordered_rules):
+        if registry.cost(rule.descriptor) >= CASCADE_CACHE_MIN_COST:
+            return index
+    return len(ordered_rules)
+
+
+def _evaluate_cascade(
+    mol,
+    ordered_rules: List[Rule],
+    min_passed: int,
+    values: Dict[str, Any],
+    cache: Optional[DescriptorCache] = None,
+    cache_from: int = 0,
+    canonical: Optional[str] = None
+) -> Tuple[int, bool, Optional[str]]:
+    """按顺序逐条判定规则，结果确定后立即停止
+    
+    给定 cache 时，判定到第 cache_from 条规则前才查询缓存（已计算的值保留），
+    结束时把新算出的描述符写回；在廉价规则处就被淘汰或通过的分子不会触碰缓存。
+    
+    Returns:
+        Tuple: (已判定规则中满足的条数, 是否通过, 淘汰时所在的规则缩写)
+    """
+    registry = get_descriptor_registry()
+    satisfied = 0
+    remaining = len(ordered_rules)
+    key = None
+    known = 0
+    outcome = None
+    for index, rule in enumerate(ordered_rules):
+        if index == cache_from and cache is not None:
+            key, cached = _cached_values(mol, cache, canonical)
+            for name, value in cached.items():
+                values.setdefault(name, value)
+            known = len(values)
+        remaining -= 1
+        if rule.check(registry.evaluate(mol, rule.descriptor, values)):
+            satisfied += 1
+            if satisfied >= min_passed:
+                outcome = (satisfied, True, None)
+                break
+        elif satisfied + remaining < min_passed:
+            outcome = (satisfied, False, rule.abbr)
+            break
+    if key is not None and len(values) > known:
+        _store_values(cache, key, values)
+    if outcome is None:
+        passed = satisfied >= min_passed
+        outcome = (satisfied, passed, None if passed else ordered_rules[-1].abbr)
+    return outcome
+
+
+def cascade_reject_counts(results: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """统计级联筛选结果中各阶段淘汰的分子数（按阶段名称，保持首次出现顺序）"""
+    counts: Dict[str, int] = {}
+    for result in results:
+        stage = result.get("rejected_by")
+        if stage is not None:
+            counts[stage] = counts.get(stage, 0) + 1
+    return counts
+
+
+def screen_molecules(
+    smiles_iter: Iterable[Union[str, Tuple[str, Any]]],
+    check_pains: bool = False,
+    alert_catalogs: Optional[Sequence[str]] = None,
+    use_cache: bool = True,
+    rule_set: Optional[Union[str, CompiledRuleSet]] = None,
+    cascade: bool = False,
+    extra_descriptors: Sequence[str] = ()
+) -> Iterator[Dict[str, Any]]:
+    """批量 ADMET 筛选引擎
+    
+    每个 SMILES 只解析一次，得到的 Mol 对象依次用于
+    有效性验证、性质计算、规则打分以及（可选的）结构警示检查。
+    输入也可以是已解析的 (规范 SMILES, Mol) 二元组（如 SmilesDeduplicator.filter_mols
+    的输出，Mol 为 None 表示无效），此时不再解析，规范 SMILES 直接用作缓存键。
+    只计算规则集需要的描述符（外加 extra_descriptors）。
+    
+    cascade=True 时按描述符开销从低到高逐条判定规则（分子量、原子数最先，
+    HBD/HBA、TPSA、LogP 其次，QED 与结构警示最后），一旦能确定通过与否就
+    停止计算；描述符缓存只在判定昂贵规则（如 QED）前才查询。score 为已判定
+    规则中满足的条数，并额外给出 rejected_by（淘汰阶段：invalid、规则缩写或
+    alerts，通过时为 None），可用 cascade_reject_counts 汇总。
+    
+    注意：级联模式下 properties 只包含实际算过的描述符，通过的分子也可能缺少
+    部分规则描述符。直接按键取值的调用方（如 app.render_molecule_table）会抛出
+    KeyError，需要完整性质时请使用 cascade=False。
+    
+    在追踪中调用时（见 tools.tracing），解析、各描述符、规则判定与结构警示
+    按环节累计耗时，迭代结束时各记录为一个聚合 Span。
+    
+    Args:
+        smiles_iter: SMILES 字符串或 (规范 SMILES, Mol) 的列表或迭代器（可以是惰性生成器）
+        check_pains: 是否进行 PAINS 结构检查（等价于 alert_catalogs 包含 "PAINS"）
+        alert_catalogs: 结构警示目录，如 ("PAINS", "BRENK")，命中任一警示的分子判为不通过
+        use_cache: 是否使用描述符缓存（见 tools.descriptor_cache）；规则集只需要廉价
+            描述符（总开销低于 CACHE_MIN_COST）时不查询缓存
+        rule_set: 规则集名称或编译结果，默认使用默认规则集（见 tools.admet_rules）
+        cascade: 是否使用级联早停模式
+        extra_descriptors: 规则之外还需要的描述符（如报告中的平均 QED），级联模式下
+            只为通过规则的分子计算
+        
+    Yields:
+        Dict: 每个输入对应一条结果，按输入顺序输出，包含
+            smiles / valid / properties / score / passed（启用警示阶段时还有 alerts，
+            级联模式下还有 rejected_by）
+    """
+    rules = get_rule_set(rule_set)
+    try:
+        registry = get_descriptor_registry()
+        extra = registry.validate(tuple(dict.fromkeys(extra_descriptors)))
+        descriptors = registry.validate(tuple(dict.fromkeys(rules.descriptors + extra)))
+    except ImportError:
+        print("警告：未安装 RDKit，无法计算分子性质。请运行：pip install rdkit")
+        for item in smiles_iter:
+            smiles = item[0] if isinstance(item, tuple) else item
+            yield {"smiles": smiles, "valid": False, "properties": None, "score": 0, "passed": False}
+        return
+    
+    catalogs = _alert_stage(check_pains, alert_catalogs)
+    if catalogs is not None:
+        get_filter_catalog(catalogs)
+    if cascade:
+        cache = get_descriptor_cache() if use_cache else None
+    else:
+        cache = _cache_for(descriptors, use_cache)
+    ordered_rules = _cascade_order(rules) if cascade else None
+    cache_from = _cascade_cache_from(ordered_rules) if cascade else 0
+    # 追踪时按环节累计耗时（见 tools.tracing），未追踪时为 None
+    timer = phase_timer()
+    clock = time.perf_counter
+    started = clock()
+    counts = {True: 0, False: 0, None: 0}  # 通过 / 未通过 / 无效，结束时计入 tools.metrics
+    
+    try:
+        for item in smiles_iter:
+            if isinstance(item, tuple):
+                # 去重阶段已解析并生成规范 SMILES
+                smiles, mol = item
+                canonical = smiles
+            else:
+                smiles, canonical = item, None
+                began = clock() if timer is not None else 0.0
+                # 空字符串会被 RDKit 解析为零原子分子，这里按无效处理
+                mol = Chem.MolFromSmiles(smiles) if smiles else None
+                if timer is not None:
+                    timer.add("rdkit.parse", clock() - began)
+            if mol is None:
+                result = {"smiles": smiles, "valid": False, "properties": None, "score": 0, "passed": False}
+                if cascade:
+                    result["rejected_by"] = "invalid"
+                counts[None] += 1
+                yield result
+                continue
+            
+            if cascade:
+                began = clock() if timer is not None else 0.0
+                values: Dict[str, Any] = {}
+                score, passed, rejected_by = _evaluate_cascade(
+                    mol, ordered_rules, rules.min_passed, values, cache, cache_from, canonical
+                )
+                if passed and extra:
+                    registry.compute(mol, extra, values, timer=timer)
+                props = {name: values[name] for name in descriptors if name in values}
+                if timer is not None:
+                    timer.add("rules.cascade", clock() - began)
+            else:
+                props = _compute_properties(mol, descriptors, cache, timer=timer, canonical=canonical)
+                began = clock() if timer is not None else 0.0
+                score, passed = rules.evaluate(props)
+                if timer is not None:
+                    timer.add("rules.evaluate", clock() - began)
+            
+            result = {
+                "smiles": smiles,
+                "valid": True,
+                "properties": props,
+                "score": score,
+                "passed": passed
+            }
+            
+            if catalogs is not None:
+                # 级联模式下已被规则淘汰的分子不再做子结构匹配
+                began = clock() if timer is not None else 0.0
+                result["alerts"] = find_structural_alerts(mol, catalogs) if passed or not cascade else []
+                result["passed"] = result["passed"] and not result["alerts"]
+                if timer is not None:
+                    timer.add("structural_alerts", clock() - began)
+            
+            if cascade:
+                result["rejected_by"] = "alerts" if passed and not result["passed"] else rejected_by
+            
+            counts[result["passed"]] += 1
+            yield result
+    finally:
+        record_screening(counts[True], counts[False], counts[None], clock() - started)
+        if timer is not None:
+            timer.flush()
+
+
+def _screen_chunk(
+    chunk: List[str],
+    alert_catalogs: Optional[Tuple[str, ...]],
+    use_cache: bool,
+    rule_set: CompiledRuleSet,
+    cascade: bool = False
+) -> List[Dict[str, Any]]:
+    """进程池工作函数：在子进程中筛选一个分块"""
+    results = list(screen_molecules(
+        chunk, alert_catalogs=alert_catalogs, use_cache=use_cache, rule_set=rule_set, cascade=cascade
+    ))
+    cache = get_descriptor_cache() if use_cache else None
+    if cache is not None:
+        cache.flush()
+    return results
+
+
+def _iter_chunks(items: Iterator[str], chunksize: int) -> Iterator[List[str]]:
+    """将迭代器按 chunksize 切分为列表"""
+    while True:
+        chunk = list(islice(items, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def screen_molecules_parallel(
+    smiles_iter: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    check_pains: bool = False,
+    alert_catalogs: Optional[Sequence[str]] = None,
+    use_cache: bool = True,
+    rule_set: Optional[Union[str, CompiledRuleSet]] = None,
+    cascade: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """多进程版本的 screen_molecules
+    
+    输入按 chunksize 分块分发到进程池，结果按输入顺序输出。任意时刻只有
+    约 2 × workers 个分块在途，因此可以安全地处理惰性的大型迭代器。
+    输入不足 PARALLEL_MIN_BATCH 条时退化为串行执行。
     
     Args:
-        smiles_list: SMILES 字符串列表
+        smiles_iter: SMILES 字符串列表或迭代器
+        workers: 进程数，默认使用全部 CPU 核心
+        chunksize: 每个分块的分子数，默认 DEFAULT_CHUNKSIZE
+        check_pains: 是否同时进行 PAINS 结构检查
+        alert_catalogs: 结构警示目录组合
+        use_cache: 是否使用描述符缓存（各子进程各自连接同一个缓存文件，子进程中的
+            命中与未命中不计入主进程的 descriptor_cache_stats()）
+        rule_set: 规则集名称或编译结果
+        cascade: 是否使用级联早停模式（见 screen_molecules）
+        
+    Yields:
+        Dict: 与 screen_molecules 相同格式的结果
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or DEFAULT_CHUNKSIZE
+    catalogs = _alert_stage(check_pains, alert_catalogs)
+    rules = get_rule_set(rule_set)
+    
+    items = iter(smiles_iter)
+    head = list(islice(items, PARALLEL_MIN_BATCH))
+    if workers <= 1 or len(head) < PARALLEL_MIN_BATCH:
+        yield from screen_molecules(
+            chain(head, items), alert_catalogs=catalogs, use_cache=use_cache,
+            rule_set=rules, cascade=cascade
+        )
+        return
+    
+    chunks = _iter_chunks(chain(head, items), chunksize)
+    max_in_flight = workers * 2
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_screen_chunk, chunk, catalogs, use_cache, rules, cascade))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def admet_filter(
+    smiles_list: Iterable[str],
+    verbose: bool = True,
+    check_pains: bool = False,
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    alert_catalogs: Optional[Sequence[str]] = None,
+    use_cache: bool = True,
+    rule_set: Optional[Union[str, CompiledRuleSet]] = None,
+    cascade: bool = False
+) -> List[Dict[str, Any]]:
+    """轻量级 ADMET 过滤（默认规则集：Lipinski 规则 + QED，见 tools.admet_rules）
+    
+    Args:
+        smiles_list: SMILES 字符串列表（或迭代器）
         verbose: 是否打印详细信息
+        check_pains: 是否同时剔除含 PAINS 结构的分子
+        workers: 并行进程数，None 或 1 表示串行，0 表示使用全部 CPU 核心
+        chunksize: 并行模式下每个分块的分子数
+        alert_catalogs: 可选的结构警示阶段，如 ("PAINS", "BRENK", "NIH")
+        use_cache: 是否使用描述符缓存（见 tools.descriptor_cache）
+        rule_set: 规则集名称或编译结果，默认使用默认规则集
+        cascade: 级联早停模式，适合大型化合物库：按开销从低到高判定规则，结果确定即停止
+            （通过分子的 properties 可能不完整；verbose 时最后打印各阶段淘汰数）
         
     Returns:
-        List[Dict]: 通过筛选的分子及其性质
+        List[Dict]: 通过筛选的分子及其性质（保持输入顺序）；properties 只包含规则集用到的
+            描述符（默认规则集不含 h_bond_donors、h_bond_acceptors、aromatic_rings），
+            需要完整性质时用 calculate_molecular_properties
     """
     passed = []
+    rules = get_rule_set(rule_set)
+    
+    if workers is None or workers == 1:
+        results = screen_molecules(
+            smiles_list, check_pains=check_pains,
+            alert_catalogs=alert_catalogs, use_cache=use_cache, rule_set=rules, cascade=cascade
+        )
+    else:
+        results = screen_molecules_parallel(
+            smiles_list, workers=workers, chunksize=chunksize,
+            check_pains=check_pains, alert_catalogs=alert_catalogs,
+            use_cache=use_cache, rule_set=rules, cascade=cascade
+        )
     
-    for idx, smiles in enumerate(smiles_list, 1):
-        props = calculate_molecular_properties(smiles)
+    rejects: Dict[str, int] = {}
+    for idx, result in enumerate(results, 1):
+        smiles = result["smiles"]
+        props = result["properties"]
+        stage = result.pop("rejected_by", None)
+        if stage is not None:
+            rejects[stage] = rejects.get(stage, 0) + 1
         
-        if props is None:
+        if not result["valid"]:
             if verbose:
                 print(f"❌ 分子 {idx}: 无效的 SMILES - {smiles}")
             continue
         
-        # ADMET 筛选规则
-        mw_ok = props["molecular_weight"] < 500
-        qed_ok = props["qed"] > 0.6
-        logp_ok = 1 <= props["logp"] <= 5
-        tpsa_ok = props["tpsa"] < 140
-        rotatable_ok = props["rotatable_bonds"] < 10
-        
-        # 整体评分
-        score = sum([mw_ok, qed_ok, logp_ok, tpsa_ok, rotatable_ok])
-        pass_threshold = 3  # 至少满足 3 个条件
-        
-        if score >= pass_threshold:
-            result = {
-                "smiles": smiles,
-                "properties": props,
-                "score": score,
-                "passed": True
-            }
+        if result["passed"]:
+            del result["valid"]
             passed.append(result)
             
             if verbose:
                 print(f"✅ 分子 {idx}: {smiles}")
-                print(f"   MW={props['molecular_weight']:.1f}, QED={props['qed']:.2f}, "
-                      f"LogP={props['logp']:.2f}, TPSA={props['tpsa']:.1f}")
+                print(f"   {rules.format_properties(props)}")
         else:
             if verbose:
                 print(f"⚠️  分子 {idx}: 未通过筛选 - {smiles}")
-                print(f"   MW={props['molecular_weight']:.1f}, QED={props['qed']:.2f}")
+                print(f"   {rules.format_properties(props)}")
+                if result.get("alerts"):
+                    print(f"   结构警示: {', '.join(a['description'] for a in result['alerts'])}")
+    
+    if cascade and verbose:
+        print(f"级联筛选各阶段淘汰数: {', '.join(f'{stage}={count}' for stage, count in rejects.items()) or '无'}")
     
     return passed
 
@@ -121,17 +564,11 @@ def check_pains_alerts(smiles: str) -> bool:
         bool: True 表示安全（无 PAINS），False 表示有问题
     """
     try:
-        from rdkit import Chem
-        from rdkit.Chem.FilterCatalog import FilterCatalog, FilterCatalogParams
-        
         mol = Chem.MolFromSmiles(smiles)
         if mol is None:
             return False
         
-        params = FilterCatalogParams()
-        params.AddCatalog(FilterCatalogParams.FilterCatalogs.PAINS)
-        catalog = FilterCatalog(params)
-        
+        catalog = get_filter_catalog(("PAINS",))
         entry = catalog.GetFirstMatch(mol)
         return entry is None  # None 表示无匹配（安全）
         
@@ -140,6 +577,40 @@ def check_pains_alerts(smiles: str) -> bool:
         return True
 
 
+# 预热使用的示例分子
+WARM_UP_SMILES = "COc1ccc(NC(=O)c2ccccc2)cc1N1CCN(C)CC1"
+
+
+def warm_up(check_pains: bool = True) -> Dict[str, float]:
+    """预热筛选引擎：导入 RDKit、解析示例分子、构建描述符注册表与规则集、
+    （可选）构建 PAINS 目录，使第一个用户请求不再承担这些一次性开销
+    
+    Args:
+        check_pains: 是否构建 PAINS 目录
+        
+    Returns:
+        Dict[str, float]: 各步骤耗时（秒）；未安装 RDKit 时只包含已完成的步骤
+    """
+    steps = [
+        ("import rdkit + 解析示例分子", lambda: Chem.MolFromSmiles(WARM_UP_SMILES)),
+        ("描述符注册表", lambda: calculate_molecular_properties(WARM_UP_SMILES, use_cache=False)),
+        ("ADMET 规则集", get_rule_set),
+        ("筛选引擎", lambda: list(screen_molecules([WARM_UP_SMILES], use_cache=False)))
+    ]
+    if check_pains:
+        steps.append(("PAINS 目录", lambda: get_filter_catalog(("PAINS",))))
+    
+    timings = {}
+    try:
+        for name, step in steps:
+            start = time.perf_counter()
+            step()
+            timings[name] = time.perf_counter() - start
+    except ImportError:
+        print("警告：未安装 RDKit，跳过筛选引擎预热。请运行：pip install rdkit")
+    return timings
+
+
 if __name__ == "__main__":
     # 测试示例
     test_smiles = [
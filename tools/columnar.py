@@ -0,0 +1,234 @@
+"""列式 ADMET 筛选结果
+
+admet_filter 返回的嵌套字典列表在百万分子规模下内存开销大，且每次阈值
+调整或统计都要写 Python 循环。ADMETTable 以每个描述符一列 NumPy 数组
+（外加 SMILES 列和通过掩码）保存结果：
+- 规则判定（tools.admet_rules）、重新设阈值都是向量化运算，不需要重新计算描述符
+- 数值列可零拷贝导出到 Arrow / Parquet（需安装 pyarrow）
+- to_records() 提供与 admet_filter 相同格式的字典列表视图
+"""
+
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .admet_rules import CompiledRuleSet, get_rule_set
+from .chem_tools import screen_molecules, screen_molecules_parallel
+
+
+# 整数型描述符：列中以 float64 存储（NaN 表示缺失），导出记录时还原为 int
+INTEGER_DESCRIPTORS = frozenset({
+    "rotatable_bonds",
+    "h_bond_donors",
+    "h_bond_acceptors",
+    "aromatic_rings",
+    "heavy_atoms",
+    "num_atoms",
+    "lipinski_violations"
+})
+
+
+class ADMETTable:
+    """列式 ADMET 结果表（无效 SMILES 的描述符为 NaN）"""
+
+    def __init__(
+        self,
+        smiles: np.ndarray,
+        valid: np.ndarray,
+        columns: Dict[str, np.ndarray],
+        score: np.ndarray,
+        passed: np.ndarray,
+        alert_count: Optional[np.ndarray] = None,
+        rejected_by: Optional[np.ndarray] = None
+    ):
+        self.smiles = smiles
+        self.valid = valid
+        self.columns = columns
+        self.score = score
+        self.passed = passed
+        self.alert_count = alert_count
+        # 级联模式（screen_molecules(cascade=True)）的淘汰阶段，其余模式为 None
+        self.rejected_by = rejected_by
+
+    @classmethod
+    def from_results(cls, results: Iterable[Dict[str, Any]]) -> "ADMETTable":
+        """由 screen_molecules 的结果流构建（逐条追加，不保留中间字典）"""
+        smiles: List[str] = []
+        valid = array('b')
+        score = array('b')
+        passed = array('b')
+        alerts = array('q')  # 'q' 在各平台上都是 8 字节，与 int64 一致（Windows 上 'l' 只有 4 字节）
+        has_alerts = False
+        rejected_by: List[Optional[str]] = []
+        is_cascade = False
+        buffers: Dict[str, array] = {}
+
+        for row, result in enumerate(results):
+            smiles.append(result["smiles"])
+            valid.append(result["valid"])
+            score.append(result["score"])
+            passed.append(result["passed"])
+            if "alerts" in result:
+                has_alerts = True
+            alerts.append(len(result.get("alerts") or ()))
+            if "rejected_by" in result:
+                is_cascade = True
+            rejected_by.append(result.get("rejected_by"))
+            props = result["properties"] or {}
+            for name in props:
+                if name not in buffers:
+                    # 新出现的列：之前的行补 NaN
+                    buffers[name] = array('d', [np.nan]) * row
+            for name, buffer in buffers.items():
+                buffer.append(props.get(name, np.nan))
+
+        return cls(
+            smiles=np.array(smiles, dtype=object),
+            valid=np.frombuffer(valid, dtype=np.int8).astype(bool),
+            columns={name: np.frombuffer(buffer, dtype=np.float64) for name, buffer in buffers.items()},
+            score=np.frombuffer(score, dtype=np.int8).copy(),
+            passed=np.frombuffer(passed, dtype=np.int8).astype(bool),
+            alert_count=np.frombuffer(alerts, dtype=np.int64) if has_alerts else None,
+            rejected_by=np.array(rejected_by, dtype=object) if is_cascade else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.smiles)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def criteria(self, rule_set: Optional[Union[str, CompiledRuleSet]] = None) -> Dict[str, np.ndarray]:
+        """向量化判定规则集中的每条规则，返回 规则名称 → 布尔数组"""
+        return get_rule_set(rule_set).criteria_columns(self.columns)
+
+    def rethreshold(
+        self,
+        pass_threshold: Optional[int] = None,
+        rule_set: Optional[Union[str, CompiledRuleSet]] = None
+    ) -> "ADMETTable":
+        """用新的规则集或通过门槛重新判定（不重新计算描述符），返回共享描述符列的新表
+
+        规则集需要的描述符必须已经在表中（即筛选时使用的规则集覆盖了这些描述符），
+        且不能是级联模式的结果（被提前淘汰的分子缺少部分描述符）。
+
+        Args:
+            pass_threshold: 至少满足的规则数，默认使用规则集自身的 min_passed
+            rule_set: 规则集名称或编译结果，默认使用默认规则集
+        """
+        if self.rejected_by is not None:
+            raise ValueError("级联模式的结果缺少部分描述符，无法重新判定；请用 cascade=False 重新筛选")
+        rules = get_rule_set(rule_set)
+        if pass_threshold is not None:
+            rules = rules.with_min_passed(pass_threshold)
+        score, passed = rules.evaluate_columns(self.columns)
+        passed &= self.valid
+        if self.alert_count is not None:
+            passed &= self.alert_count == 0
+        return ADMETTable(self.smiles, self.valid, self.columns, score, passed, self.alert_count)
+
+    def filter(self, mask: np.ndarray) -> "ADMETTable":
+        """按布尔掩码选取行"""
+        return ADMETTable(
+            self.smiles[mask],
+            self.valid[mask],
+            {name: column[mask] for name, column in self.columns.items()},
+            self.score[mask],
+            self.passed[mask],
+            self.alert_count[mask] if self.alert_count is not None else None,
+            self.rejected_by[mask] if self.rejected_by is not None else None
+        )
+
+    def reject_counts(self) -> Dict[str, int]:
+        """级联模式下各阶段淘汰的分子数（非级联结果返回空字典）"""
+        if self.rejected_by is None:
+            return {}
+        stages, counts = np.unique(self.rejected_by[self.rejected_by != None].astype(str), return_counts=True)  # noqa: E711
+        return dict(zip(stages.tolist(), counts.tolist()))
+
+    def mean(self, name: str, mask: Optional[np.ndarray] = None) -> float:
+        """列均值（默认只统计有效分子），没有数据时返回 0"""
+        if name not in self.columns:
+            return 0.0
+        mask = self.valid if mask is None else mask
+        values = self.columns[name][mask]
+        return float(values.mean()) if len(values) else 0.0
+
+    def to_records(self, only_passed: bool = True) -> List[Dict[str, Any]]:
+        """转换为 admet_filter 格式的字典列表
+
+        Args:
+            only_passed: True 只返回通过筛选的分子（与 admet_filter 相同），False 返回全部有效分子
+        """
+        mask = self.passed if only_passed else self.valid
+        records = []
+        for row in np.flatnonzero(mask):
+            props = {}
+            for name, column in self.columns.items():
+                value = column[row].item()
+                if np.isnan(value):
+                    continue
+                props[name] = int(value) if name in INTEGER_DESCRIPTORS else value
+            records.append({
+                "smiles": self.smiles[row],
+                "properties": props,
+                "score": int(self.score[row]),
+                "passed": bool(self.passed[row])
+            })
+        return records
+
+    def to_arrow(self):
+        """导出为 pyarrow.Table（数值列零拷贝）"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("导出 Arrow/Parquet 需要 pyarrow。请运行：pip install pyarrow")
+
+        arrays = {
+            "smiles": pa.array(self.smiles.tolist(), type=pa.string()),
+            "valid": pa.array(self.valid),
+            **{name: pa.array(column) for name, column in self.columns.items()},
+            "score": pa.array(self.score),
+            "passed": pa.array(self.passed)
+        }
+        if self.alert_count is not None:
+            arrays["alert_count"] = pa.array(self.alert_count)
+        if self.rejected_by is not None:
+            arrays["rejected_by"] = pa.array(self.rejected_by.tolist(), type=pa.string())
+        return pa.table(arrays)
+
+    def to_parquet(self, path: str) -> None:
+        """写出 Parquet 文件（需要 pyarrow）"""
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path)
+
+
+def screen_to_table(
+    smiles_iter: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    check_pains: bool = False,
+    alert_catalogs: Optional[Sequence[str]] = None,
+    use_cache: bool = True,
+    rule_set: Optional[Union[str, CompiledRuleSet]] = None,
+    cascade: bool = False
+) -> ADMETTable:
+    """筛选一批 SMILES 并直接返回列式结果
+
+    参数含义与 admet_filter 相同。
+    """
+    if workers is None or workers == 1:
+        results = screen_molecules(
+            smiles_iter, check_pains=check_pains,
+            alert_catalogs=alert_catalogs, use_cache=use_cache,
+            rule_set=rule_set, cascade=cascade
+        )
+    else:
+        results = screen_molecules_parallel(
+            smiles_iter, workers=workers, chunksize=chunksize,
+            check_pains=check_pains, alert_catalogs=alert_catalogs,
+            use_cache=use_cache, rule_set=rule_set, cascade=cascade
+        )
+    return ADMETTable.from_results(results)
@@ -0,0 +1,318 @@
+"""分子描述符持久化缓存
+
+LLM 智能体会在不同靶点、模型和会话间反复给出相同的骨架，因此把描述符结果
+按「规范 SMILES + RDKit 版本」缓存下来：
+- 内存 LRU 前置层：同一进程内的重复分子直接命中
+- SQLite 持久层：跨会话复用，超过容量上限时按最近访问时间淘汰
+
+命中不会立即写回访问时间：命中的键先记在内存中，累积 _COMMIT_EVERY 个
+后（或 flush / 淘汰前）用一条 executemany 批量更新，读多写少的场景不再每次
+命中都写一次 SQLite。
+
+命中率统计只包含本进程内的查询；screen_molecules_parallel 的工作进程各自
+持有一个连接到同一数据库的缓存实例，它们的命中与未命中不会汇总到主进程的
+stats() / descriptor_cache_stats() 中。
+
+通过环境变量配置默认缓存：
+- LINGNEXUS_DESCRIPTOR_CACHE：数据库路径，设为 off 关闭缓存
+- LINGNEXUS_DESCRIPTOR_CACHE_SIZE：持久层最大条目数
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "lingnexus", "descriptors.sqlite3")
+DEFAULT_MAX_ENTRIES = 1_000_000
+DEFAULT_MEMORY_ENTRIES = 10_000
+
+# 累积多少次写入后提交一次事务
+_COMMIT_EVERY = 256
+# 淘汰时删除到容量上限的比例，避免每次插入都触发淘汰
+_EVICT_TO_RATIO = 0.9
+
+
+def _rdkit_version() -> str:
+    try:
+        from rdkit import rdBase
+        return rdBase.rdkitVersion
+    except ImportError:
+        return "unknown"
+
+
+class DescriptorCache:
+    """两级（内存 LRU + SQLite）描述符缓存，线程安全，fork 后自动重连"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES
+    ):
+        """
+        Args:
+            path: SQLite 数据库路径，":memory:" 表示不落盘
+            max_entries: 持久层最大条目数，超出后淘汰最久未访问的条目
+            memory_entries: 内存 LRU 层最大条目数
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.rdkit_version = _rdkit_version()
+
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._pending_writes = 0
+        self._disk_count = 0
+        self._touched: Dict[str, float] = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """返回当前进程的数据库连接（fork 出的子进程会重新打开）"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS descriptors ("
+            " smiles TEXT NOT NULL,"
+            " rdkit_version TEXT NOT NULL,"
+            " properties TEXT NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " PRIMARY KEY (smiles, rdkit_version))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON descriptors(last_access)")
+        conn.commit()
+
+        self._conn = conn
+        self._pid = os.getpid()
+        self._pending_writes = 0
+        self._touched = {}
+        self._disk_count = conn.execute("SELECT COUNT(*) FROM descriptors").fetchone()[0]
+        return conn
+
+    def _remember(self, smiles: str, props: Dict[str, Any]) -> None:
+        self._memory[smiles] = props
+        self._memory.move_to_end(smiles)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, smiles: str) -> Optional[Dict[str, Any]]:
+        """按规范 SMILES 查询缓存
+
+        Args:
+            smiles: 规范 SMILES（Chem.MolToSmiles 的输出）
+
+        Returns:
+            Dict: 缓存的性质字典副本，未命中返回 None
+        """
+        with self._lock:
+            props = self._memory.get(smiles)
+            if props is not None:
+                self._memory.move_to_end(smiles)
+                self.memory_hits += 1
+                self._touch(smiles)
+                return dict(props)
+
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT properties FROM descriptors WHERE smiles = ? AND rdkit_version = ?",
+                (smiles, self.rdkit_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._touch(smiles)
+            props = json.loads(row[0])
+            self._remember(smiles, props)
+            self.disk_hits += 1
+            return dict(props)
+
+    def put(self, smiles: str, props: Dict[str, Any]) -> None:
+        """写入缓存（已存在时覆盖）
+
+        Args:
+            smiles: 规范 SMILES
+            props: 性质字典
+        """
+        with self._lock:
+            self._remember(smiles, dict(props))
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO descriptors (smiles, rdkit_version, properties, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (smiles, self.rdkit_version, json.dumps(props), time.time())
+            )
+            # 近似计数（覆盖写入也会累加），淘汰前会重新统计
+            self._disk_count += 1
+            if self._disk_count > self.max_entries:
+                self._evict(conn)
+            self._after_write(conn)
+
+    def _touch(self, smiles: str) -> None:
+        """记录一次命中，访问时间累积到一定数量后批量写回"""
+        self._touched[smiles] = time.time()
+        if len(self._touched) >= _COMMIT_EVERY:
+            self._write_touches()
+
+    def _write_touches(self) -> None:
+        if not self._touched or self._conn is None or self._pid != os.getpid():
+            self._touched = {}
+            return
+        self._conn.executemany(
+            "UPDATE descriptors SET last_access = ? WHERE smiles = ? AND rdkit_version = ?",
+            [(accessed, smiles, self.rdkit_version) for smiles, accessed in self._touched.items()]
+        )
+        self._touched = {}
+        self._pending_writes += 1
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """删除最久未访问的条目，直到容量降到上限的 90%"""
+        self._write_touches()
+        self._disk_count = conn.execute("SELECT COUNT(*) FROM descriptors").fetchone()[0]
+        excess = self._disk_count - int(self.max_entries * _EVICT_TO_RATIO)
+        if excess <= 0:
+            return
+        conn.execute(
+            "DELETE FROM descriptors WHERE rowid IN "
+            "(SELECT rowid FROM descriptors ORDER BY last_access LIMIT ?)",
+            (excess,)
+        )
+        self._disk_count -= excess
+        self.evictions += excess
+
+    def _after_write(self, conn: sqlite3.Connection) -> None:
+        self._pending_writes += 1
+        if self._pending_writes >= _COMMIT_EVERY:
+            conn.commit()
+            self._pending_writes = 0
+
+    def flush(self) -> None:
+        """提交尚未写入磁盘的更改"""
+        with self._lock:
+            self._write_touches()
+            if self._conn is not None and self._pid == os.getpid() and self._pending_writes:
+                self._conn.commit()
+                self._pending_writes = 0
+
+    def clear(self) -> None:
+        """清空内存层和持久层"""
+        with self._lock:
+            self._memory.clear()
+            self._touched = {}
+            conn = self._connection()
+            conn.execute("DELETE FROM descriptors")
+            conn.commit()
+            self._pending_writes = 0
+            self._disk_count = 0
+
+    def close(self) -> None:
+        """提交并关闭数据库连接"""
+        with self._lock:
+            self.flush()
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中率统计，用于评估缓存容量是否合适（只含本进程内的查询）
+
+        Returns:
+            Dict: memory_hits / disk_hits / misses / hit_rate / evictions 等
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "path": self.path,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "lookups": lookups,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_count,
+                "max_entries": self.max_entries,
+                "evictions": self.evictions
+            }
+
+
+_default_cache: Optional[DescriptorCache] = None
+_default_cache_configured = False
+_default_cache_lock = threading.Lock()
+
+
+def configure_descriptor_cache(
+    path: Optional[str] = None,
+    max_entries: Optional[int] = None,
+    memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+    enabled: bool = True
+) -> Optional[DescriptorCache]:
+    """（重新）配置全局默认缓存
+
+    Args:
+        path: 数据库路径，默认读取 LINGNEXUS_DESCRIPTOR_CACHE 或 DEFAULT_CACHE_PATH
+        max_entries: 持久层最大条目数，默认读取 LINGNEXUS_DESCRIPTOR_CACHE_SIZE
+        memory_entries: 内存 LRU 层最大条目数
+        enabled: False 表示关闭默认缓存
+
+    Returns:
+        DescriptorCache: 新的默认缓存，关闭时返回 None
+    """
+    global _default_cache, _default_cache_configured
+
+    with _default_cache_lock:
+        if _default_cache is not None:
+            _default_cache.close()
+
+        env_path = os.environ.get("LINGNEXUS_DESCRIPTOR_CACHE", "")
+        if env_path.lower() in ("off", "0", "false", "none"):
+            enabled = False
+
+        if enabled:
+            _default_cache = DescriptorCache(
+                path=path or env_path or DEFAULT_CACHE_PATH,
+                max_entries=max_entries or int(
+                    os.environ.get("LINGNEXUS_DESCRIPTOR_CACHE_SIZE", DEFAULT_MAX_ENTRIES)
+                ),
+                memory_entries=memory_entries
+            )
+        else:
+            _default_cache = None
+        _default_cache_configured = True
+        return _default_cache
+
+
+def get_descriptor_cache() -> Optional[DescriptorCache]:
+    """返回全局默认缓存（首次调用时按环境变量创建），关闭时返回 None"""
+    if not _default_cache_configured:
+        configure_descriptor_cache()
+    return _default_cache
+
+
+def descriptor_cache_stats() -> Dict[str, Any]:
+    """返回全局默认缓存的命中率统计（缓存关闭时返回空字典）"""
+    cache = get_descriptor_cache()
+    return cache.stats() if cache is not None else {}
+
+
+@atexit.register
+def _flush_default_cache() -> None:
+    if _default_cache is not None:
+        _default_cache.flush()
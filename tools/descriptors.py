@@ -0,0 +1,233 @@
+"""分子描述符注册表与惰性计算
+
+每个描述符登记为「名称 → 计算函数 + 依赖」，计算时按依赖关系拓扑排序，
+只计算调用方实际需要的描述符及其依赖：
+- DescriptorRegistry.compute() 一次性计算指定的描述符
+- LazyDescriptors 是只读映射，首次访问某个描述符时才计算并记忆结果，
+  适合「先用廉价描述符预筛，再对剩余分子计算昂贵描述符」的场景：
+
+    props = LazyDescriptors(mol)
+    if props["molecular_weight"] < 500 and props["h_bond_donors"] <= 5:
+        ...  # 只有进入这里的分子才会计算 QED
+        props["qed"]
+
+名称以下划线开头的是中间结果（如 QED 使用的 _qed_properties），只作为其他
+描述符的依赖，不出现在返回的性质字典中，也不写入描述符缓存。
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Mapping, MutableMapping, Optional, Sequence, Tuple
+
+
+class DescriptorRegistry:
+    """描述符注册表"""
+
+    def __init__(self):
+        self._funcs: Dict[str, Callable] = {}
+        self._requires: Dict[str, Tuple[str, ...]] = {}
+        self._costs: Dict[str, float] = {}
+        self._order_cache: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    def register(self, name: str, func: Callable, requires: Sequence[str] = (), cost: float = 1.0) -> None:
+        """登记描述符
+
+        Args:
+            name: 描述符名称，以下划线开头表示中间结果
+            func: 计算函数，参数为 (mol, *依赖的值)
+            requires: 依赖的描述符名称（必须已登记）
+            cost: 相对计算开销（不含依赖），级联筛选按它安排规则顺序
+        """
+        unknown = [dep for dep in requires if dep not in self._funcs]
+        if unknown:
+            raise ValueError(f"描述符 {name} 依赖未登记的描述符: {', '.join(unknown)}")
+        self._funcs[name] = func
+        self._requires[name] = tuple(requires)
+        self._costs[name] = float(cost)
+        self._order_cache.clear()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._funcs
+
+    def names(self) -> List[str]:
+        """可供调用方请求的描述符名称（不含中间结果）"""
+        return [name for name in self._funcs if not name.startswith("_")]
+
+    def validate(self, names: Sequence[str]) -> Tuple[str, ...]:
+        """检查描述符名称，返回元组；存在未知名称时抛出 ValueError"""
+        unknown = [name for name in names if name not in self._funcs or name.startswith("_")]
+        if unknown:
+            raise ValueError(f"未知的分子性质: {', '.join(unknown)}（可选：{', '.join(self.names())}）")
+        return tuple(names)
+
+    def resolve(self, names: Sequence[str]) -> Tuple[str, ...]:
+        """返回计算 names 所需的全部描述符（含依赖），按依赖在前的顺序排列"""
+        key = tuple(names)
+        order = self._order_cache.get(key)
+        if order is not None:
+            return order
+
+        resolved: Dict[str, None] = {}
+
+        def visit(name: str) -> None:
+            if name in resolved:
+                return
+            for dep in self._requires[name]:
+                visit(dep)
+            resolved[name] = None
+
+        for name in self.validate(names):
+            visit(name)
+        order = tuple(resolved)
+        self._order_cache[key] = order
+        return order
+
+    def cost(self, name: str) -> float:
+        """从零开始计算该描述符（含全部依赖）的相对开销"""
+        return self.total_cost([name])
+
+    def total_cost(self, names: Sequence[str]) -> float:
+        """从零开始计算 names（共享的依赖只算一次）的相对开销"""
+        return sum(self._costs[dep] for dep in self.resolve(names))
+
+    def evaluate(self, mol, name: str, values: MutableMapping[str, Any]) -> Any:
+        """计算单个描述符（依赖从 values 中取，缺失时递归计算），结果写入 values"""
+        if name in values:
+            return values[name]
+        args = [self.evaluate(mol, dep, values) for dep in self._requires[name]]
+        value = values[name] = self._funcs[name](mol, *args)
+        return value
+
+    def compute(
+        self,
+        mol,
+        names: Sequence[str],
+        values: Optional[MutableMapping[str, Any]] = None,
+        timer=None
+    ) -> Dict[str, Any]:
+        """计算指定描述符，已在 values 中的直接复用
+
+        Args:
+            mol: RDKit Mol 对象
+            names: 需要的描述符名称
+            values: 已知的描述符值（如缓存命中的部分），新计算的值会写回其中
+            timer: 追踪时的 PhaseTimer（见 tools.tracing），按 "descriptor.<名称>" 累计耗时
+
+        Returns:
+            Dict: 只包含 names 的性质字典（按 names 顺序）
+        """
+        values = {} if values is None else values
+        # 只解析缺失描述符的依赖：已知 qed 时不再重算只被它依赖的 _qed_properties
+        missing = [name for name in names if name not in values]
+        for name in self.resolve(missing) if missing else ():
+            if name not in values:
+                args = [values[dep] for dep in self._requires[name]]
+                if timer is None:
+                    values[name] = self._funcs[name](mol, *args)
+                else:
+                    began = time.perf_counter()
+                    values[name] = self._funcs[name](mol, *args)
+                    timer.add("descriptor." + name, time.perf_counter() - began)
+        return {name: values[name] for name in names}
+
+
+class LazyDescriptors(Mapping):
+    """按需计算的描述符映射
+
+    键为请求的描述符名称；首次访问时计算（连同尚未计算的依赖），之后直接
+    返回记忆的值。迭代或 dict(...) 会计算全部请求的描述符。
+    """
+
+    def __init__(
+        self,
+        mol,
+        names: Optional[Sequence[str]] = None,
+        registry: Optional[DescriptorRegistry] = None,
+        values: Optional[Dict[str, Any]] = None,
+        on_compute: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        """
+        Args:
+            mol: RDKit Mol 对象
+            names: 可访问的描述符，默认为注册表中的全部描述符
+            registry: 描述符注册表，默认 get_descriptor_registry()
+            values: 已知的描述符值（如缓存命中的部分）
+            on_compute: 每次新算出一个描述符后调用，参数为当前已知的全部公开描述符
+        """
+        self.mol = mol
+        self.registry = registry or get_descriptor_registry()
+        self._names = self.registry.validate(self.registry.names() if names is None else names)
+        self._values: Dict[str, Any] = {} if values is None else values
+        self._on_compute = on_compute
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._names:
+            raise KeyError(name)
+        if name in self._values:
+            return self._values[name]
+        value = self.registry.evaluate(self.mol, name, self._values)
+        if self._on_compute is not None:
+            self._on_compute(self.computed())
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def is_computed(self, name: str) -> bool:
+        """该描述符是否已经计算过（访问它不会再触发计算）"""
+        return name in self._values
+
+    def computed(self) -> Dict[str, Any]:
+        """已经计算出的公开描述符（不触发计算，不含中间结果）"""
+        return {name: value for name, value in self._values.items() if not name.startswith("_")}
+
+    def __repr__(self) -> str:
+        return f"LazyDescriptors(computed={self.computed()!r}, pending={[n for n in self._names if n not in self._values]!r})"
+
+
+_registry: Optional[DescriptorRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def _build_default_registry() -> DescriptorRegistry:
+    from rdkit.Chem import Crippen, Descriptors, QED
+
+    registry = DescriptorRegistry()
+    # cost 为相对开销（约等于类药分子单次计算耗时的微秒数）
+    registry.register("molecular_weight", Descriptors.MolWt, cost=1)
+    registry.register("heavy_atoms", Descriptors.HeavyAtomCount, cost=0.5)
+    registry.register("num_atoms", lambda mol: mol.GetNumAtoms(onlyExplicit=False), cost=0.5)
+    registry.register("h_bond_donors", Descriptors.NumHDonors, cost=4)
+    registry.register("h_bond_acceptors", Descriptors.NumHAcceptors, cost=40)
+    registry.register("tpsa", Descriptors.TPSA, cost=10)
+    # 两者共用 Crippen 原子贡献（RDKit 缓存在 Mol 上），单独计算时都要付出这部分开销
+    registry.register("logp", Descriptors.MolLogP, cost=150)
+    registry.register("molar_refractivity", Crippen.MolMR, cost=150)
+    registry.register("aromatic_rings", Descriptors.NumAromaticRings, cost=15)
+    registry.register("rotatable_bonds", Descriptors.NumRotatableBonds, cost=70)
+    # QED 是最昂贵的描述符（子结构警示匹配），拆成两步以便单独复用其性质向量
+    registry.register("_qed_properties", QED.properties, cost=1300)
+    registry.register(
+        "qed", lambda mol, props: QED.qed(mol, qedProperties=props),
+        requires=("_qed_properties",), cost=15
+    )
+    registry.register(
+        "lipinski_violations",
+        lambda mol, mw, logp, hbd, hba: int(mw > 500) + int(logp > 5) + int(hbd > 5) + int(hba > 10),
+        requires=("molecular_weight", "logp", "h_bond_donors", "h_bond_acceptors"),
+        cost=0
+    )
+    return registry
+
+
+def get_descriptor_registry() -> DescriptorRegistry:
+    """返回默认描述符注册表（首次调用时导入 RDKit 并构建，未安装时抛出 ImportError）"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = _build_default_registry()
+    return _registry
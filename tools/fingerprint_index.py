@@ -0,0 +1,287 @@
+"""分子指纹索引与相似性检索
+
+将 Morgan（ECFP）位向量按 64 位打包存放在磁盘文件中，检索时以内存映射
+方式读取，用 NumPy 向量化的 AND + popcount 计算 Tanimoto 相似度，支持
+top-k 与阈值检索。索引可以增量追加并持久化，用于判断新生成的分子是否与
+已生成分子或已知抑制剂近似重复。
+
+索引目录结构：
+    meta.json         指纹参数与 RDKit 版本
+    fingerprints.bin  打包指纹，每行 n_bits / 64 个 uint64
+    entries.jsonl     每行一个 {"smiles", "label"}，与指纹行一一对应
+
+同一索引目录只支持单个写入进程；读取可以多进程共享（内存映射）。
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .lazy_imports import LazyModule
+
+
+# RDKit 在首次使用时导入一次（见 tools.lazy_imports）
+Chem = LazyModule("rdkit.Chem")
+
+DEFAULT_N_BITS = 2048
+DEFAULT_RADIUS = 2
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "lingnexus", "fingerprints")
+
+# 检索时每次处理的行数：分块复用缓冲区，使中间结果留在 CPU 缓存中
+SEARCH_BLOCK_ROWS = 4096
+
+# NumPy < 2.0 没有 bitwise_count，退化为按字节查表
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount_rows(words: np.ndarray) -> np.ndarray:
+    """统计二维 uint64 数组每行置位的比特数"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.uint32)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=1, dtype=np.uint32)
+
+
+def _rdkit_version() -> str:
+    try:
+        from rdkit import rdBase
+        return rdBase.rdkitVersion
+    except ImportError:
+        return "unknown"
+
+
+class FingerprintIndex:
+    """基于内存映射的 Morgan 指纹索引"""
+
+    def __init__(self, path: str, n_bits: int = DEFAULT_N_BITS, radius: int = DEFAULT_RADIUS):
+        """
+        Args:
+            path: 索引目录，不存在时创建；已存在时指纹参数以目录中的 meta.json 为准
+            n_bits: 指纹位数（必须是 64 的倍数）
+            radius: Morgan 半径（2 对应 ECFP4）
+        """
+        if n_bits % 64:
+            raise ValueError(f"n_bits 必须是 64 的倍数: {n_bits}")
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "meta.json")
+        self._fp_path = os.path.join(path, "fingerprints.bin")
+        self._entries_path = os.path.join(path, "entries.jsonl")
+        self._lock = threading.Lock()
+
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            n_bits, radius = meta["n_bits"], meta["radius"]
+        else:
+            with open(self._meta_path, "w", encoding="utf-8") as f:
+                json.dump({"n_bits": n_bits, "radius": radius, "rdkit_version": _rdkit_version()}, f)
+
+        self.n_bits = n_bits
+        self.radius = radius
+        self.words = n_bits // 64
+        self._generator = None
+
+        self._smiles: List[str] = []
+        self._labels: List[str] = []
+        if os.path.exists(self._entries_path):
+            with open(self._entries_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._smiles.append(entry["smiles"])
+                        self._labels.append(entry.get("label", ""))
+
+        # 写入中断时两个文件可能不一致：以较短者为准并截断
+        row_bytes = self.words * 8
+        fp_rows = os.path.getsize(self._fp_path) // row_bytes if os.path.exists(self._fp_path) else 0
+        count = min(fp_rows, len(self._smiles))
+        if os.path.exists(self._fp_path) and os.path.getsize(self._fp_path) != count * row_bytes:
+            with open(self._fp_path, "r+b") as f:
+                f.truncate(count * row_bytes)
+        if len(self._smiles) != count:
+            del self._smiles[count:], self._labels[count:]
+            self._rewrite_entries()
+
+        self._count = count
+        self._matrix: Optional[np.memmap] = None
+        self._popcounts = popcount_rows(self._fingerprints()) if count else np.zeros(0, dtype=np.uint32)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _rewrite_entries(self) -> None:
+        with open(self._entries_path, "w", encoding="utf-8") as f:
+            for smiles, label in zip(self._smiles, self._labels):
+                f.write(json.dumps({"smiles": smiles, "label": label}, ensure_ascii=False) + "\n")
+
+    def _fingerprints(self) -> np.ndarray:
+        """内存映射的指纹矩阵（行数变化后重新映射）"""
+        if self._count == 0:
+            return np.zeros((0, self.words), dtype=np.uint64)
+        if self._matrix is None or self._matrix.shape[0] != self._count:
+            self._matrix = np.memmap(self._fp_path, dtype=np.uint64, mode="r", shape=(self._count, self.words))
+        return self._matrix
+
+    def fingerprint(self, mol_or_smiles) -> Optional[np.ndarray]:
+        """计算打包后的指纹（uint64 数组），SMILES 无效时返回 None"""
+        mol = Chem.MolFromSmiles(mol_or_smiles) if isinstance(mol_or_smiles, str) else mol_or_smiles
+        if mol is None:
+            return None
+        if self._generator is None:
+            from rdkit.Chem import rdFingerprintGenerator
+            self._generator = rdFingerprintGenerator.GetMorganGenerator(radius=self.radius, fpSize=self.n_bits)
+        bits = self._generator.GetFingerprintAsNumPy(mol)
+        # 按小端字节序打包，使每个 uint64 的位顺序与平台无关
+        return np.packbits(bits, bitorder="little").view("<u8").astype(np.uint64)
+
+    def add(self, smiles_iter: Iterable[str], labels: Optional[Iterable[str]] = None) -> List[int]:
+        """追加分子并立即持久化
+
+        Args:
+            smiles_iter: SMILES 列表（无效的 SMILES 被跳过）
+            labels: 与 SMILES 对应的标签（如 "generated:qwen-max"、"known:ibrutinib"）
+
+        Returns:
+            List[int]: 新增分子在索引中的行号
+        """
+        smiles_list = list(smiles_iter)
+        label_list = list(labels) if labels is not None else [""] * len(smiles_list)
+
+        rows, entries = [], []
+        for smiles, label in zip(smiles_list, label_list):
+            fp = self.fingerprint(smiles)
+            if fp is not None:
+                rows.append(fp)
+                entries.append((smiles, label))
+        if not rows:
+            return []
+
+        block = np.vstack(rows)
+        with self._lock:
+            start = self._count
+            with open(self._fp_path, "ab") as f:
+                f.write(block.astype("<u8").tobytes())
+            with open(self._entries_path, "a", encoding="utf-8") as f:
+                for smiles, label in entries:
+                    f.write(json.dumps({"smiles": smiles, "label": label}, ensure_ascii=False) + "\n")
+            self._smiles.extend(smiles for smiles, _ in entries)
+            self._labels.extend(label for _, label in entries)
+            self._popcounts = np.concatenate([self._popcounts, popcount_rows(block)])
+            self._count += len(rows)
+        return list(range(start, start + len(rows)))
+
+    def similarities(self, query: Union[str, np.ndarray], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """查询分子与索引中分子的 Tanimoto 相似度（float32 数组）
+
+        Args:
+            query: SMILES 或 fingerprint() 返回的打包指纹
+            rows: 只计算这些行（升序行号），默认全部
+        """
+        fp = self.fingerprint(query) if not isinstance(query, np.ndarray) else query
+        if fp is None:
+            raise ValueError(f"无效的 SMILES: {query}")
+
+        matrix = self._fingerprints()
+        popcounts = self._popcounts[:matrix.shape[0]]
+        if rows is not None:
+            popcounts = popcounts[rows]
+        count = len(popcounts)
+        query_pop = int(popcount_rows(fp[None, :])[0])
+
+        sims = np.zeros(count, dtype=np.float32)
+        block_rows = min(SEARCH_BLOCK_ROWS, count)
+        buffer = np.empty((block_rows, self.words), dtype=np.uint64)
+        counts = np.empty((block_rows, self.words), dtype=np.uint8) if hasattr(np, "bitwise_count") else None
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, count)
+            block = matrix[start:end] if rows is None else matrix[rows[start:end]]
+            anded = np.bitwise_and(block, fp, out=buffer[:end - start])
+            if counts is not None:
+                common = np.bitwise_count(anded, out=counts[:end - start]).sum(axis=1, dtype=np.uint16)
+            else:
+                common = popcount_rows(anded)
+            union = popcounts[start:end] + (query_pop - common.astype(np.int64))
+            np.divide(common, union, out=sims[start:end], where=union > 0, casting="unsafe")
+        return sims
+
+    def search(
+        self,
+        query: Union[str, np.ndarray],
+        k: Optional[int] = 10,
+        threshold: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """相似性检索
+
+        Args:
+            query: SMILES 或 fingerprint() 返回的打包指纹
+            k: 最多返回的条数，None 表示不限（此时应提供 threshold）
+            threshold: 只返回相似度不低于该值的分子
+
+        Returns:
+            List[Dict]: 按相似度降序的 {index, smiles, label, similarity}
+        """
+        if threshold is not None and threshold > 0:
+            # Tanimoto 上界 min(a, b) / max(a, b)：先按置位数排除不可能达到阈值的行
+            fp = self.fingerprint(query) if not isinstance(query, np.ndarray) else query
+            if fp is None:
+                raise ValueError(f"无效的 SMILES: {query}")
+            query_pop = int(popcount_rows(fp[None, :])[0])
+            popcounts = self._popcounts[:self._count]
+            low, high = threshold * query_pop, query_pop / threshold
+            eligible = np.flatnonzero((popcounts >= low) & (popcounts <= high))
+            sims = np.zeros(len(popcounts), dtype=np.float32)
+            sims[eligible] = self.similarities(fp, eligible)
+            candidates = eligible[sims[eligible] >= threshold]
+        else:
+            sims = self.similarities(query)
+            candidates = np.arange(len(sims))
+        if k is not None and len(candidates) > k:
+            # 与第 k 名相似度并列时取行号较小者（candidates 为升序），结果不随运行变化
+            values = sims[candidates]
+            kth = np.partition(values, -k)[-k]
+            above = candidates[values > kth]
+            candidates = np.concatenate([above, candidates[values == kth][:k - len(above)]])
+        # 相似度降序，并列时按行号升序
+        order = candidates[np.lexsort((candidates, -sims[candidates]))]
+        return [
+            {
+                "index": int(row),
+                "smiles": self._smiles[row],
+                "label": self._labels[row],
+                "similarity": float(sims[row])
+            }
+            for row in order
+        ]
+
+    def search_many(
+        self,
+        queries: Sequence[str],
+        k: Optional[int] = 10,
+        threshold: Optional[float] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """对多个查询分别检索（无效的查询返回空列表）"""
+        results = []
+        for query in queries:
+            fp = self.fingerprint(query)
+            results.append(self.search(fp, k=k, threshold=threshold) if fp is not None else [])
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "entries": self._count,
+            "n_bits": self.n_bits,
+            "radius": self.radius,
+            "size_bytes": self._count * self.words * 8
+        }
+
+
+def open_target_index(target: str, root: Optional[str] = None) -> FingerprintIndex:
+    """打开（或创建）某个靶点的指纹索引，位于 <root>/<靶点名>"""
+    name = re.sub(r"[^\w.-]+", "_", target.strip()) or "default"
+    return FingerprintIndex(os.path.join(root or DEFAULT_INDEX_DIR, name))
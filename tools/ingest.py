@@ -0,0 +1,389 @@
+"""化合物库文件的流式读取与筛选
+
+逐条读取 .smi / .csv / .tsv / .sdf（及其 .gz 压缩版本）中的分子，分块送入
+ADMET 筛选引擎，结果边算边写入输出文件，内存占用与库的大小无关。
+
+每条记录带有它在（解压后的）输入流中的字节偏移。screen_library 每写完一个
+分块就把「已处理到的输入偏移 + 输出文件长度」原子地写入检查点文件
+（<输出文件>.checkpoint），程序中断后用 resume=True 重新运行即可从断点继续。
+
+.gz 输入无法随机访问：gzip 的 seek 需要从文件开头重新解压到目标偏移，续跑
+前的这段解压耗时与已处理的数据量成正比（只解压、不解析和筛选，通常远快于
+重新筛选）。需要频繁中断续跑的超大库建议先解压。
+"""
+
+import csv
+import gzip
+import json
+import os
+from collections import deque
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+from .admet_rules import CompiledRuleSet, get_rule_set
+from .chem_tools import DEFAULT_CHUNKSIZE, screen_molecules, screen_molecules_parallel
+from .lazy_imports import LazyModule, available
+
+
+# RDKit 在首次使用时导入一次（见 tools.lazy_imports）
+Chem = LazyModule("rdkit.Chem")
+
+LIBRARY_FORMATS = ("smi", "csv", "tsv", "sdf")
+
+# CSV/TSV 中自动识别的 SMILES 列和名称列（不区分大小写）
+SMILES_COLUMNS = ("smiles", "canonical_smiles", "isomeric_smiles", "smi")
+NAME_COLUMNS = ("id", "name", "compound_id", "mol_id", "title")
+
+
+class LibraryRecord(NamedTuple):
+    """化合物库中的一条记录"""
+    smiles: str
+    name: str
+    offset: int       # 记录起始位置（解压后的字节偏移）
+    next_offset: int  # 下一条记录的起始位置，可作为断点续跑的偏移
+
+
+def detect_format(path: str) -> str:
+    """根据扩展名判断文件格式（忽略 .gz 后缀）"""
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    ext = os.path.splitext(name)[1].lstrip(".")
+    if ext in ("smi", "smiles", "txt"):
+        return "smi"
+    if ext in ("sdf", "mol", "sd"):
+        return "sdf"
+    if ext in LIBRARY_FORMATS:
+        return ext
+    raise ValueError(f"无法识别的化合物库格式: {path}（支持：.smi .csv .tsv .sdf 及对应的 .gz）")
+
+
+def open_library(path: str) -> BinaryIO:
+    """以二进制方式打开化合物库（.gz 透明解压，tell/seek 均为解压后的偏移；
+    .gz 的 seek 会从头解压到目标位置，耗时与偏移成正比）"""
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _decode(line: bytes) -> str:
+    return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+def _iter_smi(f: BinaryIO, start_offset: int) -> Iterator[LibraryRecord]:
+    """SMILES 文件：每行「SMILES [名称]」，跳过空行、# 注释和表头"""
+    if start_offset:
+        f.seek(start_offset)
+    offset = f.tell()
+    for line in iter(f.readline, b""):
+        next_offset = offset + len(line)
+        fields = _decode(line).split(None, 1)
+        if fields and not fields[0].startswith("#") and fields[0].lower() not in SMILES_COLUMNS:
+            yield LibraryRecord(fields[0], fields[1].strip() if len(fields) > 1 else "", offset, next_offset)
+        offset = next_offset
+
+
+def _find_column(header: List[str], candidates: Sequence[str], explicit: Optional[str]) -> Optional[int]:
+    lowered = [column.strip().lower() for column in header]
+    if explicit is not None:
+        if explicit.lower() not in lowered:
+            raise ValueError(f"表头中没有列 {explicit}（现有列：{', '.join(header)}）")
+        return lowered.index(explicit.lower())
+    for name in candidates:
+        if name in lowered:
+            return lowered.index(name)
+    return None
+
+
+def _iter_delimited(
+    f: BinaryIO,
+    start_offset: int,
+    delimiter: str,
+    smiles_column: Optional[str],
+    name_column: Optional[str]
+) -> Iterator[LibraryRecord]:
+    """CSV/TSV：第一行为表头，逐行解析（不支持跨行的引号字段）"""
+    header_line = f.readline()
+    header = next(csv.reader([_decode(header_line)], delimiter=delimiter))
+    smiles_idx = _find_column(header, SMILES_COLUMNS, smiles_column)
+    if smiles_idx is None:
+        raise ValueError(f"无法识别 SMILES 列（现有列：{', '.join(header)}），请通过 smiles_column 指定")
+    name_idx = _find_column(header, NAME_COLUMNS, name_column)
+
+    if start_offset > len(header_line):
+        f.seek(start_offset)
+    offset = f.tell()
+    for line in iter(f.readline, b""):
+        next_offset = offset + len(line)
+        text = _decode(line)
+        if text.strip():
+            row = next(csv.reader([text], delimiter=delimiter))
+            if len(row) > smiles_idx and row[smiles_idx].strip():
+                name = row[name_idx].strip() if name_idx is not None and len(row) > name_idx else ""
+                yield LibraryRecord(row[smiles_idx].strip(), name, offset, next_offset)
+        offset = next_offset
+
+
+def _iter_sdf(f: BinaryIO, start_offset: int) -> Iterator[LibraryRecord]:
+    """SDF：逐条读取到 $$$$ 为止，由 RDKit 解析后转换为 SMILES
+
+    无法解析的记录以空 SMILES 输出，由筛选引擎计为无效分子。
+    """
+    if not available("rdkit.Chem"):
+        raise ImportError("读取 SDF 需要 RDKit。请运行：pip install rdkit")
+
+    if start_offset:
+        f.seek(start_offset)
+    offset = position = f.tell()
+    block: List[str] = []
+    for line in iter(f.readline, b""):
+        position += len(line)
+        text = _decode(line)
+        if text.strip() != "$$$$":
+            block.append(text)
+            continue
+
+        molblock = "\n".join(block)
+        mol = Chem.MolFromMolBlock(molblock, sanitize=True) if block else None
+        name = block[0].strip() if block else ""
+        yield LibraryRecord(Chem.MolToSmiles(mol) if mol is not None else "", name, offset, position)
+        block = []
+        offset = position
+
+    # 文件末尾缺少 $$$$ 的最后一条记录
+    if any(line.strip() for line in block):
+        mol = Chem.MolFromMolBlock("\n".join(block), sanitize=True)
+        yield LibraryRecord(Chem.MolToSmiles(mol) if mol is not None else "", block[0].strip(), offset, position)
+
+
+def iter_library(
+    path: str,
+    fmt: Optional[str] = None,
+    start_offset: int = 0,
+    smiles_column: Optional[str] = None,
+    name_column: Optional[str] = None
+) -> Iterator[LibraryRecord]:
+    """惰性读取化合物库
+
+    Args:
+        path: 文件路径（.smi / .csv / .tsv / .sdf，可带 .gz）
+        fmt: 文件格式，默认按扩展名判断
+        start_offset: 从该字节偏移（解压后）开始读取，需为某条记录的起始位置
+        smiles_column: CSV/TSV 的 SMILES 列名，默认自动识别
+        name_column: CSV/TSV 的名称列名，默认自动识别（没有时名称为空）
+
+    Yields:
+        LibraryRecord: (smiles, name, offset, next_offset)
+    """
+    fmt = fmt or detect_format(path)
+    with open_library(path) as f:
+        if fmt == "smi":
+            yield from _iter_smi(f, start_offset)
+        elif fmt in ("csv", "tsv"):
+            yield from _iter_delimited(f, start_offset, "\t" if fmt == "tsv" else ",", smiles_column, name_column)
+        elif fmt == "sdf":
+            yield from _iter_sdf(f, start_offset)
+        else:
+            raise ValueError(f"不支持的化合物库格式: {fmt}（可选：{', '.join(LIBRARY_FORMATS)}）")
+
+
+class _ResultWriter:
+    """将筛选结果逐行写入 CSV 或 JSONL 文件"""
+
+    def __init__(self, path: str, descriptors: Sequence[str], append: bool):
+        self.path = path
+        self.descriptors = list(descriptors)
+        self.jsonl = path.lower().endswith((".jsonl", ".ndjson"))
+        write_header = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a" if append else "w", encoding="utf-8", newline="")
+        self._csv = None if self.jsonl else csv.writer(self._file)
+        if self._csv is not None and write_header:
+            self._csv.writerow(
+                ["smiles", "name", "valid", "passed", "score", *self.descriptors, "rejected_by", "alerts"]
+            )
+
+    def write(self, record: LibraryRecord, result: Dict[str, Any]) -> None:
+        props = result["properties"] or {}
+        alerts = [alert["description"] for alert in result.get("alerts") or ()]
+        if self.jsonl:
+            row = {
+                "smiles": record.smiles,
+                "name": record.name,
+                "valid": result["valid"],
+                "passed": result["passed"],
+                "score": result["score"],
+                "properties": props,
+                "rejected_by": result.get("rejected_by"),
+                "alerts": alerts
+            }
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            self._csv.writerow([
+                record.smiles, record.name, int(result["valid"]), int(result["passed"]), result["score"],
+                *(props.get(name, "") for name in self.descriptors),
+                result.get("rejected_by") or "", ";".join(alerts)
+            ])
+
+    def flush(self) -> int:
+        """刷新到磁盘，返回当前文件长度"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def checkpoint_path(output_path: str) -> str:
+    return output_path + ".checkpoint"
+
+
+def read_checkpoint(output_path: str) -> Optional[Dict[str, Any]]:
+    """读取检查点，不存在时返回 None"""
+    path = checkpoint_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_checkpoint(output_path: str, state: Dict[str, Any]) -> None:
+    """原子地写入检查点（先写临时文件再替换）"""
+    path = checkpoint_path(output_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def screen_library(
+    input_path: str,
+    output_path: str,
+    resume: bool = True,
+    start_offset: Optional[int] = None,
+    fmt: Optional[str] = None,
+    smiles_column: Optional[str] = None,
+    name_column: Optional[str] = None,
+    only_passed: bool = False,
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    check_pains: bool = False,
+    alert_catalogs: Optional[Sequence[str]] = None,
+    use_cache: bool = False,
+    rule_set: Optional[Union[str, CompiledRuleSet]] = None,
+    cascade: bool = True,
+    verbose: bool = True
+) -> Dict[str, Any]:
+    """流式筛选化合物库文件，结果增量写入 CSV（或 .jsonl）
+
+    Args:
+        input_path: 化合物库文件
+        output_path: 输出文件，扩展名为 .jsonl 时写 JSON Lines，否则写 CSV
+        resume: 存在检查点时从断点继续（输出文件会截断到检查点记录的长度；
+            .gz 输入需要先从头解压到断点，见模块说明）
+        start_offset: 显式指定输入的起始字节偏移（优先于检查点）
+        fmt: 输入格式，默认按扩展名判断
+        smiles_column: CSV/TSV 的 SMILES 列名
+        name_column: CSV/TSV 的名称列名
+        only_passed: 只写出通过筛选的分子
+        workers: 并行进程数，None 或 1 表示串行
+        chunksize: 每个分块的分子数，每写完一个分块保存一次检查点
+        check_pains: 是否剔除含 PAINS 结构的分子
+        alert_catalogs: 结构警示目录组合
+        use_cache: 是否使用描述符缓存（大型库多为一次性分子，默认关闭）
+        rule_set: 规则集名称或编译结果
+        cascade: 是否使用级联早停模式（默认开启，见 screen_molecules）。提前判定的
+            分子只有实际算过的描述符，输出中其余描述符为空（CSV 空单元格 / JSONL 缺键）
+        verbose: 是否打印进度
+
+    Returns:
+        Dict: 累计统计（断点续跑时包含之前的部分）：total / valid / passed / reject_counts / offset / output
+    """
+    rules = get_rule_set(rule_set)
+    chunksize = chunksize or DEFAULT_CHUNKSIZE
+
+    checkpoint = read_checkpoint(output_path) if resume else None
+    append = False
+    if start_offset is None:
+        start_offset = 0
+        if (checkpoint is not None and checkpoint.get("input") == os.path.abspath(input_path)
+                and os.path.exists(output_path)):
+            start_offset = checkpoint["offset"]
+            append = True
+            # 丢弃检查点之后写了一半的结果
+            with open(output_path, "r+b") as f:
+                f.truncate(checkpoint["output_size"])
+            if verbose:
+                print(f"⏩ 从断点继续：输入偏移 {start_offset}，已处理 {checkpoint['total']} 条")
+    else:
+        append = start_offset > 0 and os.path.exists(output_path)
+
+    # 记录与筛选结果一一对应：在途记录最多约 2 × workers 个分块
+    pending: deque = deque()
+
+    def smiles_stream() -> Iterator[str]:
+        for record in iter_library(input_path, fmt, start_offset, smiles_column, name_column):
+            pending.append(record)
+            yield record.smiles
+
+    if workers is None or workers == 1:
+        results = screen_molecules(
+            smiles_stream(), check_pains=check_pains, alert_catalogs=alert_catalogs,
+            use_cache=use_cache, rule_set=rules, cascade=cascade
+        )
+    else:
+        results = screen_molecules_parallel(
+            smiles_stream(), workers=workers, chunksize=chunksize,
+            check_pains=check_pains, alert_catalogs=alert_catalogs,
+            use_cache=use_cache, rule_set=rules, cascade=cascade
+        )
+
+    base = checkpoint if append and checkpoint is not None else {}
+    stats = {
+        "total": base.get("total", 0),
+        "valid": base.get("valid", 0),
+        "passed": base.get("passed", 0),
+        "reject_counts": dict(base.get("reject_counts", {})),
+        "offset": start_offset,
+        "output": os.path.abspath(output_path)
+    }
+
+    def save_checkpoint(output_size: int) -> None:
+        _write_checkpoint(output_path, {
+            "input": os.path.abspath(input_path),
+            "offset": stats["offset"],
+            "output_size": output_size,
+            "total": stats["total"],
+            "valid": stats["valid"],
+            "passed": stats["passed"],
+            "reject_counts": stats["reject_counts"]
+        })
+
+    writer = _ResultWriter(output_path, rules.descriptors, append)
+    try:
+        while True:
+            batch = list(islice(results, chunksize))
+            if not batch:
+                break
+            for result in batch:
+                record = pending.popleft()
+                stats["total"] += 1
+                stats["valid"] += result["valid"]
+                stats["passed"] += result["passed"]
+                stage = result.get("rejected_by")
+                if stage is not None:
+                    stats["reject_counts"][stage] = stats["reject_counts"].get(stage, 0) + 1
+                if result["passed"] or not only_passed:
+                    writer.write(record, result)
+                stats["offset"] = record.next_offset
+            save_checkpoint(writer.flush())
+            if verbose:
+                print(f"📦 已处理 {stats['total']} 条，通过 {stats['passed']} 条（输入偏移 {stats['offset']}）")
+    finally:
+        writer.close()
+
+    if verbose:
+        rejects = ", ".join(f"{stage}={count}" for stage, count in stats["reject_counts"].items())
+        print(f"✅ 完成：{stats['valid']}/{stats['total']} 有效，{stats['passed']} 通过"
+              + (f"；各阶段淘汰数: {rejects}" if rejects else ""))
+    return stats
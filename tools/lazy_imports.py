@@ -0,0 +1,145 @@
+"""延迟导入与启动耗时统计
+
+RDKit、AgentScope 等重量级依赖不在模块加载时导入，而是放在模块全局变量
+中的 LazyModule 代理里：第一次访问属性时导入一次并缓存，之后的访问直接
+命中代理自身的属性字典，不再经过导入机制。图形界面因此可以先启动，再在
+后台线程中预热（见 serving.launch 的 warm_up 参数）。
+
+每个模块首次导入的耗时都会记录下来，import_timings() / format_import_report()
+给出进程内的统计；importtime_report() 在子进程中以 -X importtime 导入
+指定模块，按顶层包汇总启动耗时（命令行：python check_setup.py --import-time）。
+"""
+
+import importlib
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_modules: Dict[str, Any] = {}
+_failures: Dict[str, ImportError] = {}
+_timings: Dict[str, float] = {}
+_lock = threading.RLock()
+
+
+def lazy_import(name: str):
+    """导入模块（每个模块只导入一次），导入失败时缓存并重复抛出同一 ImportError"""
+    module = _modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        module = _modules.get(name)
+        if module is not None:
+            return module
+        if name in _failures:
+            raise _failures[name]
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+        except ImportError as e:
+            _failures[name] = e
+            raise
+        _timings[name] = time.perf_counter() - start
+        _modules[name] = module
+        return module
+
+
+def available(name: str) -> bool:
+    """模块能否导入（结果与 lazy_import 共用缓存）"""
+    try:
+        lazy_import(name)
+        return True
+    except ImportError:
+        return False
+
+
+class LazyModule:
+    """模块代理：首次访问属性时导入模块
+
+    导入后把模块的公开属性复制到代理自身，之后的属性访问与访问模块本身
+    一样快；代理中没有的属性（私有属性、之后才导入的子模块）再转发给模块。
+    未安装对应的包时，每次访问属性都抛出同一个 ImportError。
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = lazy_import(self.__dict__["_lazy_name"])
+            self.__dict__.update(
+                (attr, value) for attr, value in vars(module).items() if not attr.startswith("_")
+            )
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        raise AttributeError(f"LazyModule({self.__dict__['_lazy_name']}) 是只读的")
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_lazy_module"] is not None
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule {self.__dict__['_lazy_name']} ({state})>"
+
+
+def import_timings() -> Dict[str, float]:
+    """经 lazy_import 导入的模块及其首次导入耗时（秒）"""
+    with _lock:
+        return dict(_timings)
+
+
+def format_import_report(extra: Optional[Dict[str, float]] = None) -> str:
+    """进程内启动耗时报告：延迟导入的模块耗时，以及 extra 中的其他阶段（如预热）"""
+    rows = sorted(import_timings().items(), key=lambda item: -item[1])
+    lines = ["📦 延迟导入耗时："]
+    lines += [f"   {seconds * 1000:8.1f} ms  import {name}" for name, seconds in rows]
+    if extra:
+        lines.append("🔥 预热耗时：")
+        lines += [f"   {seconds * 1000:8.1f} ms  {name}" for name, seconds in extra.items()]
+    return "\n".join(lines)
+
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*\d+\s*\|\s*(\S+)")
+
+
+def importtime_report(module: str, top: int = 15) -> Tuple[float, List[Tuple[str, float]]]:
+    """在子进程中以 -X importtime 导入模块，按顶层包汇总耗时
+
+    Args:
+        module: 要导入的模块（如 "app"）
+        top: 返回耗时最多的顶层包数量
+
+    Returns:
+        Tuple: (总耗时秒数, [(顶层包, 该包全部模块的耗时秒数), ...] 按耗时降序)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败：\n{result.stderr.strip().splitlines()[-1]}")
+
+    packages: Dict[str, float] = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        # 按各模块自身耗时（不含其导入的子模块）归入所属顶层包，避免嵌套重复累加
+        seconds = int(match.group(1)) / 1e6
+        package = match.group(2).split(".")[0]
+        packages[package] = packages.get(package, 0.0) + seconds
+        total += seconds
+    ranked = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return total, ranked
@@ -0,0 +1,380 @@
+"""进程内指标（Prometheus 文本格式）
+
+用于容量规划的计数器、仪表与直方图，由图形界面的 /metrics 端点输出
+（见 serving.launch），格式兼容 Prometheus 抓取：
+    lingnexus_requests_total{event, outcome}            请求数（ok / error / rejected / cancelled）
+    lingnexus_request_duration_seconds{event}           请求处理耗时（不含排队）
+    lingnexus_model_requests_total{config_name}         各模型被请求的次数
+    lingnexus_llm_requests_total{config_name, mode, outcome}
+    lingnexus_llm_latency_seconds{config_name, mode}    LLM 调用耗时（stream / invoke）
+    lingnexus_llm_time_to_first_token_seconds{config_name}
+    lingnexus_llm_tokens_total{config_name, direction}  输入 / 输出 token 数（按字符估算）
+    lingnexus_parse_failures_total{config_name, kind}   说明文字行 / 无效 SMILES
+    lingnexus_molecules_generated_total{config_name}
+    lingnexus_molecules_passed_total{config_name}
+    lingnexus_screened_molecules_total{outcome}         screen_molecules 处理的分子（passed / failed / invalid）
+    lingnexus_screen_duration_seconds                   每次 screen_molecules 调用的耗时
+    lingnexus_descriptor_cache_lookups_total{result}    描述符缓存查询（memory_hit / disk_hit / miss）
+排队深度等由 serving 注册回调仪表（抓取时读取当前值）。
+
+指标只在本进程内累计；多进程筛选时子进程中的描述符缓存查询不计入。
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .descriptor_cache import descriptor_cache_stats
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Value:
+    """计数器 / 仪表的单个时间序列"""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+
+class _HistogramValue:
+    """直方图的单个时间序列"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Metric:
+    """指标基类：按标签值区分时间序列"""
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+        registry: Optional["Registry"] = None
+    ):
+        """
+        Args:
+            name: 指标名称
+            documentation: 说明（HELP 行）
+            labelnames: 标签名称
+            callback: 提供时抓取时调用，返回 {标签值: 当前值}（用于读取已有统计，如排队深度）
+            registry: 注册到的指标表，默认全局 REGISTRY
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values: object, **kwargs: object):
+        """取得（必要时创建）对应标签值的时间序列"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，收到 {values}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _series(self) -> List[Tuple[LabelValues, object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        if self.callback is not None:
+            for values, value in self.callback().items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+            return lines
+        for values, child in sorted(self._series()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Counter(Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    """可增可减的当前值"""
+
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    """按区间计数的分布（累计桶 + _sum + _count）"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional["Registry"] = None
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry=registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        bucket_labels = self.labelnames + ("le",)
+        for values, child in sorted(self._series()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(bucket_labels, values + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """指标表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已注册")
+            self._metrics[metric.name] = metric
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # 回调失败不影响其他指标
+                lines.append(f"# {metric.name} 读取失败：{e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def render_metrics(registry: Optional[Registry] = None) -> str:
+    """输出全部指标（默认全局 REGISTRY）"""
+    return (registry or REGISTRY).render()
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符按 1 个计，其余按每 4 个字符 1 个计"""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if "\u2e80" <= ch <= "\u9fff" or "\uac00" <= ch <= "\ud7af")
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+# ---- 请求 ----
+
+REQUESTS = Counter(
+    "lingnexus_requests_total", "图形界面请求数", ("event", "outcome")
+)
+REQUEST_DURATION = Histogram(
+    "lingnexus_request_duration_seconds", "请求处理耗时（获得放行后，秒）", ("event",)
+)
+MODEL_REQUESTS = Counter(
+    "lingnexus_model_requests_total", "各模型配置被请求的次数", ("config_name",)
+)
+
+# ---- LLM 调用 ----
+
+LLM_REQUESTS = Counter(
+    "lingnexus_llm_requests_total", "LLM 调用次数（outcome: ok / cached / timeout / error）",
+    ("config_name", "mode", "outcome")
+)
+LLM_LATENCY = Histogram(
+    "lingnexus_llm_latency_seconds", "LLM 调用耗时（含排队，秒）", ("config_name", "mode")
+)
+LLM_TTFT = Histogram(
+    "lingnexus_llm_time_to_first_token_seconds", "流式调用的首字延迟（秒）", ("config_name",)
+)
+LLM_TOKENS = Counter(
+    "lingnexus_llm_tokens_total", "LLM 输入 / 输出 token 数（按字符估算，命中缓存不计）",
+    ("config_name", "direction")
+)
+
+# ---- 分子 ----
+
+PARSE_FAILURES = Counter(
+    "lingnexus_parse_failures_total", "解析失败（kind: prose_line 说明文字行 / invalid_smiles RDKit 无法解析）",
+    ("config_name", "kind")
+)
+MOLECULES_GENERATED = Counter(
+    "lingnexus_molecules_generated_total", "生成的候选分子数（去重后）", ("config_name",)
+)
+MOLECULES_PASSED = Counter(
+    "lingnexus_molecules_passed_total", "通过 ADMET 筛选的分子数", ("config_name",)
+)
+SCREENED_MOLECULES = Counter(
+    "lingnexus_screened_molecules_total", "screen_molecules 处理的分子数", ("outcome",)
+)
+SCREEN_DURATION = Histogram(
+    "lingnexus_screen_duration_seconds", "每次 screen_molecules 调用的耗时（秒）",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0, 600.0)
+)
+
+
+def _descriptor_cache_lookups() -> Dict[LabelValues, float]:
+    stats = descriptor_cache_stats()
+    if not stats:
+        return {}
+    return {
+        ("memory_hit",): stats["memory_hits"],
+        ("disk_hit",): stats["disk_hits"],
+        ("miss",): stats["misses"]
+    }
+
+
+DESCRIPTOR_CACHE_LOOKUPS = Counter(
+    "lingnexus_descriptor_cache_lookups_total", "描述符（ADMET）缓存查询次数", ("result",),
+    callback=_descriptor_cache_lookups
+)
+
+
+def record_screening(passed: int, failed: int, invalid: int, seconds: float) -> None:
+    """记录一次筛选的分子数与耗时"""
+    for outcome, count in (("passed", passed), ("failed", failed), ("invalid", invalid)):
+        if count:
+            SCREENED_MOLECULES.labels(outcome).inc(count)
+    SCREEN_DURATION.observe(seconds)
+
+
+def record_generation(config_name: str, generated: int, passed: int, invalid: int, prose_lines: int) -> None:
+    """记录一个模型一次生成的分子数与解析失败数"""
+    MOLECULES_GENERATED.labels(config_name).inc(generated)
+    MOLECULES_PASSED.labels(config_name).inc(passed)
+    PARSE_FAILURES.labels(config_name, "invalid_smiles").inc(invalid)
+    PARSE_FAILURES.labels(config_name, "prose_line").inc(prose_lines)
+
+
+class RequestTracker:
+    """track_request 的记录对象，outcome 可由调用方改写（如 "error"）"""
+
+    def __init__(self, event: str):
+        self.event = event
+        self.outcome = "ok"
+
+
+@contextmanager
+def track_request(event: str, *config_names: str) -> Iterator[RequestTracker]:
+    """记录一次请求的结果与耗时
+
+    with 块正常结束记为 ok（调用方可改写 tracker.outcome），抛出异常记为 error，
+    被取消（客户端断开、点击“停止”）记为 cancelled。
+    """
+    for config_name in config_names:
+        MODEL_REQUESTS.labels(config_name).inc()
+    tracker = RequestTracker(event)
+    start = time.perf_counter()
+    try:
+        yield tracker
+    except Exception:
+        tracker.outcome = "error"
+        raise
+    except BaseException:
+        tracker.outcome = "cancelled"
+        raise
+    finally:
+        REQUESTS.labels(event, tracker.outcome).inc()
+        REQUEST_DURATION.labels(event).observe(time.perf_counter() - start)
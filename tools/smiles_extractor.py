@@ -0,0 +1,221 @@
+"""SMILES 提取工具
+
+从智能体的文本响应中提取 SMILES，并给出输出格式质量评分。
+
+每行先用预编译的正则去掉列表编号、项目符号、"SMILES:" 标签和行内反引号，
+再用一个描述 SMILES 字母表的正则整体匹配候选片段，并做括号配对、环闭合
+数字成对等廉价的结构检查；解释性文字在这一步就被排除，不会交给 RDKit。
+Markdown 代码块的围栏行（```）会被跳过，块内内容按普通行处理；
+说明文字中用反引号标出的 SMILES 也会被提取。
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# SMILES 字母表：有机子集原子、方括号原子、键、环闭合数字与分支
+_ATOM = r"Cl|Br|[BCNOPSFI]|[bcnops]|\*|\[[^\[\]\s]+\]"
+_SMILES_TOKEN = re.compile(rf"(?:{_ATOM})(?:{_ATOM}|%\d{{2}}|\d|[-=#$:/\\.()])*")
+_ATOM_RE = re.compile(_ATOM)
+_BRACKET_ATOM = re.compile(r"\[[^\[\]]*\]")
+_RING_BOND = re.compile(r"%\d{2}|\d")
+_AROMATIC = re.compile(r"[bcnops]")
+
+_FENCE = re.compile(r"^\s*(?:```|~~~)")
+# 行首修饰：项目符号、编号（1. 1) 1、 (1) 第1个）、标签（"SMILES:"、"SMILES 1:"、
+# "分子1："、"Compound 2:" 等，可加粗，如 **SMILES**: 或 **分子1**:）、Markdown 加粗
+_PREFIX = re.compile(
+    r"^\s*(?P<marker>[-*+•]\s+|\(?\d{1,3}\s*[.)、:：]\s*|\d{1,3}\s+|第\s*\d+\s*[个条]?\s*[:：.、]?\s*)?"
+    r"(?P<label>(?:\*\*)?(?:smiles|分子|化合物|候选物?|molecule|compound|candidate)\s*\d{0,3}"
+    r"\s*(?:\*\*)?\s*[:：]\s*(?:\*\*\s*)?)?(?:\*\*)?",
+    re.IGNORECASE
+)
+# SMILES 之后允许出现的结尾标点
+_TRAILING = " \t,;，；。.*"
+_INLINE_CODE = re.compile(r"`([^`\n]+)`")
+_FIELD_END = re.compile(r"[\s,;，；。]")
+# 只带编号的行，SMILES 之后的注释若以这些符号开头（如 "(阿司匹林)"、"- 前药"）不算说明文字
+_NOTE_START = tuple("(（[-–—:：")
+_ENGLISH_WORD = re.compile(r"[A-Za-z]+")
+# 只带编号的行，SMILES 之后的英文单词达到该数量即视为句子（如 "1. CCN is a common amine"）
+PROSE_MIN_WORDS = 3
+
+# 没有标签、编号等上下文时，少于该原子数且只由单字母原子组成的片段视为普通
+# 单词（如 "NO"、"CO"）；N#N、ICl 这类含键符号或双字母元素的片段不受此限制
+MIN_SMILES_ATOMS = 3
+_PLAIN_WORD = re.compile(r"[BCNOPSFI]+")
+
+# 带编号/反引号等修饰的 SMILES 行在质量评分中的权重
+DECORATED_LINE_WEIGHT = 0.75
+
+
+def match_smiles(token: str, explicit: bool = False) -> Optional[str]:
+    """判断片段是否像一个 SMILES（不调用 RDKit），是则返回清理后的片段
+
+    检查：整体符合 SMILES 字母表、原子数（见 MIN_SMILES_ATOMS，explicit=True
+    即片段带有标签/编号等上下文时不限）、圆括号与方括号配对、环闭合数字成对
+    出现、芳香原子必须位于环中。
+    """
+    token = token.strip().strip("`").rstrip(".。:：")
+    if token.startswith("**") or token.endswith("**"):
+        token = token.strip("*")
+    if not _SMILES_TOKEN.fullmatch(token):
+        return None
+    if not explicit and len(_ATOM_RE.findall(token)) < MIN_SMILES_ATOMS and _PLAIN_WORD.fullmatch(token):
+        return None
+    if token.count("(") != token.count(")"):
+        return None
+
+    # 去掉方括号原子后再统计环闭合（方括号内的数字是同位素/氢数/电荷）
+    bare = _BRACKET_ATOM.sub("A", token)
+    if "[" in bare or "]" in bare:
+        return None
+    ring_bonds: Dict[str, int] = {}
+    for ring in _RING_BOND.findall(bare):
+        ring_bonds[ring] = ring_bonds.get(ring, 0) + 1
+    if any(count % 2 for count in ring_bonds.values()):
+        return None
+    if _AROMATIC.search(bare) and not ring_bonds:
+        return None
+    return token
+
+
+class ExtractionStats:
+    """响应文本的解析统计与格式质量评分"""
+
+    def __init__(self):
+        self.smiles_lines = 0
+        self.decorated_lines = 0
+        self.prose_lines = 0
+        self.fence_lines = 0
+        self.inline_smiles = 0
+
+    @property
+    def content_lines(self) -> int:
+        """非空、非代码块围栏的行数"""
+        return self.smiles_lines + self.prose_lines
+
+    @property
+    def quality(self) -> float:
+        """格式质量（0~1）：纯 SMILES 行计 1，带编号/反引号等修饰的 SMILES 行计
+        DECORATED_LINE_WEIGHT，说明文字行计 0，按内容行数平均"""
+        if not self.content_lines:
+            return 0.0
+        plain = self.smiles_lines - self.decorated_lines
+        return (plain + DECORATED_LINE_WEIGHT * self.decorated_lines) / self.content_lines
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "smiles_lines": self.smiles_lines,
+            "decorated_lines": self.decorated_lines,
+            "prose_lines": self.prose_lines,
+            "fence_lines": self.fence_lines,
+            "inline_smiles": self.inline_smiles,
+            "quality": self.quality
+        }
+
+
+class SmilesExtractor:
+    """逐行提取 SMILES 并累计统计（逐行处理，可用于流式输入）"""
+
+    def __init__(self):
+        self.stats = ExtractionStats()
+
+    def _classify(self, line: str) -> Tuple[Optional[str], bool]:
+        """返回 (行首的 SMILES, 是否带修饰)，不是 SMILES 行时 SMILES 为 None
+
+        行首片段只有在独占整行，或前面有列表符号、编号、"SMILES:" 等标签，
+        或用反引号括起时才算 SMILES；否则 "CNS penetration ..." 这样的
+        说明文字会因首个单词恰好是合法 SMILES 而被误判。只有编号时，后面
+        跟着英文句子（"1. CCN is a common amine"）的仍按说明文字处理。
+        """
+        prefix = _PREFIX.match(line)
+        rest = line[prefix.end():].strip()
+        decorated = bool(prefix.group().strip())
+        labelled = bool(prefix.group("label"))
+        explicit = labelled or bool(prefix.group("marker"))
+        if rest.startswith("`"):
+            end = rest.find("`", 1)
+            if end > 0:
+                rest, decorated, explicit, labelled = rest[1:end], True, True, True
+        field = _FIELD_END.split(rest, 1)[0]
+        note = rest[len(field):].strip(_TRAILING)
+        if note and not labelled and (
+            not explicit
+            or not note.startswith(_NOTE_START) and len(_ENGLISH_WORD.findall(note)) >= PROSE_MIN_WORDS
+        ):
+            return None, decorated
+        # 只有编号、后面还有文字时，"1. I think so" 中的 "I" 仍按普通单词处理
+        return match_smiles(field, labelled or explicit and not note), decorated
+
+    def feed_line(self, line: str) -> List[str]:
+        """处理一行文本，返回其中的 SMILES"""
+        if _FENCE.match(line):
+            self.stats.fence_lines += 1
+            return []
+        if not line.strip():
+            return []
+
+        smiles, decorated = self._classify(line)
+        if smiles is not None:
+            self.stats.smiles_lines += 1
+            self.stats.decorated_lines += decorated
+            return [smiles]
+
+        self.stats.prose_lines += 1
+        found = [smi for smi in map(match_smiles, _INLINE_CODE.findall(line)) if smi is not None]
+        self.stats.inline_smiles += len(found)
+        return found
+
+
+def extract_smiles(response_text: str) -> Tuple[List[str], ExtractionStats]:
+    """从智能体响应中提取 SMILES，同时返回解析统计
+
+    Returns:
+        Tuple: (SMILES 列表, ExtractionStats)
+    """
+    extractor = SmilesExtractor()
+    smiles_list: List[str] = []
+    for line in response_text.split("\n"):
+        smiles_list.extend(extractor.feed_line(line))
+    return smiles_list, extractor.stats
+
+
+def parse_smiles_from_response(response_text: str) -> List[str]:
+    """从智能体响应中提取 SMILES"""
+    return extract_smiles(response_text)[0]
+
+
+def parse_quality(response_text: str) -> float:
+    """响应的格式质量评分（0~1），见 ExtractionStats.quality"""
+    return extract_smiles(response_text)[1].quality
+
+
+class StreamingSmilesParser:
+    """增量 SMILES 解析器
+
+    逐块喂入模型的流式输出，每凑齐一整行就立即返回该行中的 SMILES，
+    最后调用 close() 取出末尾不以换行结束的部分。
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._extractor = SmilesExtractor()
+
+    @property
+    def stats(self) -> ExtractionStats:
+        return self._extractor.stats
+
+    def feed(self, chunk: str) -> List[str]:
+        """喂入一段文本，返回本次新完成的 SMILES 行"""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split('\n')
+        smiles_list: List[str] = []
+        for line in lines:
+            smiles_list.extend(self._extractor.feed_line(line))
+        return smiles_list
+
+    def close(self) -> List[str]:
+        """结束输入，返回缓冲区中剩余的 SMILES"""
+        line, self._buffer = self._buffer, ""
+        return self._extractor.feed_line(line)
@@ -0,0 +1,190 @@
+"""SMILES 标准化与去重
+
+位于 parse_smiles_from_response 与 ADMET 筛选之间：同一分子的不同写法
+（或多个模型重复生成的同一分子）在计算描述符之前就被合并，不会被重复
+打分，也不会重复计入生成数和通过率。
+
+标准化步骤（后两步可选）：
+1. RDKit 解析并输出规范 SMILES
+2. strip_salts：保留最大的有机片段并中和电荷（去除盐、溶剂等反离子）
+3. tautomers：规范化互变异构体（较慢）
+
+去重键可以是规范 SMILES 或 InChIKey；已出现的键以 64 位哈希保存在
+DedupIndex 中，多次运行（如模型对比中的多个模型、多轮生成）共享同一个
+DedupIndex 即可跨运行去重，并可保存到文件。
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .lazy_imports import LazyModule, available
+
+
+# RDKit 在首次使用时导入一次（见 tools.lazy_imports）
+Chem = LazyModule("rdkit.Chem")
+
+DEDUP_KEYS = ("smiles", "inchikey")
+
+
+def _hash_key(key: str) -> int:
+    """去重键的 64 位哈希（碰撞概率可忽略，且比保存原始字符串节省内存）"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class DedupIndex:
+    """线程安全的去重键哈希集合"""
+
+    def __init__(self, hashes: Iterable[int] = ()):
+        self._hashes = set(int(h) for h in hashes)
+        self._lock = threading.Lock()
+
+    def add(self, key: str) -> bool:
+        """加入去重键，已存在时返回 False"""
+        digest = _hash_key(key)
+        with self._lock:
+            if digest in self._hashes:
+                return False
+            self._hashes.add(digest)
+            return True
+
+    def __contains__(self, key: str) -> bool:
+        return _hash_key(key) in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hashes.clear()
+
+    def save(self, path: str) -> None:
+        """保存为 .npy 文件（uint64 数组）"""
+        with self._lock:
+            np.save(path, np.fromiter(self._hashes, dtype=np.uint64, count=len(self._hashes)))
+
+    @classmethod
+    def load(cls, path: str) -> "DedupIndex":
+        return cls(np.load(path).tolist())
+
+
+def standardize_mol(mol, strip_salts: bool = False, tautomers: bool = False):
+    """对 RDKit Mol 做可选的去盐与互变异构体规范化，返回新的 Mol"""
+    from rdkit.Chem.MolStandardize import rdMolStandardize
+
+    if strip_salts:
+        mol = rdMolStandardize.LargestFragmentChooser(preferOrganic=True).choose(mol)
+        mol = rdMolStandardize.Uncharger().uncharge(mol)
+    if tautomers:
+        mol = rdMolStandardize.TautomerEnumerator().Canonicalize(mol)
+    return mol
+
+
+def standardize_smiles(smiles: str, strip_salts: bool = False, tautomers: bool = False) -> Optional[str]:
+    """返回标准化后的规范 SMILES，无效时返回 None
+
+    Args:
+        smiles: SMILES 字符串
+        strip_salts: 是否去除盐/反离子并中和电荷
+        tautomers: 是否规范化互变异构体
+    """
+    if not available("rdkit.Chem"):
+        print("警告：未安装 RDKit，无法标准化 SMILES。请运行：pip install rdkit")
+        return smiles.strip() or None
+
+    mol = Chem.MolFromSmiles(smiles) if smiles else None
+    if mol is None:
+        return None
+    return Chem.MolToSmiles(standardize_mol(mol, strip_salts, tautomers))
+
+
+class SmilesDeduplicator:
+    """SMILES 标准化 + 去重阶段"""
+
+    def __init__(
+        self,
+        strip_salts: bool = False,
+        tautomers: bool = False,
+        key: str = "smiles",
+        index: Optional[DedupIndex] = None
+    ):
+        """
+        Args:
+            strip_salts: 是否去除盐/反离子并中和电荷
+            tautomers: 是否规范化互变异构体
+            key: 去重键，"smiles"（规范 SMILES）或 "inchikey"
+            index: 跨运行共享的去重索引；默认每个去重器独立（只在本次运行内去重）
+        """
+        if key not in DEDUP_KEYS:
+            raise ValueError(f"未知的去重键: {key}（可选：{', '.join(DEDUP_KEYS)}）")
+        self.strip_salts = strip_salts
+        self.tautomers = tautomers
+        self.key = key
+        self.index = index if index is not None else DedupIndex()
+        self.total = 0
+        self.duplicates = 0
+        self.invalid = 0
+
+    def _standardize(self, smiles: str) -> Tuple[Optional[str], Optional[str], Any]:
+        """返回 (标准化后的 SMILES, 去重键, 标准化后的 Mol)，无效时均为 None"""
+        if not available("rdkit.Chem"):
+            smiles = smiles.strip()
+            return (smiles, smiles, None) if smiles else (None, None, None)
+
+        mol = Chem.MolFromSmiles(smiles) if smiles else None
+        if mol is None:
+            return None, None, None
+        mol = standardize_mol(mol, self.strip_salts, self.tautomers)
+        canonical = Chem.MolToSmiles(mol)
+        if self.key == "inchikey":
+            return canonical, Chem.MolToInchiKey(mol) or canonical, mol
+        return canonical, canonical, mol
+
+    def standardize(self, smiles: str) -> Tuple[Optional[str], Optional[str]]:
+        """返回 (标准化后的 SMILES, 去重键)，无效时均为 None"""
+        return self._standardize(smiles)[:2]
+
+    def filter_mols(self, smiles_iter: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+        """与 filter 相同，但同时返回标准化后的 Mol（无效分子为 None）
+
+        输出的 (规范 SMILES, Mol) 可直接交给 screen_molecules，筛选时不再重复
+        解析，也不再重新生成缓存键。
+        """
+        for smiles in smiles_iter:
+            self.total += 1
+            canonical, key, mol = self._standardize(smiles)
+            if canonical is None:
+                self.invalid += 1
+                canonical, key = smiles, f"invalid:{smiles}"
+            if self.index.add(key):
+                yield canonical, mol
+            else:
+                self.duplicates += 1
+
+    def filter(self, smiles_iter: Iterable[str]) -> Iterator[str]:
+        """标准化并去重，按输入顺序返回首次出现的分子
+
+        有效分子以标准化后的规范 SMILES 返回；无效 SMILES 按原样返回（以原始
+        字符串去重），由后续筛选引擎计为无效分子。
+        """
+        for smiles, _ in self.filter_mols(smiles_iter):
+            yield smiles
+
+    def dedupe(self, smiles_iter: Iterable[str]) -> List[str]:
+        """filter 的列表版本"""
+        return list(self.filter(smiles_iter))
+
+    def dedupe_mols(self, smiles_iter: Iterable[str]) -> List[Tuple[str, Any]]:
+        """filter_mols 的列表版本"""
+        return list(self.filter_mols(smiles_iter))
+
+    def stats(self) -> Dict[str, int]:
+        """处理总数、保留数、去除的重复数、无效数"""
+        return {
+            "total": self.total,
+            "unique": self.total - self.duplicates,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid
+        }
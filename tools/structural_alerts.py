@@ -0,0 +1,108 @@
+"""结构警示（Structural Alerts）过滤目录
+
+PAINS / Brenk / NIH / ZINC 等 RDKit FilterCatalog 的构建代价远高于单次匹配，
+因此在进程内按目录组合惰性构建一次，之后所有调用共享同一个实例。
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .lazy_imports import LazyModule
+
+
+# RDKit 在首次使用时导入一次（见 tools.lazy_imports）
+Chem = LazyModule("rdkit.Chem")
+
+
+# 支持的目录名称（与 RDKit FilterCatalogParams.FilterCatalogs 同名）
+ALERT_CATALOGS = ("PAINS", "PAINS_A", "PAINS_B", "PAINS_C", "BRENK", "NIH", "ZINC")
+
+DEFAULT_ALERT_CATALOGS = ("PAINS",)
+
+# 包含其他目录的目录：PAINS 即 PAINS_A + PAINS_B + PAINS_C
+_SUPERSETS = {"PAINS": ("PAINS_A", "PAINS_B", "PAINS_C")}
+
+_catalogs: Dict[Tuple[str, ...], Any] = {}
+_catalogs_lock = threading.Lock()
+
+
+def _normalize_names(names: Iterable[str]) -> Tuple[str, ...]:
+    """规范化目录名称组合，作为注册表的键（被其他目录包含的子目录会去掉，避免同一警示重复报告）"""
+    requested = {name.upper() for name in names}
+    for superset, subsets in _SUPERSETS.items():
+        if superset in requested:
+            requested.difference_update(subsets)
+    key = tuple(sorted(requested))
+    unknown = [name for name in key if name not in ALERT_CATALOGS]
+    if unknown:
+        raise ValueError(f"未知的结构警示目录: {', '.join(unknown)}（可选：{', '.join(ALERT_CATALOGS)}）")
+    if not key:
+        raise ValueError("至少需要指定一个结构警示目录")
+    return key
+
+
+def get_filter_catalog(names: Sequence[str] = DEFAULT_ALERT_CATALOGS):
+    """获取共享的 FilterCatalog 实例（线程安全，首次调用时构建）
+
+    Args:
+        names: 目录名称组合，例如 ("PAINS", "BRENK")
+
+    Returns:
+        FilterCatalog: 该组合对应的共享实例
+    """
+    key = _normalize_names(names)
+    catalog = _catalogs.get(key)
+    if catalog is not None:
+        return catalog
+
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            from rdkit.Chem.FilterCatalog import FilterCatalog, FilterCatalogParams
+
+            params = FilterCatalogParams()
+            for name in key:
+                params.AddCatalog(getattr(FilterCatalogParams.FilterCatalogs, name))
+            catalog = FilterCatalog(params)
+            _catalogs[key] = catalog
+
+    return catalog
+
+
+def find_structural_alerts(mol, names: Sequence[str] = DEFAULT_ALERT_CATALOGS) -> List[Dict[str, str]]:
+    """返回分子命中的全部结构警示
+
+    Args:
+        mol: RDKit Mol 对象
+        names: 使用的目录名称组合
+
+    Returns:
+        List[Dict]: 每条命中包含 catalog（所属目录）和 description（警示名称）
+    """
+    catalog = get_filter_catalog(names)
+    return [
+        {"catalog": entry.GetProp("FilterSet"), "description": entry.GetDescription()}
+        for entry in catalog.GetMatches(mol)
+    ]
+
+
+def batch_structural_alerts(
+    smiles_iter: Iterable[str],
+    names: Sequence[str] = DEFAULT_ALERT_CATALOGS
+) -> List[Optional[List[Dict[str, str]]]]:
+    """批量检查结构警示
+
+    Args:
+        smiles_iter: SMILES 字符串列表或迭代器
+        names: 使用的目录名称组合
+
+    Returns:
+        List: 与输入一一对应；无效 SMILES 对应 None，否则为命中列表（空列表表示安全）
+    """
+    get_filter_catalog(names)  # 预先构建，避免在循环中加锁
+    results = []
+    for smiles in smiles_iter:
+        # 与 screen_molecules 一致：空字符串按无效处理（RDKit 会解析为零原子分子）
+        mol = Chem.MolFromSmiles(smiles) if smiles else None
+        results.append(None if mol is None else find_structural_alerts(mol, names))
+    return results
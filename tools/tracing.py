@@ -0,0 +1,295 @@
+"""请求级耗时追踪
+
+一次请求（如“生成分子”）对应一个 Trace，其中的各个环节记录为 Span：
+    request → pipeline:<模型> → designer / filter / evaluator
+        → agent.build（新建智能体）、llm.stream / llm.invoke（含首字延迟 ttft_ms）、
+          smiles.extract、rdkit.parse、descriptor.<名称>、rules.evaluate、structural_alerts
+热路径（逐个分子的解析、描述符、规则、结构警示）不逐个记录 Span，而是由
+PhaseTimer 按环节累计耗时与次数，结束时每个环节记录一个聚合 Span，开销只有
+几次 perf_counter 调用；没有进行中的 Trace 时完全跳过。
+
+当前 Span 保存在 contextvars 中：asyncio 任务与 asyncio.to_thread 自动继承，
+提交到线程池的函数用 wrap() 包装后继承。异步生成器会在不同任务中恢复执行，
+因此其中不切换当前 Span，而是显式传入父 Span（见 start_span 的 parent 参数）。
+
+Trace 结束后可导出为 JSON Lines（每行一个 Span，字段与 OpenTelemetry 的
+OTLP/JSON 一致），format_flame_summary() 给出按调用路径汇总的耗时树。
+
+环境变量：
+- LINGNEXUS_TRACE_FILE：导出文件路径（追加写入），未设置时不导出
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+TRACE_FILE_ENV = "LINGNEXUS_TRACE_FILE"
+
+# 耗时树中附加显示的 Span 属性
+SUMMARY_ATTRIBUTES = ("ttft_ms", "model", "cached")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("lingnexus_span", default=None)
+_export_lock = threading.Lock()
+
+
+class Span:
+    """一个计时区间"""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(
+        self,
+        trace: "Trace",
+        name: str,
+        parent_id: Optional[str],
+        attributes: Dict[str, Any],
+        start_ns: Optional[int] = None
+    ):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns() if start_ns is None else start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None, end_ns: Optional[int] = None) -> None:
+        """结束计时（重复调用无效）"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns() if end_ns is None else end_ns
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace._add(self)
+
+    @property
+    def duration(self) -> float:
+        """耗时（秒），未结束时为到目前为止的耗时"""
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    def to_record(self) -> Dict[str, Any]:
+        """OTLP/JSON 格式的 Span 记录"""
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+            "resource": {"service.name": "lingnexus", "trace.name": self.trace.name}
+        }
+
+
+class _NullSpan:
+    """没有进行中的 Trace 时使用的空 Span，所有操作都不做任何事"""
+
+    name = ""
+    attributes: Dict[str, Any] = {}
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None, end_ns: Optional[int] = None) -> None:
+        pass
+
+    def __bool__(self) -> bool:
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Trace:
+    """一次请求的全部 Span"""
+
+    def __init__(self, name: str, **attributes: Any):
+        self.trace_id = os.urandom(16).hex()
+        self.name = name
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._exported = False
+        self.root = Span(self, name, None, attributes)
+
+    def _add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self, error: Optional[BaseException] = None, export_path: Optional[str] = None) -> None:
+        """结束根 Span 并导出（只导出一次；路径默认取 LINGNEXUS_TRACE_FILE）"""
+        self.root.end(error)
+        with self._lock:
+            if self._exported:
+                return
+            self._exported = True
+        path = export_path or os.environ.get(TRACE_FILE_ENV)
+        if path:
+            export_trace(self, path)
+
+    def finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self.spans)
+
+
+def current_span():
+    """当前 Span（没有时为 NULL_SPAN）"""
+    return _current_span.get() or NULL_SPAN
+
+
+def start_span(name: str, parent=None, **attributes: Any):
+    """开始一个 Span（不切换当前 Span），需由调用方调用 end()
+
+    Args:
+        name: 名称
+        parent: 父 Span，默认为当前 Span；没有父 Span 时返回 NULL_SPAN
+        **attributes: 属性
+    """
+    parent = parent if parent is not None else _current_span.get()
+    if not parent:
+        return NULL_SPAN
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+@contextmanager
+def activate(span) -> Iterator[Any]:
+    """在 with 块内把 span 设为当前 Span（不可跨越异步生成器的 yield）"""
+    token = _current_span.set(span or None)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, parent=None, **attributes: Any) -> Iterator[Any]:
+    """记录 with 块的耗时，块内该 Span 为当前 Span；异常时记录错误信息"""
+    current = start_span(name, parent, **attributes)
+    if not current:
+        yield current
+        return
+    with activate(current):
+        try:
+            yield current
+        except BaseException as e:
+            current.end(error=e)
+            raise
+    current.end()
+
+
+def wrap(func: Callable, span=None) -> Callable:
+    """包装提交到线程池的函数，使其在线程中继承当前（或指定的）Span"""
+    context = contextvars.copy_context()
+    if span is not None:
+        context.run(_current_span.set, span or None)
+    return functools.partial(context.run, func)
+
+
+class PhaseTimer:
+    """按环节累计耗时与次数，flush() 时每个环节记录一个聚合 Span"""
+
+    def __init__(self, parent: Span):
+        self.parent = parent
+        self.start_ns = time.time_ns()
+        self.phases: Dict[str, List[float]] = {}
+
+    def add(self, phase: str, seconds: float, count: int = 1) -> None:
+        totals = self.phases.get(phase)
+        if totals is None:
+            self.phases[phase] = [seconds, count]
+        else:
+            totals[0] += seconds
+            totals[1] += count
+
+    def flush(self) -> None:
+        """记录聚合 Span（起点为计时器创建时间，时长为累计耗时）并清空"""
+        for phase, (seconds, count) in self.phases.items():
+            record = Span(self.parent.trace, phase, self.parent.span_id, {"count": count, "aggregated": True},
+                          start_ns=self.start_ns)
+            record.end(end_ns=self.start_ns + int(seconds * 1e9))
+        self.phases = {}
+
+
+def phase_timer(parent=None) -> Optional[PhaseTimer]:
+    """返回挂在 parent（默认当前 Span）下的 PhaseTimer；没有进行中的 Trace 时返回 None"""
+    parent = parent if parent is not None else _current_span.get()
+    return PhaseTimer(parent) if parent else None
+
+
+def export_trace(trace: Trace, path: str) -> None:
+    """以 JSON Lines 追加写入 Trace 的全部 Span"""
+    lines = [json.dumps(span.to_record(), ensure_ascii=False) for span in trace.finished_spans()]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _export_lock, open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _summarize(trace: Trace) -> List[Tuple[int, str, float, int, Dict[str, Any]]]:
+    """按调用路径（父路径 + 名称）合并同名 Span：[(深度, 名称, 累计秒数, 次数, 属性)]"""
+    spans = trace.finished_spans()
+    if trace.root.end_ns is None:
+        spans.append(trace.root)
+    children: Dict[Optional[str], List[Span]] = {}
+    for item in spans:
+        children.setdefault(item.parent_id, []).append(item)
+
+    rows = []
+
+    def visit(group: List[Span], depth: int) -> None:
+        merged: Dict[str, List[Span]] = {}
+        for item in sorted(group, key=lambda s: s.start_ns):
+            merged.setdefault(item.name, []).append(item)
+        for name, items in merged.items():
+            count = sum(item.attributes.get("count", 1) if item.attributes.get("aggregated") else 1 for item in items)
+            attributes = {key: items[0].attributes[key] for key in SUMMARY_ATTRIBUTES if key in items[0].attributes}
+            rows.append((depth, name, sum(item.duration for item in items), count, attributes))
+            grandchildren = [child for item in items for child in children.get(item.span_id, [])]
+            if grandchildren:
+                visit(grandchildren, depth + 1)
+
+    visit(children.get(None, []), 0)
+    return rows
+
+
+def format_flame_summary(trace: Trace, width: int = 20) -> str:
+    """按调用路径汇总的耗时树（Markdown 代码块）
+
+    同一父路径下的同名 Span 合并为一行（×次数）；并发执行的子环节累计耗时
+    可能超过父环节。条形长度按根 Span 的耗时缩放。
+    """
+    rows = _summarize(trace)
+    if not rows:
+        return ""
+    total = max(trace.root.duration, 1e-9)
+    lines = []
+    for depth, name, seconds, count, attributes in rows:
+        label = "  " * depth + name + (f" ×{count}" if count > 1 else "")
+        notes = " ".join(f"{key}={value}" for key, value in attributes.items())
+        bar = "█" * round(min(seconds / total, 1.0) * width)
+        lines.append(f"{label:<36} {seconds * 1000:9.1f} ms  {bar:<{width}} {notes}".rstrip())
+    return "```\n" + "\n".join(lines) + "\n```"